@@ -7,15 +7,17 @@ import asyncio
 import hashlib
 import time
 from typing import List, Dict, Optional
-from intelligent_memory import IntelligentMemorySystem
-from model_service import ModelService
+from intelligent_memory import IntelligentMemorySystem, intelligent_memory
+from model_service import ModelService, model_service as shared_model_service
 
 class BackgroundRIAIService:
     """Service for background R(t) evaluation with batching and caching"""
     
-    def __init__(self):
-        self.memory_system = IntelligentMemorySystem()
-        self.model_service = ModelService()
+    def __init__(self, memory_system: Optional[IntelligentMemorySystem] = None, model_service: Optional[ModelService] = None):
+        # Share the global memory system so there is a single Neo4j connection pool
+        self.memory_system = memory_system or intelligent_memory
+        # Share the global model service so LLM calls reuse its pooled HTTP client
+        self.model_service = model_service or shared_model_service
         self.is_running = False
         self.batch_size = 20
         self.process_interval = 1800  # 30 minutes
@@ -27,13 +29,13 @@ class BackgroundRIAIService:
     async def get_cached_score(self, response_hash: str) -> Optional[float]:
         """Check if we have a cached R(t) score for this response"""
         try:
-            with self.memory_system.driver.session() as session:
-                result = session.run("""
+            async with self.memory_system.driver.session() as session:
+                result = await session.run("""
                     MATCH (c:ResponseCache {response_hash: $response_hash})
                     RETURN c.r_t_score AS score
                 """, {'response_hash': response_hash})
                 
-                record = result.single()
+                record = await result.single()
                 return record['score'] if record else None
                 
         except Exception as e:
@@ -43,8 +45,8 @@ class BackgroundRIAIService:
     async def store_cached_score(self, response_hash: str, r_t_score: float):
         """Store R(t) score in cache for future use"""
         try:
-            with self.memory_system.driver.session() as session:
-                session.run("""
+            async with self.memory_system.driver.session() as session:
+                result = await session.run("""
                     MERGE (c:ResponseCache {response_hash: $response_hash})
                     SET c.r_t_score = $r_t_score,
                         c.cached_at = datetime()
@@ -52,6 +54,7 @@ class BackgroundRIAIService:
                     'response_hash': response_hash,
                     'r_t_score': r_t_score
                 })
+                await result.consume()
                 
         except Exception as e:
             print(f"Error storing cache: {e}")
@@ -59,8 +62,8 @@ class BackgroundRIAIService:
     async def get_unscored_memories(self, limit: int = 20) -> List[Dict]:
         """Get memories that need R(t) evaluation"""
         try:
-            with self.memory_system.driver.session() as session:
-                result = session.run("""
+            async with self.memory_system.driver.session() as session:
+                result = await session.run("""
                     MATCH (m:IntelligentMemory)
                     WHERE m.message_type = 'assistant'
                     AND m.quality_score IS NULL
@@ -74,7 +77,7 @@ class BackgroundRIAIService:
                 """, {'limit': limit})
                 
                 memories = []
-                for record in result:
+                async for record in result:
                     memories.append({
                         'memory_id': record['memory_id'],
                         'content': record['content'],
@@ -235,10 +238,9 @@ class BackgroundRIAIService:
         self.is_running = False
         print("Background RIAI service stopped")
     
-    def close(self):
-        """Close connections"""
+    async def close(self):
+        """Stop the service; the memory system and model service are shared, so their owners close them"""
         self.stop_background_service()
-        self.memory_system.close()
 
 # Global instance for background service
 background_riai_service = None
@@ -0,0 +1,125 @@
+"""
+Benchmark compact embedding storage
+Compares storage size and recall@k of the full float embeddings against int8 quantization and the
+truncated-search + int8 re-rank path used when MEMORY_EMBEDDING_STORAGE=compact.
+
+Uses real embeddings from Neo4j by default; --synthetic generates vectors with a decaying
+per-dimension spectrum (similar to text-embedding-3 output) so the script runs without a database.
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from embedding_codec import quantize_int8, dequantize_int8
+
+FULL_DIMENSIONS = 1536
+
+
+def load_neo4j_embeddings(limit: int) -> np.ndarray:
+    """Sample stored full-precision memory embeddings"""
+    from neo4j import GraphDatabase
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "bolt://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+    )
+    try:
+        with driver.session() as session:
+            result = session.run("""
+                MATCH (m:IntelligentMemory)
+                WHERE m.embedding IS NOT NULL
+                RETURN m.embedding AS embedding
+                LIMIT $limit
+            """, limit=limit)
+            return np.array([record['embedding'] for record in result], dtype=np.float32)
+    finally:
+        driver.close()
+
+
+def synthetic_embeddings(count: int, clusters: int = 200, seed: int = 7) -> np.ndarray:
+    """Clustered vectors whose variance decays across dimensions"""
+    rng = np.random.default_rng(seed)
+    spectrum = 1.0 / np.sqrt(np.arange(1, FULL_DIMENSIONS + 1))
+    centers = rng.standard_normal((clusters, FULL_DIMENSIONS)) * spectrum
+    labels = rng.integers(0, clusters, count)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((count, FULL_DIMENSIONS)) * spectrum
+    return vectors.astype(np.float32)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores per row, best first"""
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, candidates, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, truth)]))
+
+
+def run_benchmark(vectors: np.ndarray, queries: int, k: int, dimensions: int, rerank_factor: int):
+    corpus = normalize(vectors[queries:])
+    query_vectors = normalize(vectors[:queries])
+
+    # Ground truth: exact float32 search
+    start = time.perf_counter()
+    truth = top_k(query_vectors @ corpus.T, k)
+    exact_time = time.perf_counter() - start
+
+    # int8 copies, decoded exactly as the application decodes them
+    encoded = [quantize_int8(row) for row in corpus.tolist()]
+    int8_corpus = normalize(np.array([dequantize_int8(data, scale) for data, scale in encoded], dtype=np.float32))
+    start = time.perf_counter()
+    int8_found = top_k(query_vectors @ int8_corpus.T, k)
+    int8_time = time.perf_counter() - start
+
+    # Truncated coarse search alone, then with int8 re-ranking of the candidates
+    truncated_corpus = normalize(corpus[:, :dimensions])
+    truncated_queries = normalize(query_vectors[:, :dimensions])
+    start = time.perf_counter()
+    coarse = top_k(truncated_queries @ truncated_corpus.T, k * rerank_factor)
+    rerank_scores = np.einsum('qd,qcd->qc', query_vectors, int8_corpus[coarse])
+    reranked = np.take_along_axis(coarse, top_k(rerank_scores, k), axis=1)
+    compact_time = time.perf_counter() - start
+    truncated_found = coarse[:, :k]
+
+    # Neo4j stores float lists as 8-byte doubles; setNodeVectorProperty stores float32
+    full_bytes = FULL_DIMENSIONS * 8
+    compact_bytes = dimensions * 4 + FULL_DIMENSIONS + 8
+
+    print(f"Corpus: {len(corpus)} vectors, {queries} queries, recall@{k}")
+    print(f"{'representation':<38} {'bytes/vector':>12} {'recall':>8} {'ms/query':>9}")
+    rows = [
+        ("full float list (current)", full_bytes, 1.0, exact_time),
+        ("int8 + scale, full dimensions", FULL_DIMENSIONS + 8, recall(int8_found, truth), int8_time),
+        (f"truncated {dimensions}d only", dimensions * 4, recall(truncated_found, truth), None),
+        (f"truncated {dimensions}d + int8 re-rank x{rerank_factor}", compact_bytes, recall(reranked, truth), compact_time)
+    ]
+    for name, size, value, elapsed in rows:
+        timing = f"{elapsed / queries * 1000:9.3f}" if elapsed is not None else f"{'-':>9}"
+        print(f"{name:<38} {size:>12} {value:>8.3f} {timing}")
+    print(f"\nCompact storage is {full_bytes / compact_bytes:.1f}x smaller than the current embedding property")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure size and recall of compact memory embeddings")
+    parser.add_argument("--synthetic", action="store_true", help="Use generated vectors instead of Neo4j")
+    parser.add_argument("--count", type=int, default=20000, help="Number of vectors to load or generate")
+    parser.add_argument("--queries", type=int, default=200, help="Vectors held out as queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=int(os.getenv("MEMORY_SEARCH_DIMENSIONS", "256")))
+    parser.add_argument("--rerank-factor", type=int, default=int(os.getenv("MEMORY_RERANK_FACTOR", "4")))
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.count) if args.synthetic else load_neo4j_embeddings(args.count)
+    if len(vectors) <= args.queries:
+        raise SystemExit(f"Need more than {args.queries} embeddings, found {len(vectors)}")
+    run_benchmark(vectors, args.queries, args.k, args.dimensions, args.rerank_factor)
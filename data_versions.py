@@ -0,0 +1,155 @@
+"""
+Data Versions
+Per-user counters that the write helpers bump whenever a user's topics, conversations, messages
+or files change. A response built at one version can be reused until the version moves on,
+which is what the HTTP cache validators and the result cache are keyed on.
+
+Counters live in-process by default. CACHE_BACKEND=redis keeps them in Redis instead, so a
+write handled by one worker invalidates what every other worker has cached. In-process versions
+also roll over every DATA_VERSION_MAX_AGE seconds, which bounds how long a worker can keep
+serving a response that another worker's write has made stale.
+"""
+
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# What a write can change; read endpoints declare which of these their response depends on
+TOPICS = "topics"
+CONVERSATIONS = "conversations"
+MESSAGES = "messages"
+FILES = "files"
+PROFILE = "profile"
+
+
+class DataVersions:
+    """In-process, monotonically increasing version counters per (user, scope)"""
+
+    name = "memory"
+    # Reads are a dict lookup, so they are safe on the event loop
+    blocking = False
+
+    def __init__(self, max_age: Optional[float] = None):
+        # Counters restart at zero with the process, so versions are only comparable within one epoch
+        self.epoch = uuid.uuid4().hex[:12]
+        # Writes handled by other processes never bump these counters, so versions also expire on their own
+        self.max_age = max_age if max_age is not None else float(os.getenv("DATA_VERSION_MAX_AGE", "30"))
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            'bumps': 0
+        }
+
+    def bump(self, user_id: Optional[str], *scopes: str):
+        """Record that a write changed the user's data in the given scopes"""
+        if not user_id:
+            return
+        with self._lock:
+            for scope in scopes:
+                key = (user_id, scope)
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._metrics['bumps'] += 1
+
+    def get(self, user_id: str, scopes: Iterable[str]) -> str:
+        """Combined version of the scopes, e.g. "3a9f0c1b2d4e-58320417:4.0"; changes whenever any of them
+        is bumped, and at least every max_age seconds"""
+        window = int(time.time() // self.max_age) if self.max_age > 0 else 0
+        with self._lock:
+            counters = [str(self._versions.get((user_id, scope), 0)) for scope in scopes]
+        return f"{self.epoch}-{window}:{'.'.join(counters)}"
+
+    def metrics(self) -> Dict:
+        snapshot = dict(self._metrics)
+        snapshot['backend'] = self.name
+        snapshot['tracked'] = len(self._versions)
+        snapshot['max_age'] = self.max_age
+        return snapshot
+
+
+class RedisDataVersions:
+    """Version counters shared by every worker through a Redis hash per user"""
+
+    name = "redis"
+    epoch_key = "data_versions:epoch"
+    # Every call is a network round trip; async code must run it off the event loop
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+        self._metrics = {
+            'bumps': 0,
+            'errors': 0
+        }
+
+    def _key(self, user_id: str) -> str:
+        return f"data_versions:{user_id}"
+
+    def bump(self, user_id: Optional[str], *scopes: str):
+        """Record that a write changed the user's data in the given scopes. Blocks on Redis: the write
+        helpers call it from run_db, after their commit"""
+        if not user_id or not scopes:
+            return
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            for scope in scopes:
+                pipeline.hincrby(self._key(user_id), scope, 1)
+            pipeline.execute()
+            self._metrics['bumps'] += len(scopes)
+        except Exception as e:
+            # Other workers keep serving what they cached until its TTL runs out
+            self._metrics['errors'] += 1
+            print(f"Error bumping data version: {e}")
+
+    def get(self, user_id: str, scopes: Iterable[str]) -> str:
+        """Combined version of the scopes; a version no validator or cache key can match if Redis is unreachable"""
+        scopes = list(scopes)
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.get(self.epoch_key)
+            pipeline.hmget(self._key(user_id), scopes)
+            epoch, counters = pipeline.execute()
+            if epoch is None:
+                # Redis lost its data, counters included: start a new epoch so old versions never match again
+                self.client.set(self.epoch_key, uuid.uuid4().hex[:12], nx=True)
+                epoch = self.client.get(self.epoch_key)
+        except Exception as e:
+            self._metrics['errors'] += 1
+            print(f"Error reading data version: {e}")
+            return f"unavailable:{uuid.uuid4().hex}"
+        epoch = epoch.decode() if isinstance(epoch, bytes) else epoch
+        counters = [counter.decode() if isinstance(counter, bytes) else (counter or "0") for counter in counters]
+        return f"{epoch}:{'.'.join(counters)}"
+
+    def metrics(self) -> Dict:
+        snapshot = dict(self._metrics)
+        snapshot['backend'] = self.name
+        return snapshot
+
+
+def create_shared_store():
+    """Redis client when CACHE_BACKEND is "redis", otherwise None and everything stays in-process"""
+    if os.getenv("CACHE_BACKEND", "memory").lower() != "redis":
+        return None
+    if redis is None:
+        print("⚠️ CACHE_BACKEND=redis but the redis package is not installed; caching in-process")
+        return None
+    return redis.Redis.from_url(
+        os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"),
+        socket_timeout=float(os.getenv("CACHE_REDIS_TIMEOUT", "0.5"))
+    )
+
+
+# Global instances
+shared_store = create_shared_store()
+data_versions = RedisDataVersions(shared_store) if shared_store is not None else DataVersions()
+if shared_store is None and os.getenv("REPLIT_DEPLOYMENT"):
+    # Autoscale runs several instances; without Redis each only sees its own writes
+    print(f"⚠️ Data versions are per-process; cached responses may lag other instances' writes by up to "
+          f"{data_versions.max_age:.0f}s. Set CACHE_BACKEND=redis to share them")
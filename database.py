@@ -0,0 +1,209 @@
+"""
+Database Access Layer
+Pooled PostgreSQL connections shared by every database helper in the application,
+plus a bounded executor so async handlers never run blocking queries on the event loop
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the acquire timeout"""
+
+
+class DatabasePool:
+    """Bounded PostgreSQL connection pool with health checks and wait metrics"""
+
+    def __init__(self, dsn: Optional[str] = None, min_size: Optional[int] = None,
+                 max_size: Optional[int] = None, acquire_timeout: Optional[float] = None,
+                 health_check_interval: Optional[float] = None):
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        self.min_size = min_size if min_size is not None else int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+        # Connections idle longer than this are pinged before being handed out
+        self.health_check_interval = health_check_interval if health_check_interval is not None else float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+        self._pool: Optional[pool.ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # Callers block on this instead of getting PoolError when the pool is exhausted
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._last_used: Dict[int, float] = {}
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'checkouts': 0,
+            'in_use': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'health_checks': 0,
+            'discarded': 0
+        }
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        """Create the underlying pool on first use so importing never requires a live database"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pool.ThreadedConnectionPool(self.min_size, self.max_size, self.dsn)
+        return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        """Check that a pooled connection is still usable"""
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+
+        with self._metrics_lock:
+            self._metrics['health_checks'] += 1
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        """Close a broken connection and drop it from the pool"""
+        self._last_used.pop(id(conn), None)
+        with self._metrics_lock:
+            self._metrics['discarded'] += 1
+        try:
+            self._get_pool().putconn(conn, close=True)
+        except Exception as e:
+            print(f"Error discarding pooled connection: {e}")
+
+    def _acquire(self):
+        """Wait for a free slot, then check out a healthy connection"""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._metrics_lock:
+                self._metrics['timeouts'] += 1
+            raise PoolTimeoutError(f"Timed out after {self.acquire_timeout}s waiting for a database connection")
+
+        try:
+            db_pool = self._get_pool()
+            conn = db_pool.getconn()
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                conn = db_pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        with self._metrics_lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['in_use'] += 1
+            self._metrics['wait_time_total'] += waited
+            self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+        return conn
+
+    def _release(self, conn):
+        """Return a connection to the pool in a clean state"""
+        try:
+            if conn.closed:
+                self._discard(conn)
+                return
+
+            try:
+                # Never hand the next caller a connection with an open transaction
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                self._discard(conn)
+                return
+
+            self._last_used[id(conn)] = time.monotonic()
+            self._get_pool().putconn(conn)
+        finally:
+            with self._metrics_lock:
+                self._metrics['in_use'] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a pooled connection for the duration of a with-block"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def metrics(self) -> Dict:
+        """Snapshot of pool usage and wait statistics"""
+        with self._metrics_lock:
+            snapshot = dict(self._metrics)
+        checkouts = snapshot['checkouts']
+        snapshot['wait_time_avg'] = snapshot['wait_time_total'] / checkouts if checkouts else 0.0
+        snapshot['min_size'] = self.min_size
+        snapshot['max_size'] = self.max_size
+        return snapshot
+
+    def close(self):
+        """Close every pooled connection"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+
+
+class AsyncDatabase:
+    """Runs blocking database helpers on a dedicated thread pool sized to the connection pool"""
+
+    def __init__(self, connection_pool: DatabasePool, max_workers: Optional[int] = None):
+        self.pool = connection_pool
+        # One worker per pooled connection, so queued work waits here instead of holding a thread
+        self.max_workers = max_workers or int(os.getenv("DB_EXECUTOR_MAX_WORKERS", str(connection_pool.max_size)))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db")
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a synchronous database helper without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """Stop the executor and close pooled connections"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.pool.close()
+
+
+# Global instances
+db_pool = DatabasePool()
+async_db = AsyncDatabase(db_pool)
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a synchronous database helper on the shared database executor"""
+    return await async_db.run(func, *args, **kwargs)
@@ -0,0 +1,341 @@
+"""
+Deletion Jobs
+Background deletion of conversations, sub-topics and topics. Requests record a job and return
+its ID at once; a worker deletes the matching conversations in bounded batches (Neo4j memories
+first, then PostgreSQL rows) and records progress on the job row, so a restarted worker simply
+resumes wherever the last one stopped.
+"""
+
+import asyncio
+import os
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from data_versions import data_versions, TOPICS, CONVERSATIONS, MESSAGES
+from database import db_pool, run_db
+
+JOB_COLUMNS = '''id, user_id, kind, topic, sub_topic, conversation_id, status, total_conversations,
+                 deleted_conversations, deleted_memories, attempts, last_error, created_at, updated_at, completed_at'''
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+
+def job_from_row(row) -> Dict:
+    """Shape a JOB_COLUMNS row for the API"""
+    total = row[7]
+    return {
+        'id': row[0],
+        'user_id': row[1],
+        'kind': row[2],
+        'topic': row[3],
+        'sub_topic': row[4],
+        'conversation_id': row[5],
+        'status': row[6],
+        'total_conversations': total,
+        'deleted_conversations': row[8],
+        'deleted_memories': row[9],
+        'attempts': row[10],
+        'last_error': row[11],
+        'progress': min(row[8] / total, 1.0) if total else 1.0,
+        'created_at': row[12].isoformat() if row[12] else None,
+        'updated_at': row[13].isoformat() if row[13] else None,
+        'completed_at': row[14].isoformat() if row[14] else None
+    }
+
+
+def job_scope(job: Dict) -> Tuple[str, list]:
+    """WHERE clause selecting the conversations a job deletes"""
+    if job['kind'] == 'conversation':
+        return 'user_id = %s AND id = %s', [job['user_id'], job['conversation_id']]
+    if job['kind'] == 'subtopic':
+        return 'user_id = %s AND topic = %s AND sub_topic = %s', [job['user_id'], job['topic'], job['sub_topic']]
+    return 'user_id = %s AND topic = %s', [job['user_id'], job['topic']]
+
+
+class DeletionJobRunner:
+    """Durable job queue and worker for deleting conversations with their memories"""
+
+    def __init__(self, memory_system=None, batch_size: Optional[int] = None, poll_interval: Optional[float] = None,
+                 max_attempts: Optional[int] = None, lease_seconds: Optional[float] = None):
+        self.memory_system = memory_system
+        # Conversations removed per PostgreSQL transaction and per Neo4j statement
+        self.batch_size = batch_size or int(os.getenv("DELETION_JOB_BATCH_SIZE", "200"))
+        self.poll_interval = poll_interval or float(os.getenv("DELETION_JOB_POLL_INTERVAL", "5"))
+        self.max_attempts = max_attempts or int(os.getenv("DELETION_JOB_MAX_ATTEMPTS", "5"))
+        # A job claimed by a worker that dies becomes available again after this long
+        self.lease_seconds = lease_seconds or float(os.getenv("DELETION_JOB_LEASE_SECONDS", "60"))
+
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'retries': 0,
+            'batches': 0,
+            'conversations_deleted': 0,
+            'memories_deleted': 0
+        }
+
+    def _insert(self, user_id: str, kind: str, topic: Optional[str], sub_topic: Optional[str],
+                conversation_id: Optional[str]) -> Optional[Dict]:
+        """Record a job for the scope, reusing an unfinished one; None when the scope does not exist"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            # A repeated click or retried request joins the job already deleting this scope
+            cursor.execute(f'''
+                SELECT {JOB_COLUMNS} FROM deletion_jobs
+                WHERE user_id = %s AND kind = %s AND status IN %s
+                  AND topic IS NOT DISTINCT FROM %s AND sub_topic IS NOT DISTINCT FROM %s
+                  AND conversation_id IS NOT DISTINCT FROM %s
+                LIMIT 1
+            ''', (user_id, kind, ACTIVE_STATUSES, topic, sub_topic, conversation_id))
+            row = cursor.fetchone()
+            if row:
+                cursor.close()
+                return job_from_row(row)
+
+            # Topics and sub-topics may exist without conversations; their rows carry the counts
+            if kind == 'topic':
+                cursor.execute('SELECT conversation_count FROM topics WHERE user_id = %s AND name = %s', (user_id, topic))
+            elif kind == 'subtopic':
+                cursor.execute('SELECT conversation_count FROM subtopics WHERE user_id = %s AND topic = %s AND name = %s',
+                               (user_id, topic, sub_topic))
+            else:
+                cursor.execute('SELECT 1 FROM conversations WHERE user_id = %s AND id = %s', (user_id, conversation_id))
+            row = cursor.fetchone()
+            if not row:
+                cursor.close()
+                return None
+            total = row[0]
+
+            cursor.execute(f'''
+                INSERT INTO deletion_jobs (id, user_id, kind, topic, sub_topic, conversation_id, total_conversations)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING {JOB_COLUMNS}
+            ''', (str(uuid.uuid4()), user_id, kind, topic, sub_topic, conversation_id, total))
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        return job_from_row(row)
+
+    def _fetch(self, job_id: str, user_id: str) -> Optional[Dict]:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {JOB_COLUMNS} FROM deletion_jobs WHERE id = %s AND user_id = %s', (job_id, user_id))
+            row = cursor.fetchone()
+            cursor.close()
+        return job_from_row(row) if row else None
+
+    def _claim(self) -> Optional[Dict]:
+        """Lease the oldest runnable job, giving up on jobs that keep failing"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE deletion_jobs
+                SET status = 'failed', updated_at = CURRENT_TIMESTAMP,
+                    last_error = COALESCE(last_error, 'Worker stopped repeatedly while running this job')
+                WHERE status IN %s AND available_at <= CURRENT_TIMESTAMP AND attempts >= %s
+            ''', (ACTIVE_STATUSES, self.max_attempts))
+            self._metrics['failed'] += cursor.rowcount
+            cursor.execute(f'''
+                UPDATE deletion_jobs
+                SET status = 'running', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE id = (
+                    SELECT id FROM deletion_jobs
+                    WHERE status IN %s AND available_at <= CURRENT_TIMESTAMP
+                    ORDER BY available_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {JOB_COLUMNS}
+            ''', (self.lease_seconds, ACTIVE_STATUSES))
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        return job_from_row(row) if row else None
+
+    def _next_batch(self, job: Dict) -> List[str]:
+        """IDs of the next conversations still to delete"""
+        where_clause, params = job_scope(job)
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT id FROM conversations WHERE {where_clause} ORDER BY id LIMIT %s',
+                           params + [self.batch_size])
+            conversation_ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+        return conversation_ids
+
+    def _delete_batch(self, job: Dict, conversation_ids: List[str], deleted_memories: int) -> int:
+        """Delete one batch of conversations and record the progress in the same transaction"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM conversation_messages WHERE conversation_id = ANY(%s)', (conversation_ids,))
+            # Memories still waiting in the write-behind queue would otherwise be stored after the delete
+            cursor.execute('DELETE FROM memory_ingest_queue WHERE conversation_id = ANY(%s)', (conversation_ids,))
+            cursor.execute('DELETE FROM conversations WHERE id = ANY(%s) AND user_id = %s',
+                           (conversation_ids, job['user_id']))
+            deleted = cursor.rowcount
+            cursor.execute('''
+                UPDATE deletion_jobs
+                SET deleted_conversations = deleted_conversations + %s,
+                    deleted_memories = deleted_memories + %s,
+                    updated_at = CURRENT_TIMESTAMP,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE id = %s
+            ''', (deleted, deleted_memories, self.lease_seconds, job['id']))
+            conn.commit()
+            cursor.close()
+        data_versions.bump(job['user_id'], CONVERSATIONS, MESSAGES, TOPICS)
+        return deleted
+
+    def _finish(self, job: Dict):
+        """Remove what is left of the scope and mark the job completed"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            if job['kind'] == 'topic':
+                cursor.execute('DELETE FROM memory_links WHERE user_id = %s AND linked_topic = %s',
+                               (job['user_id'], job['topic']))
+                # Sub-topics go with it through the foreign key
+                cursor.execute('DELETE FROM topics WHERE user_id = %s AND name = %s', (job['user_id'], job['topic']))
+            elif job['kind'] == 'subtopic':
+                cursor.execute('DELETE FROM subtopics WHERE user_id = %s AND topic = %s AND name = %s',
+                               (job['user_id'], job['topic'], job['sub_topic']))
+            cursor.execute('''
+                UPDATE deletion_jobs
+                SET status = 'completed', last_error = NULL,
+                    updated_at = CURRENT_TIMESTAMP, completed_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (job['id'],))
+            conn.commit()
+            cursor.close()
+        if job['kind'] != 'conversation':
+            data_versions.bump(job['user_id'], TOPICS)
+
+    def _retry_later(self, job: Dict, error: str):
+        """Release a failed job with exponential backoff, or fail it once attempts run out"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE deletion_jobs
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    last_error = %s,
+                    updated_at = CURRENT_TIMESTAMP,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => LEAST(POWER(2, attempts), 300))
+                WHERE id = %s
+                RETURNING status
+            ''', (self.max_attempts, error[:1000], job['id']))
+            status = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        self._metrics['failed' if status == 'failed' else 'retries'] += 1
+
+    def _release(self, job: Dict):
+        """Hand an interrupted job straight back to the queue"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE deletion_jobs SET status = 'pending', available_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            ''', (job['id'],))
+            conn.commit()
+            cursor.close()
+
+    async def submit(self, user_id: str, kind: str, topic: Optional[str] = None, sub_topic: Optional[str] = None,
+                     conversation_id: Optional[str] = None) -> Optional[Dict]:
+        """Queue deletion of a conversation, sub-topic or topic; returns the job, or None if nothing matches"""
+        job = await run_db(self._insert, user_id, kind, topic, sub_topic, conversation_id)
+        if job and job['status'] == 'pending':
+            self._metrics['submitted'] += 1
+            if self._wakeup:
+                self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Dict]:
+        """Current status and progress of one of the user's jobs"""
+        return await run_db(self._fetch, job_id, user_id)
+
+    async def process_job(self, job: Dict):
+        """Delete a claimed job's conversations batch by batch until none are left"""
+        try:
+            while True:
+                conversation_ids = await run_db(self._next_batch, job)
+                if not conversation_ids:
+                    await run_db(self._finish, job)
+                    self._metrics['completed'] += 1
+                    print(f"DEBUG: Deletion job {job['id']} completed")
+                    return
+
+                # Memories go first: if PostgreSQL then fails, the retry finds the same conversations again
+                deleted_memories = 0
+                if self.memory_system:
+                    deleted_memories = await self.memory_system.delete_conversation_memories(job['user_id'], conversation_ids)
+                deleted = await run_db(self._delete_batch, job, conversation_ids, deleted_memories)
+                if self.memory_system:
+                    # The memory queue may have stored one of these conversations' memories after the first
+                    # pass; with the conversations gone it stops storing them, so a second pass catches the rest
+                    deleted_memories += await self.memory_system.delete_conversation_memories(job['user_id'], conversation_ids)
+
+                self._metrics['batches'] += 1
+                self._metrics['conversations_deleted'] += deleted
+                self._metrics['memories_deleted'] += deleted_memories
+
+                if self._stopping:
+                    await run_db(self._release, job)
+                    return
+        except Exception as e:
+            print(f"Error running deletion job {job['id']} (will retry): {e}")
+            await run_db(self._retry_later, job, str(e))
+
+    async def process_next(self) -> bool:
+        """Run the next runnable job to completion; returns False when there was none"""
+        job = await run_db(self._claim)
+        if not job:
+            return False
+        await self.process_job(job)
+        return True
+
+    async def _run(self):
+        """Worker loop: run jobs until none are runnable, then sleep until woken or the poll interval passes"""
+        while not self._stopping:
+            try:
+                ran = await self.process_next()
+            except Exception as e:
+                print(f"Deletion job worker error: {e}")
+                ran = False
+
+            if not ran and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def start(self):
+        """Start the background worker; unfinished jobs from earlier runs are picked up"""
+        if self._worker:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        print("✅ Deletion job worker started")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop after the current batch; the job resumes on next start"""
+        if not self._worker:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._worker, timeout=timeout)
+        except asyncio.TimeoutError:
+            print("Deletion job worker did not stop in time; its job resumes after the lease expires")
+        self._worker = None
+
+    def metrics(self) -> Dict:
+        """Counters for deletion work since startup"""
+        snapshot = dict(self._metrics)
+        snapshot['running'] = self._worker is not None
+        return snapshot
@@ -0,0 +1,136 @@
+"""
+Embedding Cache
+Content-addressed cache for embeddings with a bounded in-memory LRU tier
+and an optional PostgreSQL tier shared across processes and restarts
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from database import db_pool, run_db
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content address for an embedding: model plus hash of the normalized text"""
+    digest = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return f"{model}:{digest}"
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (model, normalized text hash)"""
+
+    def __init__(self, max_entries: Optional[int] = None, persistent: Optional[bool] = None):
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_SIZE", "5000"))
+        self.persistent = persistent if persistent is not None else os.getenv("EMBEDDING_CACHE_PERSIST", "false").lower() == "true"
+
+        # Vectors are kept as float32 arrays, a fraction of the size of Python float lists
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_writes = set()
+        self._metrics = {
+            'memory_hits': 0,
+            'persistent_hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+    def _remember(self, key: str, vector: array):
+        """Insert into the LRU tier, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+
+    def _load(self, key: str) -> Optional[bytes]:
+        """Read an embedding from the persistent tier"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT embedding FROM embedding_cache WHERE cache_key = %s', (key,))
+            result = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        return bytes(result[0]) if result else None
+
+    def _save(self, key: str, data: bytes):
+        """Write an embedding to the persistent tier"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO embedding_cache (cache_key, embedding) VALUES (%s, %s)
+                ON CONFLICT (cache_key) DO NOTHING
+            ''', (key, data))
+            conn.commit()
+            cursor.close()
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return a cached embedding, checking memory first and then the persistent tier"""
+        key = cache_key(model, text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._metrics['memory_hits'] += 1
+                return vector.tolist()
+
+        if self.persistent:
+            try:
+                data = await run_db(self._load, key)
+            except Exception as e:
+                print(f"Embedding cache read error: {e}")
+                data = None
+            if data:
+                vector = array('f')
+                vector.frombytes(data)
+                self._remember(key, vector)
+                self._metrics['persistent_hits'] += 1
+                return vector.tolist()
+
+        self._metrics['misses'] += 1
+        return None
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Cache an embedding; the persistent write happens in the background"""
+        key = cache_key(model, text)
+        vector = array('f', embedding)
+        self._remember(key, vector)
+
+        if self.persistent:
+            task = asyncio.get_running_loop().create_task(self._persist(key, vector.tobytes()))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    async def _persist(self, key: str, data: bytes):
+        try:
+            await run_db(self._save, key, data)
+        except Exception as e:
+            print(f"Embedding cache write error: {e}")
+
+    def metrics(self) -> Dict:
+        """Hit/miss counters and hit rate since startup"""
+        snapshot = dict(self._metrics)
+        hits = snapshot['memory_hits'] + snapshot['persistent_hits']
+        lookups = hits + snapshot['misses']
+        snapshot['hit_rate'] = hits / lookups if lookups else 0.0
+        snapshot['size'] = len(self._entries)
+        snapshot['max_entries'] = self.max_entries
+        snapshot['persistent'] = self.persistent
+        return snapshot
+
+    async def close(self):
+        """Wait for background persistent writes to finish"""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
@@ -0,0 +1,38 @@
+"""
+Embedding Codec
+Compact storage forms for embeddings: int8 scalar quantization with a per-vector scale,
+and truncated search vectors (text-embedding-3 models keep most of their quality in the
+leading dimensions, so a renormalized prefix is a usable coarse vector)
+"""
+
+import math
+import operator
+from array import array
+from typing import List, Sequence, Tuple
+
+
+def quantize_int8(vector: Sequence[float]) -> Tuple[bytes, float]:
+    """Encode a vector as signed bytes plus the scale that maps them back to floats"""
+    scale = max((abs(value) for value in vector), default=0.0) / 127.0
+    if scale == 0.0:
+        return bytes(len(vector)), 0.0
+    return array('b', (round(value / scale) for value in vector)).tobytes(), scale
+
+
+def dequantize_int8(data: bytes, scale: float) -> List[float]:
+    """Decode a vector produced by quantize_int8"""
+    return [value * scale for value in array('b', bytes(data))]
+
+
+def truncate(vector: Sequence[float], dimensions: int) -> List[float]:
+    """Leading dimensions of a vector, rescaled to unit length"""
+    head = list(vector[:dimensions])
+    norm = math.sqrt(sum(value * value for value in head))
+    return [value / norm for value in head] if norm else head
+
+
+def cosine_score(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity on the [0, 1] scale used by Neo4j vector functions"""
+    dot = sum(map(operator.mul, a, b))
+    norm = math.sqrt(sum(value * value for value in a)) * math.sqrt(sum(value * value for value in b))
+    return (1.0 + dot / norm) / 2.0 if norm else 0.0
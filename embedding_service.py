@@ -0,0 +1,156 @@
+"""
+Embedding Service
+Coalesces concurrent embedding requests into batched OpenAI calls on a shared client
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+import openai
+
+from embedding_cache import EmbeddingCache
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+class EmbeddingService:
+    """Batches embedding requests arriving within a short window into one multi-input API call"""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, batch_window: Optional[float] = None,
+                 max_batch_size: Optional[int] = None, cache: Optional[EmbeddingCache] = None):
+        self.model = model
+        self.cache = cache
+        # How long the first request in a batch waits for others to join it
+        self.batch_window = batch_window if batch_window is not None else float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10")) / 1000
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "256"))
+        self.timeout = float(os.getenv("EMBEDDING_TIMEOUT", "20"))
+
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._inflight = set()
+        self._metrics = {
+            'requests': 0,
+            'batches': 0,
+            'texts_sent': 0,
+            'errors': 0,
+            'splits': 0
+        }
+
+    def _get_client(self) -> openai.AsyncOpenAI:
+        """Create the long-lived API client on first use"""
+        if self._client is None:
+            self._client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=self.timeout)
+        return self._client
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text, sharing an API call with any concurrent requests"""
+        if not text or not text.strip():
+            raise ValueError("Cannot embed empty text")
+
+        if self.cache:
+            cached = await self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
+        embedding = await self._enqueue(text)
+        if self.cache:
+            self.cache.put(self.model, text, embedding)
+        return embedding
+
+    def _enqueue(self, text: str) -> asyncio.Future:
+        """Add a text to the pending batch and return the future for its embedding"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._metrics['requests'] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        return future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts; they are sent together with any other pending requests"""
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _flush(self):
+        """Send everything pending as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _embed_texts(self, texts: List[str]) -> Dict[str, object]:
+        """Embed distinct texts, mapping each to its embedding or to the error that rejected it.
+
+        The API rejects a whole request for one invalid input (e.g. over the token limit), so a
+        rejected batch is split in half until the offending texts are isolated. Errors that are
+        not about the input, such as timeouts or auth failures, are raised for the caller.
+        """
+        try:
+            response = await self._get_client().embeddings.create(model=self.model, input=texts)
+        except openai.BadRequestError as e:
+            self._metrics['errors'] += 1
+            if len(texts) == 1:
+                return {texts[0]: e}
+            self._metrics['splits'] += 1
+            middle = len(texts) // 2
+            first, second = await asyncio.gather(self._embed_texts(texts[:middle]), self._embed_texts(texts[middle:]))
+            return {**first, **second}
+        self._metrics['batches'] += 1
+        self._metrics['texts_sent'] += len(texts)
+        return {texts[item.index]: item.embedding for item in response.data}
+
+    async def _send(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Call the API once for a batch and resolve each caller's future"""
+        # Identical texts in a batch (e.g. a query and its stored message) are embedded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            results = await self._embed_texts(unique_texts)
+        except Exception as e:
+            self._metrics['errors'] += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            if future.done():
+                continue
+            result = results[text]
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def metrics(self) -> Dict:
+        """Request and batching counters since startup"""
+        snapshot = dict(self._metrics)
+        batches = snapshot['batches']
+        snapshot['avg_batch_size'] = snapshot['texts_sent'] / batches if batches else 0.0
+        snapshot['cache'] = self.cache.metrics() if self.cache else None
+        return snapshot
+
+    async def close(self):
+        """Flush pending requests and close the API client"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        if self.cache:
+            await self.cache.close()
+
+
+# Global instance
+embedding_service = EmbeddingService(cache=EmbeddingCache())
@@ -0,0 +1,130 @@
+"""
+HTTP Cache
+Conditional GET support for the read-mostly, per-user API endpoints. Each response carries a weak
+ETag derived from the user's data versions, and a request whose If-None-Match still matches is
+answered with 304 before the endpoint runs, so unchanged sidebars never reach PostgreSQL.
+"""
+
+import asyncio
+import hashlib
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from data_versions import DataVersions
+
+# Browsers keep the response but revalidate it on every use
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+class CacheRule:
+    """A GET route whose response depends only on the requesting user's data in the given scopes"""
+
+    def __init__(self, path: str, scopes: Sequence[str], cache_control: str = DEFAULT_CACHE_CONTROL):
+        self.pattern: Pattern = re.compile(path)
+        self.scopes = tuple(scopes)
+        self.cache_control = cache_control
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+class HTTPCache:
+    """The cacheable routes, the versions their validators come from, and revalidation counts"""
+
+    def __init__(self, rules: List[CacheRule], versions: DataVersions,
+                 authenticate: Callable[[Request], Awaitable[Optional[Dict]]]):
+        self.rules = rules
+        self.versions = versions
+        self.authenticate = authenticate
+        self._metrics = {
+            'not_modified': 0,
+            'tagged': 0
+        }
+
+    def match(self, path: str) -> Optional[CacheRule]:
+        for rule in self.rules:
+            if rule.pattern.fullmatch(path):
+                return rule
+        return None
+
+    def etag(self, user_id: str, rule: CacheRule, scope: Scope) -> str:
+        # The URL is part of the tag so one page's validator can never confirm another page
+        version = self.versions.get(user_id, rule.scopes)
+        key = f"{user_id}|{version}|{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}"
+        return 'W/"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+    async def etag_async(self, user_id: str, rule: CacheRule, scope: Scope) -> str:
+        """etag() without blocking the event loop when versions come from Redis"""
+        if self.versions.blocking:
+            return await asyncio.to_thread(self.etag, user_id, rule, scope)
+        return self.etag(user_id, rule, scope)
+
+    def record(self, outcome: str):
+        self._metrics[outcome] += 1
+
+    def metrics(self) -> Dict:
+        snapshot = dict(self._metrics)
+        snapshot['versions'] = self.versions.metrics()
+        return snapshot
+
+
+class HTTPCacheMiddleware:
+    """ASGI middleware adding ETag/Cache-Control to matching GETs and answering revalidations with 304"""
+
+    def __init__(self, app: ASGIApp, cache: HTTPCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        rule = self.cache.match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        user_data = await self.cache.authenticate(request)
+        if not user_data:
+            # The endpoint answers 401 itself
+            await self.app(scope, receive, send)
+            return
+
+        # Read before the endpoint runs: a write racing the request leaves this tag stale, never the data
+        etag = await self.cache.etag_async(user_data['user_id'], rule, scope)
+        headers: List[Tuple[bytes, bytes]] = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", rule.cache_control.encode("latin-1")),
+            (b"vary", b"Cookie")
+        ]
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            self.cache.record('not_modified')
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                self.cache.record('tagged')
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
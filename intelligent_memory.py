@@ -5,26 +5,18 @@ Replaces the existing memory system with intelligent routing and fast retrieval
 
 import re
 import json
+import uuid
 import asyncio
 from typing import List, Dict, Optional, Tuple
 from enum import Enum
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from neo4j import GraphDatabase
-import openai
+from neo4j import AsyncGraphDatabase
 import os
-# Embedding generation function
-def generate_embedding(text: str) -> List[float]:
-    """Generate embeddings using OpenAI API"""
-    try:
-        client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Embedding generation error: {e}")
-        return []
+from embedding_service import EmbeddingService, embedding_service as shared_embedding_service
+from memory_index import MemoryIndex
+from model_service import model_service
+from embedding_codec import quantize_int8, dequantize_int8, truncate, cosine_score
 
 class MemoryIntent(Enum):
     """Classification of user query intent for memory routing"""
@@ -34,6 +26,12 @@ class MemoryIntent(Enum):
     CONTEXTUAL = "contextual"                # "How does this relate to..."
     STORE_FACT = "store_fact"                # "My birthday is..."
 
+@dataclass
+class MemoryRetrieval:
+    """Result of a memory lookup: prompt context plus the query embedding used to find it"""
+    context: str = ""
+    query_embedding: Optional[List[float]] = None
+
 class MemoryRouter:
     """Fast intent classification for memory routing"""
     
@@ -128,10 +126,13 @@ class ImportanceScorer:
 class IntelligentMemorySystem:
     """Main intelligent memory system"""
     
-    def __init__(self):
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
         self.router = MemoryRouter()
         self.scorer = ImportanceScorer()
         
+        # Batched embeddings on a shared client
+        self.embedding_service = embedding_service or shared_embedding_service
+        
         # RIAI Configuration
         self.evaluation_model = "deepseek/deepseek-r1-distill-qwen-7b"
         
@@ -140,19 +141,44 @@ class IntelligentMemorySystem:
         neo4j_user = os.getenv("NEO4J_USERNAME", "neo4j")
         neo4j_password = os.getenv("NEO4J_PASSWORD", "password")
         
-        self.driver = GraphDatabase.driver(
+        # Async driver so vector queries never block the event loop; pool tuned via env
+        self.driver = AsyncGraphDatabase.driver(
             neo4j_uri,
-            auth=(neo4j_user, neo4j_password)
+            auth=(neo4j_user, neo4j_password),
+            max_connection_pool_size=int(os.getenv("NEO4J_POOL_MAX_SIZE", "50")),
+            connection_acquisition_timeout=float(os.getenv("NEO4J_POOL_ACQUIRE_TIMEOUT", "10")),
+            connection_timeout=float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "15")),
+            max_connection_lifetime=float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
         )
         
-        self._setup_vector_index()
+        # Vector index is created lazily on first use, since the driver needs a running loop
+        self._vector_index_ready = False
+        
+        # Semantic search scope: "user_scan" scores only the user's own memories (cost independent of
+        # other tenants); "oversample" queries the global vector index with adaptively growing k
+        self.search_mode = os.getenv("MEMORY_SEARCH_MODE", "user_scan")
+        self.oversample_factor = int(os.getenv("MEMORY_SEARCH_OVERSAMPLE", "10"))
+        self.oversample_max_k = int(os.getenv("MEMORY_SEARCH_MAX_K", "1000"))
+        
+        # Embedding storage: "full" keeps the float list on each node; "compact" keeps an int8 copy for
+        # re-ranking plus a truncated float32 vector for the index (run migrate_embeddings.py when switching)
+        self.embedding_storage = os.getenv("MEMORY_EMBEDDING_STORAGE", "full")
+        self.search_dimensions = int(os.getenv("MEMORY_SEARCH_DIMENSIONS", "256"))
+        self.rerank_factor = int(os.getenv("MEMORY_RERANK_FACTOR", "4"))
+        if self.embedding_storage == "compact":
+            self.vector_index_name, self.vector_property, self.vector_dimensions = "memory_search_index", "embedding_search", self.search_dimensions
+        else:
+            self.vector_index_name, self.vector_property, self.vector_dimensions = "memory_embedding_index", "embedding", 1536
+        
+        # Conversations per UNWIND statement when deleting memories, so large topics don't hold one long transaction
+        self.delete_batch_size = int(os.getenv("MEMORY_DELETE_BATCH_SIZE", "500"))
+        
+        # In-process mirror of per-user embeddings; Neo4j answers while a user's shard is cold
+        self.memory_index = MemoryIndex(loader=self._load_user_memories)
     
     async def evaluate_response(self, user_query: str, ai_response: str) -> Optional[float]:
         """Evaluate AI response quality using DeepSeek-R1-Distill model (R(t) function)"""
         try:
-            from model_service import ModelService
-            model_service = ModelService()
-            
             evaluation_prompt = f"""Rate this AI response quality on a scale of 1-10:
 
 User Query: {user_query}
@@ -189,101 +215,163 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
             print(f"Response evaluation error: {e}")
             return None
     
-    def generate_embedding(self, text: str) -> List[float]:
+    async def generate_embedding(self, text: str) -> List[float]:
         """Generate embeddings using OpenAI API"""
         try:
-            client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-            response = client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            return response.data[0].embedding
+            return await self.embedding_service.embed(text)
         except Exception as e:
             print(f"Embedding generation error: {e}")
             return []
     
-    def _setup_vector_index(self):
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in a single OpenAI request.
+
+        Raises the API error (e.g. openai.BadRequestError for an input over the token limit)
+        so queued callers can tell a bad row from an outage.
+        """
+        return await self.embedding_service.embed_many(texts)
+    
+    async def _setup_vector_index(self):
         """Setup Neo4j vector index for fast semantic search"""
+        if self._vector_index_ready:
+            return
         try:
-            with self.driver.session() as session:
+            async with self.driver.session() as session:
                 # Create vector index for memory nodes
-                session.run("""
-                    CREATE VECTOR INDEX memory_embedding_index IF NOT EXISTS
-                    FOR (m:IntelligentMemory) ON (m.embedding)
-                    OPTIONS {indexConfig: {
-                        `vector.dimensions`: 1536,
+                result = await session.run(f"""
+                    CREATE VECTOR INDEX {self.vector_index_name} IF NOT EXISTS
+                    FOR (m:IntelligentMemory) ON (m.{self.vector_property})
+                    OPTIONS {{indexConfig: {{
+                        `vector.dimensions`: {self.vector_dimensions},
                         `vector.similarity_function`: 'cosine'
-                    }}
+                    }}}}
+                """)
+                await result.consume()
+                
+                # Per-user partition for filtered semantic search
+                result = await session.run("""
+                    CREATE INDEX memory_user_index IF NOT EXISTS
+                    FOR (m:IntelligentMemory) ON (m.user_id)
+                """)
+                await result.consume()
+                
+                # Conversation and topic deletion match memories by conversation
+                result = await session.run("""
+                    CREATE INDEX memory_conversation_index IF NOT EXISTS
+                    FOR (m:IntelligentMemory) ON (m.conversation_id)
+                """)
+                await result.consume()
+                
+                # Memory IDs are merged on, so batched writes can be retried without duplicates
+                result = await session.run("""
+                    CREATE CONSTRAINT memory_id_unique IF NOT EXISTS
+                    FOR (m:IntelligentMemory) REQUIRE m.id IS UNIQUE
                 """)
+                await result.consume()
+                self._vector_index_ready = True
                 print("✅ Vector index created successfully")
         except Exception as e:
             print(f"❌ Vector index setup failed: {e}")
     
     async def store_memory(self, content: str, user_id: str, conversation_id: Optional[str], 
-                          message_type: str = "user", message_id: Optional[int] = None) -> Optional[str]:
-        """Store memory with intelligent importance scoring"""
-        
-        # Score importance
-        importance = self.scorer.score_importance(content)
-        
-        # Only store if importance is above threshold
-        if importance < 0.1:
-            return None
-        
-        # Generate embedding
-        embedding = self.generate_embedding(content)
-        if not embedding:
-            return None
-        
-        # Store in Neo4j
+                          message_type: str = "user", message_id: Optional[int] = None,
+                          embedding: Optional[List[float]] = None) -> Optional[str]:
+        """Store memory with intelligent importance scoring, reusing a precomputed embedding if given"""
         try:
-            with self.driver.session() as session:
-                result = session.run("""
-                    CREATE (m:IntelligentMemory {
-                        id: randomUUID(),
-                        content: $content,
-                        user_id: $user_id,
-                        conversation_id: $conversation_id,
-                        message_type: $message_type,
-                        message_id: $message_id,
-                        importance: $importance,
-                        embedding: $embedding,
-                        quality_score: null,
-                        evaluation_timestamp: null,
-                        evaluation_model: null,
-                        human_feedback_score: null,
-                        human_feedback_type: null,
-                        human_feedback_timestamp: null,
-                        final_quality_score: null,
-                        final_score_timestamp: null,
-                        timestamp: datetime(),
-                        created_at: datetime()
-                    })
-                    RETURN m.id AS memory_id
-                """, {
-                    'content': content,
-                    'user_id': user_id,
-                    'conversation_id': conversation_id or "",
-                    'message_type': message_type,
-                    'message_id': message_id,
-                    'importance': importance,
-                    'embedding': embedding
-                })
-                
-                record = result.single()
-                return record['memory_id'] if record else None
-                
+            memory_ids = await self.store_memories([{
+                'content': content,
+                'user_id': user_id,
+                'conversation_id': conversation_id,
+                'message_type': message_type,
+                'message_id': message_id,
+                'embedding': embedding
+            }])
+            return memory_ids[0]
         except Exception as e:
             print(f"Error storing memory: {e}")
             import traceback
             traceback.print_exc()
             return None
     
+    async def store_memories(self, memories: List[Dict]) -> List[Optional[str]]:
+        """Store a batch of memories with one embedding request and one Neo4j write.
+        
+        Each memory has content, user_id, conversation_id, message_type, message_id, an optional
+        precomputed embedding and an optional id that makes retries idempotent. Returns the stored memory IDs in order, with None for
+        memories below the importance threshold. Raises on failure so queued callers can retry.
+        """
+        memory_ids: List[Optional[str]] = [None] * len(memories)
+        
+        # Score importance and only store memories above threshold
+        to_store = []
+        for index, memory in enumerate(memories):
+            importance = self.scorer.score_importance(memory['content'])
+            if importance >= 0.1:
+                to_store.append((index, memory, importance))
+        
+        if not to_store:
+            return memory_ids
+        
+        # Generate missing embeddings in one batched request
+        missing = [memory['content'] for _, memory, _ in to_store if not memory.get('embedding')]
+        generated = await self.generate_embeddings(missing) if missing else []
+        if len(generated) != len(missing):
+            raise Exception("Embedding generation failed")
+        generated = iter(generated)
+        embeddings = [memory.get('embedding') or next(generated) for _, memory, _ in to_store]
+        
+        await self._setup_vector_index()
+        
+        rows = []
+        for (index, memory, importance), embedding in zip(to_store, embeddings):
+            memory_id = memory.get('id') or str(uuid.uuid4())
+            memory_ids[index] = memory_id
+            rows.append({
+                'id': memory_id,
+                'content': memory['content'],
+                'user_id': memory['user_id'],
+                'conversation_id': memory.get('conversation_id') or "",
+                'message_type': memory.get('message_type', 'user'),
+                'message_id': memory.get('message_id'),
+                'importance': importance,
+                'embedding': embedding
+            })
+        
+        node_rows = rows
+        if self.embedding_storage == "compact":
+            node_rows = [self._compact_row(row) for row in rows]
+        
+        # Store in Neo4j; quality and feedback fields start unset until RIAI scoring
+        async with self.driver.session() as session:
+            result = await session.run("""
+                UNWIND $memories AS mem
+                MERGE (m:IntelligentMemory {id: mem.id})
+                ON CREATE SET
+                    m.content = mem.content,
+                    m.user_id = mem.user_id,
+                    m.conversation_id = mem.conversation_id,
+                    m.message_type = mem.message_type,
+                    m.message_id = mem.message_id,
+                    m.importance = mem.importance,
+                    m.embedding = mem.embedding,
+                    m.embedding_q8 = mem.embedding_q8,
+                    m.embedding_scale = mem.embedding_scale,
+                    m.timestamp = datetime(),
+                    m.created_at = datetime()
+                WITH m, mem
+                WHERE mem.embedding_search IS NOT NULL
+                CALL db.create.setNodeVectorProperty(m, 'embedding_search', mem.embedding_search)
+            """, {'memories': node_rows})
+            await result.consume()
+        
+        self.memory_index.add(rows)
+        return memory_ids
+    
     async def update_memory_quality_score(self, memory_id: str, quality_score: float) -> bool:
         """Update quality score for a specific memory (RIAI scoring)"""
         try:
-            with self.driver.session() as session:
-                result = session.run("""
+            async with self.driver.session() as session:
+                result = await session.run("""
                     MATCH (m:IntelligentMemory {id: $memory_id})
                     SET m.quality_score = $quality_score,
                         m.evaluation_timestamp = datetime(),
@@ -295,7 +383,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                     'evaluation_model': self.evaluation_model
                 })
                 
-                return result.single() is not None
+                return await result.single() is not None
                 
         except Exception as e:
             print(f"Error updating memory quality score: {e}")
@@ -304,14 +392,14 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
     async def update_human_feedback(self, message_id, feedback_score: float, feedback_type: str, user_id: str) -> bool:
         """Update memory with human feedback (H(t) function)"""
         try:
-            with self.driver.session() as session:
+            async with self.driver.session() as session:
                 # Convert message_id to integer if it's a string representation
                 try:
                     search_message_id = int(message_id) if isinstance(message_id, str) else message_id
                 except (ValueError, TypeError):
                     search_message_id = message_id
                 
-                result = session.run("""
+                result = await session.run("""
                     MATCH (m:IntelligentMemory {message_id: $message_id})
                     WHERE m.user_id = $user_id
                     SET m.human_feedback_score = $feedback_score,
@@ -325,7 +413,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                     'user_id': user_id
                 })
                 
-                return result.single() is not None
+                return await result.single() is not None
                 
         except Exception as e:
             print(f"Error updating human feedback: {e}")
@@ -355,7 +443,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
     async def update_final_quality_score(self, memory_id: str, user_id: str, use_message_id: bool = False) -> bool:
         """Update final quality score for a memory using f(R(t), H(t))"""
         try:
-            with self.driver.session() as session:
+            async with self.driver.session() as session:
                 # Get current R(t) and H(t) scores
                 if use_message_id:
                     # Query by PostgreSQL message_id
@@ -384,12 +472,12 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                     except (ValueError, TypeError):
                         search_id = memory_id
                 
-                result = session.run(query, {
+                result = await session.run(query, {
                     'memory_id': search_id,
                     'user_id': user_id
                 })
                 
-                record = result.single()
+                record = await result.single()
                 if not record:
                     return False
                 
@@ -402,7 +490,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                 
                 if final_score is not None:
                     # Update memory with final quality score using internal Neo4j ID
-                    update_result = session.run("""
+                    update_result = await session.run("""
                         MATCH (m:IntelligentMemory {id: $internal_id})
                         WHERE m.user_id = $user_id
                         SET m.final_quality_score = $final_score,
@@ -414,7 +502,10 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                         'final_score': final_score
                     })
                     
-                    return update_result.single() is not None
+                    if await update_result.single() is None:
+                        return False
+                    self.memory_index.set_quality(user_id, internal_id, final_score)
+                    return True
                 
                 return False
                 
@@ -425,8 +516,8 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
     async def get_unscored_memories(self, user_id: str, limit: int = 10) -> List[Dict]:
         """Get memories that haven't been quality scored yet"""
         try:
-            with self.driver.session() as session:
-                result = session.run("""
+            async with self.driver.session() as session:
+                result = await session.run("""
                     MATCH (m:IntelligentMemory)
                     WHERE m.user_id = $user_id 
                     AND m.quality_score IS NULL
@@ -439,64 +530,52 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                     'limit': limit
                 })
                 
-                return [{'memory_id': record['memory_id'], 'content': record['content']} for record in result]
+                return [{'memory_id': record['memory_id'], 'content': record['content']} async for record in result]
                 
         except Exception as e:
             print(f"Error getting unscored memories: {e}")
             return []
     
     async def retrieve_memory(self, query: str, user_id: str, conversation_id: Optional[str], 
-                            limit: int = 5) -> str:
-        """Intelligent memory retrieval using hybrid approach"""
+                            limit: int = 5) -> MemoryRetrieval:
+        """Intelligent memory retrieval using hybrid approach.
+        
+        The query embedding is returned with the context so the caller can store the same
+        message later without embedding it again.
+        """
         
         # Classify intent
         intent = self.router.classify_intent(query)
         
         # Skip memory retrieval for general knowledge queries
         if not self.router.should_use_memory(intent):
-            return ""
+            return MemoryRetrieval()
         
         # Generate query embedding
-        query_embedding = self.generate_embedding(query)
+        query_embedding = await self.generate_embedding(query)
         if not query_embedding:
-            return ""
+            return MemoryRetrieval()
+        
+        await self._setup_vector_index()
         
         try:
-            with self.driver.session() as session:
-                # Search raw memories with RIAI quality boost
-                memories = []
-                
+            # Search raw memories with RIAI quality boost, in-process when the user's shard is warm
+            memories = []
+            memory_records = self.memory_index.search(user_id, query_embedding, limit)
+            
+            async with self.driver.session() as session:
                 # Search memories with quality-boosted scoring
-                memory_result = session.run("""
-                    CALL db.index.vector.queryNodes('memory_embedding_index', $limit, $query_embedding)
-                    YIELD node, score
-                    WHERE node.user_id = $user_id AND score > 0.3
-                    RETURN node.content AS content, 
-                           score, 
-                           'memory' as type,
-                           node.final_quality_score AS final_quality_score,
-                           CASE 
-                               WHEN node.final_quality_score IS NOT NULL 
-                               THEN node.final_quality_score * 0.2 + score * 0.8
-                               ELSE score
-                           END AS boosted_score
-                    ORDER BY boosted_score DESC
-                """, {
-                    'query_embedding': query_embedding,
-                    'user_id': user_id,
-                    'limit': limit
-                })
+                if memory_records is None:
+                    memory_records = await self._search_memories(session, query_embedding, user_id, limit)
                 
-                for record in memory_result:
+                for record in memory_records:
                     content = record['content']
                     score = record['score']
                     memories.append(f"Previous message: {content}")
                 
-
-                
                 # Also get recent conversation context if no semantic matches
                 if not memories and conversation_id:
-                    recent_result = session.run("""
+                    recent_result = await session.run("""
                         MATCH (m:IntelligentMemory)
                         WHERE m.user_id = $user_id 
                         AND m.conversation_id = $conversation_id
@@ -509,7 +588,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                         'conversation_id': conversation_id
                     })
                     
-                    for record in recent_result:
+                    async for record in recent_result:
                         msg_type = record['type']
                         content = record['content']
                         if msg_type == 'user':
@@ -517,11 +596,151 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                         else:
                             memories.append(f"You previously responded: {content}")
                 
-                return "\n".join(memories) if memories else ""
+                return MemoryRetrieval("\n".join(memories) if memories else "", query_embedding)
                 
         except Exception as e:
             print(f"Error retrieving memories: {e}")
-            return ""
+            return MemoryRetrieval(query_embedding=query_embedding)
+    
+    def _compact_row(self, row: Dict) -> Dict:
+        """Swap a memory's full embedding for its int8 copy and truncated search vector"""
+        embedding_q8, embedding_scale = quantize_int8(row['embedding'])
+        return {
+            **row,
+            'embedding': None,
+            'embedding_q8': embedding_q8,
+            'embedding_scale': embedding_scale,
+            'embedding_search': truncate(row['embedding'], self.search_dimensions)
+        }
+    
+    async def _query_user_vectors(self, session, tail: str, params: Dict, wanted: int) -> List[Dict]:
+        """Run a vector search restricted to one user's memories, finished by the given Cypher tail"""
+        if self.search_mode == "oversample":
+            # Grow k until the user's partition yields enough hits or the cap is reached
+            k = wanted * self.oversample_factor
+            while True:
+                result = await session.run(f"""
+                    CALL db.index.vector.queryNodes('{self.vector_index_name}', $k, $query_embedding)
+                    YIELD node, score
+                    WHERE node.user_id = $user_id
+                """ + tail, {**params, 'k': k})
+                records = [record.data() async for record in result]
+                if len(records) >= wanted or k >= self.oversample_max_k:
+                    return records
+                k = min(k * 4, self.oversample_max_k)
+        
+        # Exact scan of the user's own memories via the user_id index
+        result = await session.run(f"""
+            MATCH (node:IntelligentMemory {{user_id: $user_id}})
+            WHERE node.{self.vector_property} IS NOT NULL
+            WITH node, vector.similarity.cosine(node.{self.vector_property}, $query_embedding) AS score
+        """ + tail, params)
+        return [record.data() async for record in result]
+    
+    async def _search_memories(self, session, query_embedding: List[float], user_id: str, limit: int) -> List[Dict]:
+        """Semantic search restricted to one user's memories"""
+        if self.embedding_storage == "compact":
+            return await self._search_compact_memories(session, query_embedding, user_id, limit)
+        
+        # Keep the top candidates by similarity, then apply the RIAI boost
+        return await self._query_user_vectors(session, """
+            WITH node, score
+            WHERE score > 0.3
+            ORDER BY score DESC
+            LIMIT $limit
+            RETURN node.content AS content,
+                   score,
+                   'memory' as type,
+                   node.final_quality_score AS final_quality_score,
+                   CASE 
+                       WHEN node.final_quality_score IS NOT NULL 
+                       THEN node.final_quality_score * 0.2 + score * 0.8
+                       ELSE score
+                   END AS boosted_score
+            ORDER BY boosted_score DESC
+        """, {
+            'query_embedding': query_embedding,
+            'user_id': user_id,
+            'limit': limit
+        }, limit)
+    
+    async def _search_compact_memories(self, session, query_embedding: List[float], user_id: str, limit: int) -> List[Dict]:
+        """Coarse search on truncated vectors, then re-rank the candidates against the full query"""
+        candidates = await self._query_user_vectors(session, """
+            WITH node, score
+            ORDER BY score DESC
+            LIMIT $limit
+            RETURN node.content AS content,
+                   node.final_quality_score AS final_quality_score,
+                   node.embedding_q8 AS embedding_q8,
+                   node.embedding_scale AS embedding_scale
+        """, {
+            'query_embedding': truncate(query_embedding, self.search_dimensions),
+            'user_id': user_id,
+            'limit': limit * self.rerank_factor
+        }, limit * self.rerank_factor)
+        
+        results = []
+        for candidate in candidates:
+            if candidate['embedding_q8'] is None:
+                continue
+            score = cosine_score(query_embedding, dequantize_int8(candidate['embedding_q8'], candidate['embedding_scale']))
+            if score <= 0.3:
+                continue
+            quality = candidate['final_quality_score']
+            results.append({
+                'content': candidate['content'],
+                'score': score,
+                'type': 'memory',
+                'final_quality_score': quality,
+                'boosted_score': quality * 0.2 + score * 0.8 if quality is not None else score
+            })
+        
+        results.sort(key=lambda result: result['score'], reverse=True)
+        results = results[:limit]
+        results.sort(key=lambda result: result['boosted_score'], reverse=True)
+        return results
+    
+    async def _load_user_memories(self, user_id: str) -> List[Dict]:
+        """Read one user's embedded memories for the in-process index"""
+        async with self.driver.session() as session:
+            result = await session.run("""
+                MATCH (m:IntelligentMemory {user_id: $user_id})
+                WHERE m.embedding IS NOT NULL OR m.embedding_q8 IS NOT NULL
+                RETURN m.id AS id,
+                       m.content AS content,
+                       m.conversation_id AS conversation_id,
+                       m.embedding AS embedding,
+                       m.embedding_q8 AS embedding_q8,
+                       m.embedding_scale AS embedding_scale,
+                       m.final_quality_score AS final_quality_score
+            """, {'user_id': user_id})
+            records = [record.data() async for record in result]
+        
+        # Compact nodes only carry the int8 copy, which is close enough for the in-process mirror
+        for record in records:
+            if record['embedding'] is None:
+                record['embedding'] = dequantize_int8(record['embedding_q8'], record['embedding_scale'])
+        return records
+    
+    async def warm_memory_index(self):
+        """Hydrate the in-process index for the most recently active users"""
+        if not self.memory_index.enabled:
+            return
+        try:
+            async with self.driver.session() as session:
+                result = await session.run("""
+                    MATCH (m:IntelligentMemory)
+                    WITH m.user_id AS user_id, max(m.timestamp) AS last_seen
+                    RETURN user_id
+                    ORDER BY last_seen DESC
+                    LIMIT $limit
+                """, {'limit': int(os.getenv("MEMORY_INDEX_WARM_USERS", "50"))})
+                user_ids = [record['user_id'] async for record in result]
+            await self.memory_index.warm(user_ids)
+            print(f"✅ Memory index warmed for {len(user_ids)} users")
+        except Exception as e:
+            print(f"Memory index warm-up skipped: {e}")
     
     async def extract_facts_from_response(self, dialogue: str) -> List[Dict]:
         """Extract structured facts from conversation (simple regex approach)"""
@@ -564,8 +783,8 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                 # For assistant messages, we need the user query to evaluate properly
                 try:
                     # Get the user message that preceded this assistant response
-                    with self.driver.session() as session:
-                        result = session.run("""
+                    async with self.driver.session() as session:
+                        result = await session.run("""
                             MATCH (user_msg:IntelligentMemory)
                             WHERE user_msg.user_id = $user_id 
                             AND user_msg.message_type = 'user'
@@ -582,7 +801,7 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
                             'memory_id': memory_id
                         })
                         
-                        user_record = result.single()
+                        user_record = await result.single()
                         if user_record:
                             user_query = user_record['user_query']
                             
@@ -617,10 +836,35 @@ Return only the numeric score as a decimal (e.g., 7.5):"""
             print(f"Background scoring error: {e}")
             return {'total_unscored': 0, 'scored': 0, 'failed': 0}
     
-    def close(self):
-        """Close database connection"""
+    async def delete_conversation_memories(self, user_id: str, conversation_ids: List[str]) -> int:
+        """Delete all memories belonging to the given conversations, one UNWIND statement per batch"""
+        deleted_count = 0
+        async with self.driver.session() as session:
+            for start in range(0, len(conversation_ids), self.delete_batch_size):
+                result = await session.run("""
+                    UNWIND $conversation_ids AS conversation_id
+                    MATCH (m:IntelligentMemory {conversation_id: conversation_id})
+                    WHERE m.user_id = $user_id
+                    DELETE m
+                    RETURN count(*) AS deleted_count
+                """, {'user_id': user_id, 'conversation_ids': conversation_ids[start:start + self.delete_batch_size]})
+                record = await result.single()
+                deleted_count += record['deleted_count'] if record else 0
+        self.memory_index.remove_conversations(user_id, conversation_ids)
+        return deleted_count
+    
+    async def clear_all(self):
+        """Delete every node and relationship in the memory graph"""
+        async with self.driver.session() as session:
+            result = await session.run("MATCH (n) DETACH DELETE n")
+            await result.consume()
+        self.memory_index.clear()
+    
+    async def close(self):
+        """Close database connection and embedding client"""
         if self.driver:
-            self.driver.close()
+            await self.driver.close()
+        await self.embedding_service.close()
 
 # Global instance
 intelligent_memory = IntelligentMemorySystem()
\ No newline at end of file
@@ -1,28 +1,72 @@
 from fastapi import FastAPI, HTTPException, Form, Request, UploadFile, File
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, JSONResponse, Response
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse, JSONResponse, Response, StreamingResponse
 from starlette.middleware.sessions import SessionMiddleware
 # Memory API removed - using intelligent_memory directly
 from pydantic import BaseModel
 import uvicorn
 import os
+import json
+import asyncio
 import httpx
 import hashlib
 import uuid
-import psycopg2
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager, aclosing
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime
 from passlib.context import CryptContext
+from database import db_pool, async_db, run_db
+from migrations import run_migrations
+from deletion_jobs import DeletionJobRunner
+from data_versions import data_versions, TOPICS, CONVERSATIONS, MESSAGES, FILES, PROFILE
+from http_cache import CacheRule, HTTPCache, HTTPCacheMiddleware
+from result_cache import result_cache
+from model_service import model_service
+from session_backend import session_backend
 
 # Use environment variables
 SECRET_KEY = os.getenv("SECRET_KEY", "default-secret")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# How long browsers may reuse /api/models before revalidating with the ETag
+MODEL_CATALOG_MAX_AGE = int(os.getenv("MODEL_CATALOG_MAX_AGE", "300"))
+# Characters of the latest message kept on each conversation for the sidebar
+CONVERSATION_PREVIEW_LENGTH = 200
 
 # Initialize password context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and release shared resources when the application shuts down"""
+    if memory_ingest_queue:
+        try:
+            await memory_ingest_queue.start()
+        except Exception as e:
+            print(f"❌ Failed to start memory ingestion queue: {e}")
+    try:
+        await deletion_jobs.start()
+    except Exception as e:
+        print(f"❌ Failed to start deletion job worker: {e}")
+    session_sweeper = asyncio.create_task(sweep_expired_sessions())
+    # Load the model catalog before the first page asks for it
+    model_service.refresh_catalog_in_background()
+    # Warm the in-process memory index in the background so startup is not held up by Neo4j
+    index_warmup = asyncio.create_task(intelligent_memory_system.warm_memory_index()) if intelligent_memory_system else None
+    yield
+    session_sweeper.cancel()
+    if index_warmup:
+        index_warmup.cancel()
+    if memory_ingest_queue:
+        await memory_ingest_queue.stop()
+    await deletion_jobs.stop()
+    if intelligent_memory_system:
+        await intelligent_memory_system.close()
+    await model_service.close()
+    async_db.shutdown()
+
 # Create FastAPI application
-app = FastAPI(title="NeuroLM Memory System", version="1.0.0")
+app = FastAPI(title="NeuroLM Memory System", version="1.0.0", lifespan=lifespan)
 
 # Add session middleware
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
@@ -32,109 +76,44 @@ app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 # Mount static files for PWA
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Global session storage (in production, use Redis or database)
-user_sessions = {}
-
-# Database session management functions
-def create_session(user_id: str, username: str) -> Optional[str]:
-    """Create a new session in the database and return session_id"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        session_id = str(uuid.uuid4())
-        expires_at = datetime.now() + timedelta(hours=24)  # 24 hour expiry
-        
-        cursor.execute('''
-            INSERT INTO sessions (session_id, user_id, username, expires_at)
-            VALUES (%s, %s, %s, %s)
-        ''', (session_id, user_id, username, expires_at))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return session_id
-    except Exception as e:
-        print(f"Error creating session: {e}")
-        return None
-
-def get_session(session_id: str) -> Optional[Dict]:
-    """Get session data from database if valid and not expired"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT user_id, username, expires_at FROM sessions 
-            WHERE session_id = %s AND expires_at > NOW()
-        ''', (session_id,))
-        
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if result:
-            return {
-                'user_id': result[0],
-                'username': result[1]
-            }
-        return None
-    except Exception as e:
-        print(f"Error getting session: {e}")
-        return None
-
-def delete_session(session_id: str) -> bool:
-    """Delete a session from the database"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM sessions WHERE session_id = %s', (session_id,))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True
-    except Exception as e:
-        print(f"Error deleting session: {e}")
-        return False
-
-def cleanup_expired_sessions():
-    """Remove expired sessions from database"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM sessions WHERE expires_at <= NOW()')
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        return True
-    except Exception as e:
-        print(f"Error cleaning up sessions: {e}")
-        return False
-
-def get_authenticated_user(request: Request) -> Optional[Dict]:
-    """Get authenticated user from database session"""
+async def get_authenticated_user(request: Request) -> Optional[Dict]:
+    """Get authenticated user from the configured session backend"""
     session_id = request.cookies.get("session_id")
     if not session_id:
         return None
-    
-    # Use database session only
-    return get_session(session_id)
+
+    return await session_backend.authenticate(session_id)
+
+# Per-user GETs the frontends poll; their ETags follow the data versions the write helpers bump
+http_cache = HTTPCache([
+    CacheRule(r"/api/topics", [TOPICS]),
+    CacheRule(r"/api/conversations", [CONVERSATIONS]),
+    CacheRule(r"/api/conversations/[^/]+/messages(/all)?", [MESSAGES]),
+    CacheRule(r"/api/user/name", [PROFILE]),
+    CacheRule(r"/api/user-files", [FILES])
+], data_versions, get_authenticated_user)
+app.add_middleware(HTTPCacheMiddleware, cache=http_cache)
+
+async def sweep_expired_sessions():
+    """Periodically purge expired sessions (or sync revoked tokens) for the session backend"""
+    while True:
+        try:
+            await session_backend.sweep()
+        except Exception as e:
+            print(f"Session sweep error: {e}")
+        await asyncio.sleep(session_backend.sweep_interval)
 
 # Initialize intelligent memory system globally
 intelligent_memory_system = None
+memory_ingest_queue = None
 try:
-    from intelligent_memory import IntelligentMemorySystem
+    from intelligent_memory import intelligent_memory
+    from memory_queue import MemoryIngestionQueue
     from background_riai import process_riai_batch
     from tool_generator import ToolGenerator
     from tool_executor import ToolExecutor
-    intelligent_memory_system = IntelligentMemorySystem()
+    intelligent_memory_system = intelligent_memory
+    memory_ingest_queue = MemoryIngestionQueue(intelligent_memory_system)
     tool_generator = ToolGenerator()
     tool_executor = ToolExecutor()
     print("✅ Intelligent memory system initialized")
@@ -142,118 +121,23 @@ try:
 except Exception as e:
     print(f"❌ Failed to initialize intelligent memory: {e}")
     intelligent_memory_system = None
+    memory_ingest_queue = None
 
 # Memory summarizer removed - replaced by RIAI quality-boosted retrieval
 
+# Conversation, sub-topic and topic deletion run as background jobs
+deletion_jobs = DeletionJobRunner(intelligent_memory_system)
+
 # Note: Sessions cleared on restart - users need to re-login
 
 def get_db_connection():
-    """Get PostgreSQL database connection"""
-    return psycopg2.connect(os.getenv("DATABASE_URL"))
+    """Check out a pooled PostgreSQL connection (use as a context manager)"""
+    return db_pool.connection()
 
 def init_file_storage():
-    """Initialize all database tables"""
+    """Bring the database schema up to date"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Create users table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id VARCHAR(255) PRIMARY KEY,
-                first_name VARCHAR(255) NOT NULL,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create conversations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                title VARCHAR(255) NOT NULL,
-                topic VARCHAR(255),
-                sub_topic VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                message_count INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create conversation messages table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversation_messages (
-                id SERIAL PRIMARY KEY,
-                conversation_id VARCHAR(255) NOT NULL,
-                message_type VARCHAR(50) NOT NULL,
-                content TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create user files table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_files (
-                id SERIAL PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                filename VARCHAR(255) NOT NULL,
-                content TEXT NOT NULL,
-                file_type VARCHAR(50),
-                uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create memory links table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS memory_links (
-                id SERIAL PRIMARY KEY,
-                source_memory_id VARCHAR(255) NOT NULL,
-                linked_topic VARCHAR(255) NOT NULL,
-                user_id VARCHAR(255) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create sessions table for persistent authentication
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                session_id VARCHAR(255) PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                username VARCHAR(255) NOT NULL,
-                expires_at TIMESTAMP NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create user_tools table for custom tool storage
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_tools (
-                id SERIAL PRIMARY KEY,
-                user_id VARCHAR(255) NOT NULL,
-                tool_name VARCHAR(255) NOT NULL,
-                function_code TEXT NOT NULL,
-                schema_json TEXT NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                is_active BOOLEAN DEFAULT TRUE,
-                usage_count INTEGER DEFAULT 0,
-                success_count INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                UNIQUE(user_id, tool_name)
-            )
-        ''')
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        run_migrations()
         print("✓ All database tables initialized successfully")
     except Exception as e:
         print(f"Error initializing database: {e}")
@@ -262,21 +146,20 @@ def init_file_storage():
 def store_user_tool(user_id: str, tool_name: str, function_code: str, schema_json: str, description: Optional[str] = None) -> bool:
     """Store a custom tool for a user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO user_tools (user_id, tool_name, function_code, schema_json, description)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (user_id, tool_name) 
-            DO UPDATE SET 
-                function_code = EXCLUDED.function_code,
-                schema_json = EXCLUDED.schema_json,
-                description = EXCLUDED.description,
-                created_at = CURRENT_TIMESTAMP
-        ''', (user_id, tool_name, function_code, schema_json, description or ""))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO user_tools (user_id, tool_name, function_code, schema_json, description)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (user_id, tool_name) 
+                DO UPDATE SET 
+                    function_code = EXCLUDED.function_code,
+                    schema_json = EXCLUDED.schema_json,
+                    description = EXCLUDED.description,
+                    created_at = CURRENT_TIMESTAMP
+            ''', (user_id, tool_name, function_code, schema_json, description or ""))
+            conn.commit()
+            cursor.close()
         return True
     except Exception as e:
         print(f"Error storing user tool: {e}")
@@ -285,28 +168,27 @@ def store_user_tool(user_id: str, tool_name: str, function_code: str, schema_jso
 def get_user_tools(user_id: str) -> List[Dict]:
     """Get all active tools for a user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT tool_name, function_code, schema_json, description, usage_count, success_count
-            FROM user_tools
-            WHERE user_id = %s AND is_active = TRUE
-            ORDER BY created_at DESC
-        ''', (user_id,))
-        
-        tools = []
-        for row in cursor.fetchall():
-            tools.append({
-                'tool_name': row[0],
-                'function_code': row[1],
-                'schema_json': row[2],
-                'description': row[3],
-                'usage_count': row[4],
-                'success_count': row[5]
-            })
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT tool_name, function_code, schema_json, description, usage_count, success_count
+                FROM user_tools
+                WHERE user_id = %s AND is_active = TRUE
+                ORDER BY created_at DESC
+            ''', (user_id,))
+        
+            tools = []
+            for row in cursor.fetchall():
+                tools.append({
+                    'tool_name': row[0],
+                    'function_code': row[1],
+                    'schema_json': row[2],
+                    'description': row[3],
+                    'usage_count': row[4],
+                    'success_count': row[5]
+                })
         
-        cursor.close()
-        conn.close()
+            cursor.close()
         return tools
     except Exception as e:
         print(f"Error getting user tools: {e}")
@@ -315,25 +197,24 @@ def get_user_tools(user_id: str) -> List[Dict]:
 def update_tool_usage(user_id: str, tool_name: str, success: bool = True) -> bool:
     """Update tool usage statistics"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        if success:
-            cursor.execute('''
-                UPDATE user_tools 
-                SET usage_count = usage_count + 1, success_count = success_count + 1
-                WHERE user_id = %s AND tool_name = %s
-            ''', (user_id, tool_name))
-        else:
-            cursor.execute('''
-                UPDATE user_tools 
-                SET usage_count = usage_count + 1
-                WHERE user_id = %s AND tool_name = %s
-            ''', (user_id, tool_name))
+            if success:
+                cursor.execute('''
+                    UPDATE user_tools 
+                    SET usage_count = usage_count + 1, success_count = success_count + 1
+                    WHERE user_id = %s AND tool_name = %s
+                ''', (user_id, tool_name))
+            else:
+                cursor.execute('''
+                    UPDATE user_tools 
+                    SET usage_count = usage_count + 1
+                    WHERE user_id = %s AND tool_name = %s
+                ''', (user_id, tool_name))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
         return True
     except Exception as e:
         print(f"Error updating tool usage: {e}")
@@ -348,9 +229,6 @@ init_file_storage()
 def create_conversation(user_id: str, title: Optional[str] = None, topic: Optional[str] = None, sub_topic: Optional[str] = None) -> Optional[str]:
     """Create a new conversation and return its ID"""
     try:
-        # Clean up any placeholder conversations for this topic/subtopic before creating real one
-        cleanup_placeholder_conversations(user_id, topic, sub_topic)
-        
         conversation_id = str(uuid.uuid4())
         if not title:
             title = "New Conversation"
@@ -361,15 +239,15 @@ def create_conversation(user_id: str, title: Optional[str] = None, topic: Option
         topic = topic.lower().strip() if topic else "general"
         sub_topic = sub_topic.lower().strip() if sub_topic else None
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (conversation_id, user_id, title, topic, sub_topic, datetime.now(), datetime.now(), 0))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ''', (conversation_id, user_id, title, topic, sub_topic, datetime.now(), datetime.now(), 0))
+            conn.commit()
+            cursor.close()
+        data_versions.bump(user_id, CONVERSATIONS, TOPICS)
         return conversation_id
     except Exception as e:
         print(f"Error creating conversation: {e}")
@@ -378,227 +256,302 @@ def create_conversation(user_id: str, title: Optional[str] = None, topic: Option
 def update_conversation_topic(conversation_id: str, topic: Optional[str] = None, sub_topic: Optional[str] = None) -> bool:
     """Update the topic and sub-topic of an existing conversation"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            UPDATE conversations 
-            SET topic = %s, sub_topic = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """, (topic, sub_topic, conversation_id))
+            cursor.execute("""
+                UPDATE conversations 
+                SET topic = %s, sub_topic = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                RETURNING user_id
+            """, (topic, sub_topic, conversation_id))
         
-        success = cursor.rowcount > 0
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return success
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        if row:
+            data_versions.bump(row[0], CONVERSATIONS, TOPICS)
+        return row is not None
     except Exception as e:
         print(f"Error updating conversation topic: {e}")
         return False
 
-def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic: Optional[str] = None, sub_topic: Optional[str] = None) -> Dict:
-    """Get paginated conversations for a user with previews, optionally filtered by topic/subtopic"""
-    try:
-        conn = get_db_connection()
+CONVERSATION_COLUMNS = 'c.id, c.title, c.topic, c.sub_topic, c.created_at, c.updated_at, c.message_count, c.last_message, c.last_message_type'
+
+def conversation_from_row(row) -> Dict:
+    """Shape a CONVERSATION_COLUMNS row for the API"""
+    return {
+        'id': row[0],
+        'title': row[1],
+        'topic': row[2],
+        'sub_topic': row[3],
+        'created_at': row[4].isoformat(),
+        'updated_at': row[5].isoformat(),
+        'message_count': row[6],
+        'last_message': row[7],
+        'last_message_type': row[8]
+    }
+
+def encode_conversation_cursor(updated_at: datetime, conversation_id: str) -> str:
+    return f"{updated_at.isoformat()}|{conversation_id}"
+
+def decode_conversation_cursor(cursor_value: str) -> Tuple[datetime, str]:
+    updated_at, conversation_id = cursor_value.split('|', 1)
+    return datetime.fromisoformat(updated_at), conversation_id
+
+# Hot query text lives in constants so test_query_plans.py can EXPLAIN exactly what runs here
+CONVERSATION_COUNT_SQL = "SELECT COUNT(*) FROM conversations c WHERE {where}"
+
+# The preview is kept on the row by save_conversation_message
+CONVERSATION_PAGE_SQL = f'''
+    SELECT {CONVERSATION_COLUMNS}
+    FROM conversations c
+    WHERE {{where}}
+    ORDER BY c.updated_at DESC, c.id DESC
+    LIMIT %s OFFSET %s
+'''
+
+CONVERSATION_KEYSET_CONDITION = '(c.updated_at, c.id) < (%s, %s)'
+
+def conversation_filters(user_id: str, topic: Optional[str], sub_topic: Optional[str]) -> Tuple[List[str], List]:
+    """WHERE conditions and params selecting a user's conversations, optionally by topic/subtopic"""
+    where_conditions = ['c.user_id = %s']
+    params = [user_id]
+    
+    if topic is not None:
+        # Normalize topic for consistent filtering
+        where_conditions.append('c.topic = %s')
+        params.append(topic.lower().strip())
+    
+    if sub_topic is not None:
+        # Normalize sub_topic for consistent filtering
+        where_conditions.append('c.sub_topic = %s')
+        params.append(sub_topic.lower().strip())
+    
+    return where_conditions, params
+
+def query_user_conversations(user_id: str, limit: int, offset: int, topic: Optional[str], sub_topic: Optional[str],
+                             after: Optional[Tuple[datetime, str]], include_total: bool) -> Dict:
+    """Query a page of conversations; raises on database errors"""
+    where_conditions, params = conversation_filters(user_id, topic, sub_topic)
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        
-        # Build WHERE clause for filtering
-        where_conditions = ['c.user_id = %s']
-        params = [user_id]
-        
-        if topic is not None:
-            # Normalize topic for consistent filtering
-            topic = topic.lower().strip()
-            where_conditions.append('c.topic = %s')
-            params.append(topic)
-            
-        if sub_topic is not None:
-            # Normalize sub_topic for consistent filtering
-            sub_topic = sub_topic.lower().strip()
-            where_conditions.append('c.sub_topic = %s')
-            params.append(sub_topic)
-        
-        where_clause = ' AND '.join(where_conditions)
-        
-        # Get total count with filtering
-        count_query = f'SELECT COUNT(*) FROM conversations c WHERE {where_clause}'
-        cursor.execute(count_query, params)
-        count_result = cursor.fetchone()
-        total_count = count_result[0] if count_result and count_result[0] is not None else 0
-        
-        # Get paginated conversations with latest message preview and filtering
-        main_query = f'''
-            SELECT c.id, c.title, c.topic, c.sub_topic, c.created_at, c.updated_at, c.message_count,
-                   m.content as last_message, m.message_type as last_message_type
-            FROM conversations c
-            LEFT JOIN LATERAL (
-                SELECT content, message_type 
-                FROM conversation_messages 
-                WHERE conversation_id = c.id 
-                ORDER BY created_at DESC 
-                LIMIT 1
-            ) m ON true
-            WHERE {where_clause}
-            ORDER BY c.updated_at DESC
-            LIMIT %s OFFSET %s
-        '''
-        
-        cursor.execute(main_query, params + [limit, offset])
-        
-        conversations = []
-        for row in cursor.fetchall():
-            conversations.append({
-                'id': row[0],
-                'title': row[1],
-                'topic': row[2],
-                'sub_topic': row[3],
-                'created_at': row[4].isoformat(),
-                'updated_at': row[5].isoformat(),
-                'message_count': row[6],
-                'last_message': row[7],
-                'last_message_type': row[8]
-            })
-        
+    
+        total_count = None
+        if include_total:
+            cursor.execute(CONVERSATION_COUNT_SQL.format(where=' AND '.join(where_conditions)), params)
+            total_count = cursor.fetchone()[0]
+    
+        if after:
+            where_conditions.append(CONVERSATION_KEYSET_CONDITION)
+            params.extend(after)
+            offset = 0
+    
+        # One extra row tells us whether more exist
+        cursor.execute(CONVERSATION_PAGE_SQL.format(where=' AND '.join(where_conditions)), params + [limit + 1, offset])
+    
+        rows = cursor.fetchall()
         cursor.close()
-        conn.close()
-        
-        return {
-            'conversations': conversations,
-            'total_count': total_count,
-            'has_more': offset + limit < total_count,
-            'next_offset': offset + limit if offset + limit < total_count else None
-        }
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last = rows[-1] if rows else None
+    return {
+        'conversations': [conversation_from_row(row) for row in rows],
+        'total_count': total_count,
+        'has_more': has_more,
+        'next_cursor': encode_conversation_cursor(last[5], last[0]) if has_more else None,
+        'next_offset': offset + limit if has_more and not after else None
+    }
+
+def fetch_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic: Optional[str] = None,
+                             sub_topic: Optional[str] = None, cursor_value: Optional[str] = None,
+                             include_total: bool = False) -> Dict:
+    """Get a page of conversations for a user with previews, optionally filtered by topic/subtopic.
+
+    Pages are keyed on (updated_at, id): pass the previous page's next_cursor as cursor_value. offset is
+    still accepted for older clients. The total is only counted when include_total is set.
+    Pages are served from the result cache until the user's conversations change.
+    Raises ValueError for a malformed cursor and lets database errors through.
+    """
+    after = decode_conversation_cursor(cursor_value) if cursor_value else None
+    return result_cache.get_or_compute(
+        user_id, 'conversations', (limit, offset, topic, sub_topic, cursor_value, include_total), [CONVERSATIONS],
+        query_user_conversations, user_id, limit, offset, topic, sub_topic, after, include_total
+    )
+
+def get_user_conversations(user_id: str, limit: int = 20, offset: int = 0, topic: Optional[str] = None, sub_topic: Optional[str] = None,
+                           cursor_value: Optional[str] = None, include_total: bool = False) -> Dict:
+    """Like fetch_user_conversations, but an empty page on database errors; raises ValueError for a malformed cursor"""
+    if cursor_value:
+        decode_conversation_cursor(cursor_value)
+    try:
+        return fetch_user_conversations(user_id, limit, offset, topic, sub_topic, cursor_value, include_total)
     except Exception as e:
         print(f"Error getting conversations: {e}")
-        return {'conversations': [], 'total_count': 0, 'has_more': False, 'next_offset': None}
+        return {'conversations': [], 'total_count': None, 'has_more': False, 'next_cursor': None, 'next_offset': None}
 
-def save_conversation_message(conversation_id: str, message_type: str, content: str):
-    """Save a message to a conversation"""
+def get_user_conversation(user_id: str, conversation_id: str) -> Optional[Dict]:
+    """Get one conversation with its preview if it belongs to the user"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Insert message and return the generated ID
-        cursor.execute('''
-            INSERT INTO conversation_messages (conversation_id, message_type, content, created_at)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        ''', (conversation_id, message_type, content, datetime.now()))
-        
-        result = cursor.fetchone()
-        if not result:
-            raise Exception("Failed to insert message")
-        message_id = result[0]
-        
-        # Update conversation message count and timestamp
-        cursor.execute('''
-            UPDATE conversations 
-            SET message_count = message_count + 1, updated_at = %s
-            WHERE id = %s
-        ''', (datetime.now(), conversation_id))
-        
-        # Update conversation title if it's the first user message
-        if message_type == 'user':
-            cursor.execute('SELECT message_count FROM conversations WHERE id = %s', (conversation_id,))
-            count_result = cursor.fetchone()
-            if count_result and count_result[0] is not None and count_result[0] == 1:  # First message, update title
-                title = content[:50] + "..." if len(content) > 50 else content
-                cursor.execute('UPDATE conversations SET title = %s WHERE id = %s', (title, conversation_id))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return message_id
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {CONVERSATION_COLUMNS} FROM conversations c
+                WHERE c.id = %s AND c.user_id = %s
+            ''', (conversation_id, user_id))
+            row = cursor.fetchone()
+            cursor.close()
+        return conversation_from_row(row) if row else None
     except Exception as e:
-        print(f"Error saving message: {e}")
+        print(f"Error getting conversation: {e}")
         return None
 
-def get_conversation_messages(conversation_id: str, limit: int = 30, before_id: Optional[str] = None) -> Dict:
-    """Get paginated messages for a conversation"""
+def user_owns_conversation(user_id: str, conversation_id: str) -> bool:
+    """Check a conversation belongs to the user with a primary-key lookup"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get total message count
-        cursor.execute('SELECT COUNT(*) FROM conversation_messages WHERE conversation_id = %s', (conversation_id,))
-        count_result = cursor.fetchone()
-        total_count = count_result[0] if count_result and count_result[0] is not None else 0
-        
-        if before_id:
-            # Load messages before a specific message ID
-            cursor.execute('''
-                SELECT m1.id, m1.message_type, m1.content, m1.created_at
-                FROM conversation_messages m1
-                JOIN conversation_messages m2 ON m2.id = %s AND m2.conversation_id = %s
-                WHERE m1.conversation_id = %s AND m1.created_at < m2.created_at
-                ORDER BY m1.created_at DESC
-                LIMIT %s
-            ''', (before_id, conversation_id, conversation_id, limit))
-            
-            # Reverse to get chronological order
-            rows = list(reversed(cursor.fetchall()))
-        else:
-            # Load most recent messages
-            cursor.execute('''
-                SELECT id, message_type, content, created_at
-                FROM conversation_messages
-                WHERE conversation_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            ''', (conversation_id, limit))
-            
-            # Reverse to get chronological order
-            rows = list(reversed(cursor.fetchall()))
-        
-        messages = []
-        for row in rows:
-            messages.append({
-                'id': str(row[0]),
-                'message_type': row[1],
-                'content': row[2],
-                'created_at': row[3].isoformat()
-            })
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM conversations WHERE id = %s AND user_id = %s', (conversation_id, user_id))
+            owned = cursor.fetchone() is not None
+            cursor.close()
+        return owned
+    except Exception as e:
+        print(f"Error checking conversation ownership: {e}")
+        return False
+
+def save_conversation_messages(conversation_id: str, messages: List[Tuple[str, str]]) -> List[Optional[int]]:
+    """Save (message_type, content) pairs to a conversation in one statement; returns their message IDs.
+
+    The conversation's message count, timestamp and preview are updated in the same statement, and a
+    conversation whose first message is from the user takes its title from that message.
+    """
+    try:
+        now = datetime.now()
+        first_type, first_content = messages[0]
+        last_type, last_content = messages[-1]
+        title = None
+        if first_type == 'user':
+            title = first_content[:50] + "..." if len(first_content) > 50 else first_content
+        
+        params = {
+            'conversation_id': conversation_id,
+            'now': now,
+            'count': len(messages),
+            'title': title,
+            'preview': last_content[:CONVERSATION_PREVIEW_LENGTH],
+            'preview_type': last_type
+        }
+        rows = []
+        for i, (message_type, content) in enumerate(messages):
+            params[f'type_{i}'] = message_type
+            params[f'content_{i}'] = content
+            rows.append(f'(%(conversation_id)s, %(type_{i})s, %(content_{i})s, %(now)s)')
         
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if there are more messages before the oldest returned message
-        has_more = False
-        if messages:
-            oldest_id = messages[0]['id']
-            cursor = get_db_connection().cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM conversation_messages 
-                WHERE conversation_id = %s AND created_at < (
-                    SELECT created_at FROM conversation_messages WHERE id = %s
+            # The UPDATE sees the count from before this statement, so message_count = 0 means these are the first messages
+            cursor.execute(f'''
+                WITH inserted AS (
+                    INSERT INTO conversation_messages (conversation_id, message_type, content, created_at)
+                    VALUES {', '.join(rows)}
+                    RETURNING id
+                ),
+                updated AS (
+                    UPDATE conversations
+                    SET message_count = message_count + %(count)s,
+                        updated_at = %(now)s,
+                        last_message = %(preview)s,
+                        last_message_type = %(preview_type)s,
+                        title = CASE WHEN message_count = 0 AND %(title)s::text IS NOT NULL THEN %(title)s ELSE title END
+                    WHERE id = %(conversation_id)s
+                    RETURNING user_id
                 )
-            ''', (conversation_id, oldest_id))
-            more_result = cursor.fetchone()
-            has_more = more_result[0] > 0 if more_result and more_result[0] is not None else False
-            cursor.close()
+                SELECT id, (SELECT user_id FROM updated) FROM inserted ORDER BY id
+            ''', params)
         
-        return {
-            'messages': messages,
-            'total_count': total_count,
-            'has_more': has_more,
-            'oldest_id': str(messages[0]['id']) if messages else None
-        }
+            # Serial IDs are assigned in VALUES order
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+        data_versions.bump(rows[0][1], CONVERSATIONS, MESSAGES)
+        return [row[0] for row in rows]
     except Exception as e:
-        print(f"Error getting messages: {e}")
-        return {'messages': [], 'total_count': 0, 'has_more': False, 'oldest_id': None}
+        print(f"Error saving messages: {e}")
+        return [None] * len(messages)
 
-def get_conversation_messages_all(conversation_id: str) -> List[Dict]:
-    """Get all messages for a conversation (legacy function for backward compatibility)"""
-    try:
-        conn = get_db_connection()
+def save_conversation_message(conversation_id: str, message_type: str, content: str):
+    """Save a message to a conversation"""
+    return save_conversation_messages(conversation_id, [(message_type, content)])[0]
+
+def save_conversation_turn(conversation_id: str, user_message: str, assistant_message: str) -> Tuple[Optional[int], Optional[int]]:
+    """Save both sides of a chat turn in one transaction; returns (user_message_id, assistant_message_id)"""
+    user_message_id, assistant_message_id = save_conversation_messages(
+        conversation_id, [('user', user_message), ('assistant', assistant_message)]
+    )
+    return user_message_id, assistant_message_id
+
+# One range scan on (conversation_id, id); the extra row tells us whether older messages exist,
+# and the total comes from the conversation's maintained message_count
+MESSAGE_PAGE_SQL = '''
+    SELECT m.id, m.message_type, m.content, m.created_at, c.message_count
+    FROM conversations c
+    LEFT JOIN LATERAL (
+        SELECT id, message_type, content, created_at
+        FROM conversation_messages
+        WHERE conversation_id = c.id AND (%s::integer IS NULL OR id < %s)
+        ORDER BY id DESC
+        LIMIT %s
+    ) m ON TRUE
+    WHERE c.id = %s
+'''
+
+def fetch_conversation_messages(conversation_id: str, limit: int = 30, before_id: Optional[str] = None) -> Dict:
+    """Get a page of messages for a conversation, newest first from before_id (keyset on the serial id).
+    Raises ValueError for a non-numeric before_id and lets database errors through.
+    """
+    before = int(before_id) if before_id else None
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, message_type, content, created_at
-            FROM conversation_messages
-            WHERE conversation_id = %s
-            ORDER BY created_at ASC
-        ''', (conversation_id,))
-        
+        cursor.execute(MESSAGE_PAGE_SQL, (before, before, limit + 1, conversation_id))
+        rows = cursor.fetchall()
+        cursor.close()
+    
+    total_count = (rows[0][4] or 0) if rows else 0
+    rows = [row for row in rows if row[0] is not None]
+    has_more = len(rows) > limit
+    
+    # Reverse to get chronological order
+    messages = []
+    for row in reversed(rows[:limit]):
+        messages.append({
+            'id': str(row[0]),
+            'message_type': row[1],
+            'content': row[2],
+            'created_at': row[3].isoformat()
+        })
+    
+    return {
+        'messages': messages,
+        'total_count': total_count,
+        'has_more': has_more,
+        'oldest_id': messages[0]['id'] if messages else None
+    }
+
+MESSAGE_HISTORY_SQL = '''
+    SELECT id, message_type, content, created_at
+    FROM conversation_messages
+    WHERE conversation_id = %s
+    ORDER BY created_at ASC, id ASC
+'''
+
+def fetch_conversation_messages_all(conversation_id: str) -> List[Dict]:
+    """Get all messages for a conversation (legacy endpoint); raises on database errors"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(MESSAGE_HISTORY_SQL, (conversation_id,))
+    
         messages = []
         for row in cursor.fetchall():
             messages.append({
@@ -607,58 +560,57 @@ def get_conversation_messages_all(conversation_id: str) -> List[Dict]:
                 'content': row[2],
                 'created_at': row[3].isoformat()
             })
-        
+    
         cursor.close()
-        conn.close()
-        return messages
-    except Exception as e:
-        print(f"Error getting messages: {e}")
-        return []
-
-# Topic management functions
-def get_all_topics(user_id: str) -> Dict:
-    """Get all topics and sub-topics for a user"""
-    try:
-        conn = get_db_connection()
+    return messages
+
+TOPIC_TREE_SQL = '''
+    SELECT t.name, s.name
+    FROM topics t
+    LEFT JOIN subtopics s ON s.user_id = t.user_id AND s.topic = t.name
+    WHERE t.user_id = %s
+    ORDER BY t.name, s.name
+'''
+
+def query_all_topics(user_id: str) -> Dict:
+    """Query a user's topics with their sub-topics; raises on database errors"""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT topic, sub_topic
-            FROM conversations
-            WHERE user_id = %s AND topic IS NOT NULL
-            ORDER BY topic, sub_topic
-        ''', (user_id,))
-        
+        cursor.execute(TOPIC_TREE_SQL, (user_id,))
+    
         topics = {}
-        for row in cursor.fetchall():
-            topic = row[0]
-            sub_topic = row[1]
-            if topic not in topics:
-                topics[topic] = []
-            if sub_topic and sub_topic not in topics[topic]:
+        for topic, sub_topic in cursor.fetchall():
+            topics.setdefault(topic, [])
+            if sub_topic:
                 topics[topic].append(sub_topic)
-        
+    
         cursor.close()
-        conn.close()
-        return topics
+    return topics
+
+def fetch_all_topics(user_id: str) -> Dict:
+    """Get all topics and sub-topics for a user, from the result cache while they are unchanged; raises on database errors"""
+    return result_cache.get_or_compute(user_id, 'topics', (), [TOPICS], query_all_topics, user_id)
+
+def get_all_topics(user_id: str) -> Dict:
+    """Get all topics and sub-topics for a user, or an empty dict on database errors"""
+    try:
+        return fetch_all_topics(user_id)
     except Exception as e:
         print(f"Error getting topics: {e}")
         return {}
 
+SUB_TOPIC_COUNT_SQL = 'SELECT subtopic_count FROM topics WHERE user_id = %s AND name = %s'
+
 def get_sub_topic_count(user_id: str, topic: str) -> int:
     """Get count of sub-topics for a topic"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COUNT(DISTINCT sub_topic)
-            FROM conversations
-            WHERE user_id = %s AND topic = %s AND sub_topic IS NOT NULL
-        ''', (user_id, topic.lower()))
-        
-        count_result = cursor.fetchone()
-        count = count_result[0] if count_result and count_result[0] is not None else 0
-        cursor.close()
-        conn.close()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SUB_TOPIC_COUNT_SQL, (user_id, topic.lower().strip()))
+        
+            count_result = cursor.fetchone()
+            count = count_result[0] if count_result else 0
+            cursor.close()
         return count
     except Exception as e:
         print(f"Error getting sub-topic count: {e}")
@@ -668,158 +620,85 @@ def create_topic_entry(user_id: str, topic: str) -> bool:
     """Create a topic entry without a conversation"""
     try:
         topic = topic.lower().strip()
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if topic already exists
-        cursor.execute('''
-            SELECT COUNT(*) FROM conversations 
-            WHERE user_id = %s AND topic = %s
-        ''', (user_id, topic))
-        
-        exists_result = cursor.fetchone()
-        if exists_result and exists_result[0] is not None and exists_result[0] > 0:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO topics (user_id, name) VALUES (%s, %s)
+                ON CONFLICT (user_id, name) DO NOTHING
+            ''', (user_id, topic))
+            conn.commit()
             cursor.close()
-            conn.close()
-            return True  # Topic already exists
-        
-        # Create a placeholder conversation for the topic
-        conversation_id = str(uuid.uuid4())
-        cursor.execute('''
-            INSERT INTO conversations (id, user_id, title, topic, created_at, updated_at, message_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ''', (conversation_id, user_id, f"[Topic: {topic}]", topic, datetime.now(), datetime.now(), 0))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        data_versions.bump(user_id, TOPICS)
         return True
     except Exception as e:
         print(f"Error creating topic: {e}")
         return False
 
 def create_subtopic_entry(user_id: str, topic: str, sub_topic: str) -> bool:
-    """Create a sub-topic entry under an existing topic"""
+    """Create a sub-topic entry under an existing topic, keeping to the five sub-topic limit"""
     try:
         topic = topic.lower().strip()
         sub_topic = sub_topic.lower().strip()
         
-        # Check sub-topic limit
-        if get_sub_topic_count(user_id, topic) >= 5:
-            return False
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
+            # Locking the topic row makes the limit check and insert atomic
+            cursor.execute('''
+                SELECT subtopic_count FROM topics WHERE user_id = %s AND name = %s FOR UPDATE
+            ''', (user_id, topic))
+            topic_row = cursor.fetchone()
+            if not topic_row:
+                conn.rollback()
+                cursor.close()
+                return False
         
-        # Check if sub-topic already exists
-        cursor.execute('''
-            SELECT COUNT(*) FROM conversations 
-            WHERE user_id = %s AND topic = %s AND sub_topic = %s
-        ''', (user_id, topic, sub_topic))
+            cursor.execute('''
+                SELECT 1 FROM subtopics WHERE user_id = %s AND topic = %s AND name = %s
+            ''', (user_id, topic, sub_topic))
+            if cursor.fetchone() is None:
+                if topic_row[0] >= 5:
+                    conn.rollback()
+                    cursor.close()
+                    return False
+                cursor.execute('''
+                    INSERT INTO subtopics (user_id, topic, name) VALUES (%s, %s, %s)
+                ''', (user_id, topic, sub_topic))
         
-        subtopic_exists_result = cursor.fetchone()
-        if subtopic_exists_result and subtopic_exists_result[0] is not None and subtopic_exists_result[0] > 0:
+            conn.commit()
             cursor.close()
-            conn.close()
-            return True  # Sub-topic already exists
-        
-        # Create a placeholder conversation for the sub-topic
-        conversation_id = str(uuid.uuid4())
-        cursor.execute('''
-            INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (conversation_id, user_id, f"[Sub-topic: {topic} → {sub_topic}]", topic, sub_topic, datetime.now(), datetime.now(), 0))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        data_versions.bump(user_id, TOPICS)
         return True
     except Exception as e:
         print(f"Error creating sub-topic: {e}")
         return False
 
-def cleanup_placeholder_conversations(user_id: str, topic: Optional[str], sub_topic: Optional[str]) -> int:
-    """Remove placeholder conversations that match the topic/subtopic being used for real conversation"""
-    try:
-        if not topic:
-            return 0  # No cleanup needed if no topic specified
-            
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Normalize topic and sub_topic like the rest of the system
-        topic = topic.lower().strip()
-        sub_topic = sub_topic.lower().strip() if sub_topic else None
-        
-        # Find placeholder conversations that match exactly
-        # Placeholders have 0 messages and specific title patterns
-        if sub_topic:
-            # Looking for subtopic placeholder: [Sub-topic: topic → sub_topic]
-            placeholder_title = f"[Sub-topic: {topic} → {sub_topic}]"
-            cursor.execute('''
-                SELECT id FROM conversations 
-                WHERE user_id = %s AND topic = %s AND sub_topic = %s 
-                AND message_count = 0 AND title = %s
-            ''', (user_id, topic, sub_topic, placeholder_title))
-        else:
-            # Looking for topic placeholder: [Topic: topic]
-            placeholder_title = f"[Topic: {topic}]"
-            cursor.execute('''
-                SELECT id FROM conversations 
-                WHERE user_id = %s AND topic = %s AND sub_topic IS NULL 
-                AND message_count = 0 AND title = %s
-            ''', (user_id, topic, placeholder_title))
-        
-        placeholder_ids = [row[0] for row in cursor.fetchall()]
-        
-        # Delete the placeholder conversations
-        deleted_count = 0
-        for placeholder_id in placeholder_ids:
-            cursor.execute('DELETE FROM conversations WHERE id = %s', (placeholder_id,))
-            deleted_count += cursor.rowcount
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        if deleted_count > 0:
-            print(f"DEBUG: Cleaned up {deleted_count} placeholder conversation(s) for topic '{topic}'" + 
-                  (f" → '{sub_topic}'" if sub_topic else ""))
-        
-        return deleted_count
-        
-    except Exception as e:
-        print(f"Error cleaning up placeholder conversations: {e}")
-        return 0
-
 # Memory linking functions
 def create_memory_link(memory_id: str, linked_topic: str, user_id: str) -> bool:
     """Create a link between a memory and a topic"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Check if link already exists
-        cursor.execute('''
-            SELECT COUNT(*) FROM memory_links 
-            WHERE source_memory_id = %s AND linked_topic = %s AND user_id = %s
-        ''', (memory_id, linked_topic.lower(), user_id))
+            # Check if link already exists
+            cursor.execute('''
+                SELECT COUNT(*) FROM memory_links 
+                WHERE source_memory_id = %s AND linked_topic = %s AND user_id = %s
+            ''', (memory_id, linked_topic.lower(), user_id))
         
-        link_exists_result = cursor.fetchone()
-        if link_exists_result and link_exists_result[0] is not None and link_exists_result[0] > 0:
-            cursor.close()
-            conn.close()
-            return True  # Link already exists
+            link_exists_result = cursor.fetchone()
+            if link_exists_result and link_exists_result[0] is not None and link_exists_result[0] > 0:
+                cursor.close()
+                return True  # Link already exists
         
-        # Create new link
-        cursor.execute('''
-            INSERT INTO memory_links (source_memory_id, linked_topic, user_id, created_at)
-            VALUES (%s, %s, %s, %s)
-        ''', (memory_id, linked_topic.lower(), user_id, datetime.now()))
+            # Create new link
+            cursor.execute('''
+                INSERT INTO memory_links (source_memory_id, linked_topic, user_id, created_at)
+                VALUES (%s, %s, %s, %s)
+            ''', (memory_id, linked_topic.lower(), user_id, datetime.now()))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
         return True
     except Exception as e:
         print(f"Error creating memory link: {e}")
@@ -828,288 +707,293 @@ def create_memory_link(memory_id: str, linked_topic: str, user_id: str) -> bool:
 def remove_topic_links(current_topic: str, linked_topic: str, user_id: str) -> bool:
     """Remove all links between current topic and linked topic"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
         
-        # Remove links where memories from current_topic are linked to linked_topic
-        cursor.execute('''
-            DELETE FROM memory_links 
-            WHERE linked_topic = %s AND user_id = %s
-            AND source_memory_id IN (
-                SELECT DISTINCT m.id FROM conversations c
-                JOIN messages msg ON c.id = msg.conversation_id
-                JOIN neo4j_memories m ON m.user_id = %s
-                WHERE c.topic = %s
-            )
-        ''', (linked_topic.lower(), user_id, user_id, current_topic.lower()))
+            # Remove links where memories from current_topic are linked to linked_topic
+            cursor.execute('''
+                DELETE FROM memory_links 
+                WHERE linked_topic = %s AND user_id = %s
+                AND source_memory_id IN (
+                    SELECT DISTINCT m.id FROM conversations c
+                    JOIN messages msg ON c.id = msg.conversation_id
+                    JOIN neo4j_memories m ON m.user_id = %s
+                    WHERE c.topic = %s
+                )
+            ''', (linked_topic.lower(), user_id, user_id, current_topic.lower()))
         
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
         return True
     except Exception as e:
         print(f"Error removing topic links: {e}")
         return False
 
+LINKED_MEMORIES_SQL = '''
+    SELECT ml.source_memory_id, ml.linked_topic
+    FROM memory_links ml
+    WHERE ml.user_id = %s
+    GROUP BY ml.source_memory_id, ml.linked_topic
+    ORDER BY MAX(ml.created_at) DESC
+    LIMIT %s
+'''
+
 def get_linked_memories(current_topic: str, user_id: str, limit: int = 2) -> List[str]:
     """Get memory IDs that are linked to other topics from the current topic"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT DISTINCT ml.source_memory_id, ml.linked_topic
-            FROM memory_links ml
-            WHERE ml.user_id = %s
-            ORDER BY ml.created_at DESC
-            LIMIT %s
-        ''', (user_id, limit))
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(LINKED_MEMORIES_SQL, (user_id, limit))
         
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            results = cursor.fetchall()
+            cursor.close()
         
         return [row[0] for row in results]
     except Exception as e:
         print(f"Error getting linked memories: {e}")
         return []
 
-# Topic deletion functions
-def get_topic_deletion_info(user_id: str, topic: str) -> Dict:
-    """Get information about what will be deleted when deleting a topic"""
+def get_conversation_topic(conversation_id: str) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """Get the (topic, sub_topic) of a conversation, or None if it doesn't exist"""
     try:
-        topic = topic.lower().strip()
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get conversation count and subtopics
-        cursor.execute('''
-            SELECT COUNT(*) as conversation_count,
-                   COUNT(DISTINCT sub_topic) as subtopic_count,
-                   COALESCE(SUM(message_count), 0) as total_messages
-            FROM conversations
-            WHERE user_id = %s AND topic = %s
-        ''', (user_id, topic))
-        
-        result = cursor.fetchone()
-        if not result:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT topic, sub_topic FROM conversations WHERE id = %s', (conversation_id,))
+            result = cursor.fetchone()
             cursor.close()
-            conn.close()
-            return {'exists': False}
-        
-        conversation_count = result[0] if result[0] is not None else 0
-        subtopic_count = result[1] if result[1] is not None and result[1] > 0 else 0
-        total_messages = result[2] if result[2] is not None else 0
-        
-        # Get list of subtopics
-        cursor.execute('''
-            SELECT DISTINCT sub_topic
-            FROM conversations
-            WHERE user_id = %s AND topic = %s AND sub_topic IS NOT NULL
-        ''', (user_id, topic))
-        
-        subtopics = [row[0] for row in cursor.fetchall()]
-        
-        cursor.close()
-        conn.close()
-        
-        return {
-            'topic': topic,
-            'conversation_count': conversation_count,
-            'subtopic_count': subtopic_count,
-            'subtopics': subtopics,
-            'total_messages': total_messages,
-            'exists': conversation_count > 0
-        }
+        return (result[0], result[1]) if result else None
     except Exception as e:
-        print(f"Error getting topic deletion info: {e}")
-        return {'exists': False}
+        print(f"Error getting conversation topic: {e}")
+        return None
 
-def get_subtopic_deletion_info(user_id: str, topic: str, subtopic: str) -> Dict:
-    """Get information about what will be deleted when deleting a subtopic"""
+# File management functions
+def store_user_file(user_id: str, filename: str, content: str, file_type: Optional[str]) -> bool:
+    """Store an uploaded file for a user"""
     try:
-        topic = topic.lower().strip()
-        subtopic = subtopic.lower().strip()
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get conversation count and message count for this subtopic
-        cursor.execute('''
-            SELECT COUNT(*) as conversation_count,
-                   COALESCE(SUM(message_count), 0) as total_messages
-            FROM conversations
-            WHERE user_id = %s AND topic = %s AND sub_topic = %s
-        ''', (user_id, topic, subtopic))
-        
-        result = cursor.fetchone()
-        if not result:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO user_files (user_id, filename, content, file_type) VALUES (%s, %s, %s, %s)",
+                (user_id, filename, content, file_type)
+            )
+            conn.commit()
             cursor.close()
-            conn.close()
-            return {'exists': False}
-        
-        conversation_count = result[0] if result[0] is not None else 0
-        total_messages = result[1] if result[1] is not None else 0
-        
+        data_versions.bump(user_id, FILES)
+        return True
+    except Exception as e:
+        print(f"Error storing file: {e}")
+        return False
+
+USER_FILE_SQL = "SELECT content, file_type FROM user_files WHERE user_id = %s AND filename = %s"
+
+def get_user_file(user_id: str, filename: str) -> Optional[Dict]:
+    """Get a user's file content and type by filename"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(USER_FILE_SQL, (user_id, filename))
+            result = cursor.fetchone()
+            cursor.close()
+        return {'content': result[0], 'file_type': result[1]} if result else None
+    except Exception as e:
+        print(f"Error getting file: {e}")
+        return None
+
+USER_FILES_SQL = """
+    SELECT id, filename, file_type, uploaded_at,
+           LEFT(content, 100) as content_preview
+    FROM user_files
+    WHERE user_id = %s
+    ORDER BY uploaded_at DESC
+"""
+
+USER_FILES_SEARCH_SQL = """
+    SELECT id, filename, file_type, uploaded_at,
+           LEFT(content, 100) as content_preview
+    FROM user_files
+    WHERE user_id = %s AND filename ILIKE %s
+    ORDER BY uploaded_at DESC
+"""
+
+def query_user_files(user_id: str, search: Optional[str]) -> List[Dict]:
+    """Query a user's files with content previews; raises on database errors"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+
+        if search is not None:
+            cursor.execute(USER_FILES_SEARCH_SQL, (user_id, f"%{search}%"))
+        else:
+            cursor.execute(USER_FILES_SQL, (user_id,))
+
+        files = []
+        for row in cursor.fetchall():
+            files.append({
+                'id': row[0],
+                'filename': row[1],
+                'file_type': row[2],
+                'uploaded_at': row[3].isoformat(),
+                'content_preview': row[4] + "..." if len(row[4]) == 100 else row[4]
+            })
+
         cursor.close()
-        conn.close()
-        
+    return files
+
+def fetch_user_files(user_id: str, search: Optional[str] = None) -> List[Dict]:
+    """List a user's files with content previews, optionally filtered by filename, via the result cache; raises on database errors"""
+    return result_cache.get_or_compute(user_id, 'files', (search,), [FILES], query_user_files, user_id, search)
+
+def list_user_files(user_id: str, search: Optional[str] = None) -> List[Dict]:
+    """List a user's files, or an empty list on database errors"""
+    try:
+        return fetch_user_files(user_id, search)
+    except Exception as e:
+        print(f"Error listing files: {e}")
+        return []
+
+CHAT_TURN_CONTEXT_SQL = '''
+    WITH new_conversation AS (
+        INSERT INTO conversations (id, user_id, title, topic, sub_topic, created_at, updated_at, message_count)
+        SELECT %(new_id)s, %(user_id)s, 'New Conversation', 'general', NULL, %(now)s, %(now)s, 0
+        WHERE %(new_id)s IS NOT NULL
+        RETURNING id, topic, sub_topic
+    ),
+    conversation AS (
+        SELECT id, topic, sub_topic FROM new_conversation
+        UNION ALL
+        SELECT id, topic, sub_topic FROM conversations WHERE id = %(conversation_id)s
+    ),
+    recent_files AS (
+        SELECT filename, content FROM user_files
+        WHERE user_id = %(user_id)s
+        ORDER BY uploaded_at DESC
+        LIMIT %(file_limit)s
+    )
+    SELECT (SELECT first_name FROM users WHERE id = %(user_id)s),
+           (SELECT id FROM conversation LIMIT 1),
+           (SELECT topic FROM conversation LIMIT 1),
+           (SELECT sub_topic FROM conversation LIMIT 1),
+           COALESCE((SELECT json_agg(json_build_array(filename, content)) FROM recent_files), '[]'::json)
+'''
+
+def load_chat_turn_context(user_id: str, conversation_id: Optional[str], file_limit: int) -> Optional[Dict]:
+    """Fetch everything a chat turn needs from PostgreSQL in one statement.
+
+    Creates the conversation when conversation_id is None, and returns its topic, the user's
+    first name and up to file_limit recent (filename, content) pairs.
+    """
+    try:
+        new_conversation_id = None if conversation_id else str(uuid.uuid4())
+        now = datetime.now()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CHAT_TURN_CONTEXT_SQL, {
+                'new_id': new_conversation_id,
+                'user_id': user_id,
+                'now': now,
+                'conversation_id': conversation_id,
+                'file_limit': file_limit
+            })
+            result = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+        if new_conversation_id:
+            data_versions.bump(user_id, CONVERSATIONS, TOPICS)
         return {
-            'topic': topic,
-            'subtopic': subtopic,
-            'conversation_count': conversation_count,
-            'total_messages': total_messages,
-            'exists': conversation_count > 0
+            'first_name': result[0],
+            'conversation_id': conversation_id or result[1],
+            'topic': result[2],
+            'sub_topic': result[3],
+            'files': [(filename, content) for filename, content in result[4]]
         }
     except Exception as e:
-        print(f"Error getting subtopic deletion info: {e}")
-        return {'exists': False}
+        print(f"Error loading chat context: {e}")
+        return None
 
-def delete_topic_and_data(user_id: str, topic: str) -> bool:
-    """Delete a topic and all associated data from both PostgreSQL and Neo4j"""
+def delete_user_file(user_id: str, filename: str) -> int:
+    """Delete a user's file by filename and return the number of rows removed"""
     try:
-        topic = topic.lower().strip()
-        
-        # First get all conversation IDs for this topic
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id FROM conversations
-            WHERE user_id = %s AND topic = %s
-        ''', (user_id, topic))
-        
-        conversation_ids = [row[0] for row in cursor.fetchall()]
-        
-        if not conversation_ids:
-            cursor.close()
-            conn.close()
-            return False  # Topic doesn't exist
-        
-        # Begin transaction
-        conn.autocommit = False
-        
-        try:
-            # Delete from PostgreSQL in proper order
-            # 1. Delete memory links
-            cursor.execute('''
-                DELETE FROM memory_links
-                WHERE user_id = %s AND linked_topic = %s
-            ''', (user_id, topic))
-            
-            # 2. Delete conversation messages
-            for conv_id in conversation_ids:
-                cursor.execute('''
-                    DELETE FROM conversation_messages
-                    WHERE conversation_id = %s
-                ''', (conv_id,))
-            
-            # 3. Delete conversations
-            cursor.execute('''
-                DELETE FROM conversations
-                WHERE user_id = %s AND topic = %s
-            ''', (user_id, topic))
-            
-            # Commit PostgreSQL transaction
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM user_files WHERE user_id = %s AND filename = %s", (user_id, filename))
+            deleted = cursor.rowcount
             conn.commit()
-            
-            # Delete from Neo4j - memories associated with these conversations
-            from intelligent_memory import IntelligentMemorySystem
-            memory_system = IntelligentMemorySystem()
-            
-            with memory_system.driver.session() as session:
-                for conv_id in conversation_ids:
-                    session.run("""
-                        MATCH (m:IntelligentMemory {user_id: $user_id, conversation_id: $conversation_id})
-                        DELETE m
-                    """, {'user_id': user_id, 'conversation_id': conv_id})
-            
-            memory_system.close()
-            
-            cursor.close()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            # Rollback on error
-            conn.rollback()
             cursor.close()
-            conn.close()
-            print(f"Error during topic deletion transaction: {e}")
-            return False
-            
+        if deleted:
+            data_versions.bump(user_id, FILES)
+        return deleted
     except Exception as e:
-        print(f"Error deleting topic: {e}")
-        return False
+        print(f"Error deleting file: {e}")
+        return 0
 
-def delete_subtopic_and_data(user_id: str, topic: str, subtopic: str) -> bool:
-    """Delete a subtopic and all associated data from both PostgreSQL and Neo4j"""
+# Topic deletion functions
+TOPIC_DELETION_INFO_SQL = '''
+    SELECT t.conversation_count, t.subtopic_count,
+           ARRAY(SELECT s.name FROM subtopics s WHERE s.user_id = t.user_id AND s.topic = t.name ORDER BY s.name),
+           (SELECT COALESCE(SUM(c.message_count), 0) FROM conversations c
+            WHERE c.user_id = t.user_id AND c.topic = t.name)
+    FROM topics t
+    WHERE t.user_id = %s AND t.name = %s
+'''
+
+def get_topic_deletion_info(user_id: str, topic: str) -> Dict:
+    """Get information about what will be deleted when deleting a topic"""
     try:
         topic = topic.lower().strip()
-        subtopic = subtopic.lower().strip()
-        
-        # First get all conversation IDs for this subtopic
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id FROM conversations
-            WHERE user_id = %s AND topic = %s AND sub_topic = %s
-        ''', (user_id, topic, subtopic))
-        
-        conversation_ids = [row[0] for row in cursor.fetchall()]
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(TOPIC_DELETION_INFO_SQL, (user_id, topic))
         
-        if not conversation_ids:
+            result = cursor.fetchone()
             cursor.close()
-            conn.close()
-            return False  # Subtopic doesn't exist
         
-        # Begin transaction
-        conn.autocommit = False
+        if not result:
+            return {'exists': False}
         
-        try:
-            # Delete from PostgreSQL in proper order
-            # 1. Delete conversation messages
-            for conv_id in conversation_ids:
-                cursor.execute('''
-                    DELETE FROM conversation_messages
-                    WHERE conversation_id = %s
-                ''', (conv_id,))
-            
-            # 2. Delete conversations
-            cursor.execute('''
-                DELETE FROM conversations
-                WHERE user_id = %s AND topic = %s AND sub_topic = %s
-            ''', (user_id, topic, subtopic))
-            
-            # Commit PostgreSQL transaction
-            conn.commit()
-            
-            # Delete from Neo4j - memories associated with these conversations
-            from intelligent_memory import IntelligentMemorySystem
-            memory_system = IntelligentMemorySystem()
-            
-            with memory_system.driver.session() as session:
-                for conv_id in conversation_ids:
-                    session.run("""
-                        MATCH (m:IntelligentMemory {user_id: $user_id, conversation_id: $conversation_id})
-                        DELETE m
-                    """, {'user_id': user_id, 'conversation_id': conv_id})
-            
-            memory_system.close()
-            
-            cursor.close()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            # Rollback on error
-            conn.rollback()
+        return {
+            'topic': topic,
+            'conversation_count': result[0],
+            'subtopic_count': result[1],
+            'subtopics': result[2],
+            'total_messages': result[3],
+            'exists': True
+        }
+    except Exception as e:
+        print(f"Error getting topic deletion info: {e}")
+        return {'exists': False}
+
+SUBTOPIC_DELETION_INFO_SQL = '''
+    SELECT s.conversation_count,
+           (SELECT COALESCE(SUM(c.message_count), 0) FROM conversations c
+            WHERE c.user_id = s.user_id AND c.topic = s.topic AND c.sub_topic = s.name)
+    FROM subtopics s
+    WHERE s.user_id = %s AND s.topic = %s AND s.name = %s
+'''
+
+def get_subtopic_deletion_info(user_id: str, topic: str, subtopic: str) -> Dict:
+    """Get information about what will be deleted when deleting a subtopic"""
+    try:
+        topic = topic.lower().strip()
+        subtopic = subtopic.lower().strip()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SUBTOPIC_DELETION_INFO_SQL, (user_id, topic, subtopic))
+        
+            result = cursor.fetchone()
             cursor.close()
-            conn.close()
-            print(f"Error during subtopic deletion transaction: {e}")
-            return False
-            
+        
+        if not result:
+            return {'exists': False}
+        
+        return {
+            'topic': topic,
+            'subtopic': subtopic,
+            'conversation_count': result[0],
+            'total_messages': result[1],
+            'exists': True
+        }
     except Exception as e:
-        print(f"Error deleting subtopic: {e}")
-        return False
+        print(f"Error getting subtopic deletion info: {e}")
+        return {'exists': False}
 
 # Chat models - define before usage
 class ChatMessage(BaseModel):
@@ -1134,20 +1018,15 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
     try:
         if cmd == '/files':
             # List all files
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT filename, file_type, uploaded_at FROM user_files WHERE user_id = %s ORDER BY uploaded_at DESC", (user_id,))
-            files = cursor.fetchall()
-            cursor.close()
-            conn.close()
+            files = await run_db(list_user_files, user_id)
             
             if not files:
                 response = "No files uploaded yet. Use the + button to upload files."
             else:
                 response = "**Your uploaded files:**\n\n"
-                for filename, file_type, uploaded_at in files:
-                    date = uploaded_at.strftime("%Y-%m-%d %H:%M")
-                    response += f"• `{filename}` ({file_type}) - {date}\n"
+                for file in files:
+                    date = datetime.fromisoformat(file['uploaded_at']).strftime("%Y-%m-%d %H:%M")
+                    response += f"• `{file['filename']}` ({file['file_type']}) - {date}\n"
                 response += f"\nUse `/view [filename]` to display file content."
             
         elif cmd == '/view':
@@ -1155,15 +1034,10 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 response = "Usage: `/view [filename]`\nExample: `/view main.py`"
             else:
                 filename = ' '.join(parts[1:])
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT content FROM user_files WHERE user_id = %s AND filename = %s", (user_id, filename))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
+                result = await run_db(get_user_file, user_id, filename)
                 
                 if result:
-                    response = f"**File: {filename}**\n\n```\n{result[0]}\n```"
+                    response = f"**File: {filename}**\n\n```\n{result['content']}\n```"
                 else:
                     response = f"File '{filename}' not found. Use `/files` to see available files."
         
@@ -1172,13 +1046,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 response = "Usage: `/delete [filename]`\nExample: `/delete main.py`"
             else:
                 filename = ' '.join(parts[1:])
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM user_files WHERE user_id = %s AND filename = %s", (user_id, filename))
-                deleted = cursor.rowcount
-                conn.commit()
-                cursor.close()
-                conn.close()
+                deleted = await run_db(delete_user_file, user_id, filename)
                 
                 if deleted > 0:
                     response = f"File '{filename}' deleted successfully."
@@ -1190,32 +1058,22 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 response = "Usage: `/search [term]`\nExample: `/search main`"
             else:
                 search_term = ' '.join(parts[1:])
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT filename, file_type, uploaded_at FROM user_files WHERE user_id = %s AND filename ILIKE %s ORDER BY uploaded_at DESC", (user_id, f"%{search_term}%"))
-                files = cursor.fetchall()
-                cursor.close()
-                conn.close()
+                files = await run_db(list_user_files, user_id, search_term)
                 
                 if not files:
                     response = f"No files found matching '{search_term}'."
                 else:
                     response = f"**Files matching '{search_term}':**\n\n"
-                    for filename, file_type, uploaded_at in files:
-                        date = uploaded_at.strftime("%Y-%m-%d %H:%M")
-                        response += f"• `{filename}` ({file_type}) - {date}\n"
+                    for file in files:
+                        date = datetime.fromisoformat(file['uploaded_at']).strftime("%Y-%m-%d %H:%M")
+                        response += f"• `{file['filename']}` ({file['file_type']}) - {date}\n"
         
         elif cmd == '/download':
             if len(parts) < 2:
                 response = "Usage: `/download [filename]`\nExample: `/download main.py`"
             else:
                 filename = ' '.join(parts[1:])
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT filename FROM user_files WHERE user_id = %s AND filename = %s", (user_id, filename))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
+                result = await run_db(get_user_file, user_id, filename)
                 
                 if result:
                     download_url = f"/api/download/{filename}"
@@ -1225,7 +1083,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
         
         elif cmd == '/topics':
             # List all topics and sub-topics
-            topics = get_all_topics(user_id)
+            topics = await run_db(get_all_topics, user_id)
             if not topics:
                 response = "No topics created yet. Start a conversation with a topic to organize your chats."
             else:
@@ -1246,12 +1104,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 linked_topic = ' '.join(parts[1:]).lower()
                 
                 # Get current conversation topic
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT topic FROM conversations WHERE id = %s', (conversation_id,))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
+                result = await run_db(get_conversation_topic, conversation_id)
                 
                 if not result:
                     response = "Error: Could not find current conversation."
@@ -1269,19 +1122,14 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 linked_topic = ' '.join(parts[1:]).lower()
                 
                 # Get current conversation topic
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT topic FROM conversations WHERE id = %s', (conversation_id,))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
+                result = await run_db(get_conversation_topic, conversation_id)
                 
                 if not result:
                     response = "Error: Could not find current conversation."
                 else:
                     current_topic = result[0]
                     if current_topic:
-                        success = remove_topic_links(current_topic, linked_topic, user_id)
+                        success = await run_db(remove_topic_links, current_topic, linked_topic, user_id)
                         if success:
                             response = f"Removed all links between **{current_topic}** and **{linked_topic}** topics."
                         else:
@@ -1297,7 +1145,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 print(f"DEBUG: Processing delete-topic command for: {topic_name}")
                 
                 # Get deletion info first
-                info = get_topic_deletion_info(user_id, topic_name)
+                info = await run_db(get_topic_deletion_info, user_id, topic_name)
                 print(f"DEBUG: Topic deletion info: {info}")
                 
                 if not info['exists']:
@@ -1329,7 +1177,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
                 subtopic_name = ' '.join(parts[2:]).lower()
                 
                 # Get deletion info first
-                info = get_subtopic_deletion_info(user_id, topic_name, subtopic_name)
+                info = await run_db(get_subtopic_deletion_info, user_id, topic_name, subtopic_name)
                 
                 if not info['exists']:
                     response = f"Subtopic '{subtopic_name}' under topic '{topic_name}' not found. Use `/topics` to see available topics and subtopics."
@@ -1357,8 +1205,7 @@ async def handle_slash_command(command: str, user_id: str, conversation_id: str)
             response = "**Available commands:**\n\n• `/files` - List all uploaded files\n• `/view [filename]` - Display file content\n• `/delete [filename]` - Delete a file\n• `/search [term]` - Search files by name\n• `/download [filename]` - Download a file\n• `/topics` - List all topics and sub-topics\n• `/link [topic]` - Link current message to specified topic\n• `/unlink [topic]` - Remove links between topics\n• `/delete-topic [topic]` - Delete a topic and all its data\n• `/delete-subtopic [topic] [subtopic]` - Delete a subtopic and all its data"
         
         # Save command and response to conversation
-        save_conversation_message(conversation_id, 'user', command)
-        save_conversation_message(conversation_id, 'assistant', response)
+        await run_db(save_conversation_turn, conversation_id, command, response)
         
         return ChatResponse(
             response=response,
@@ -1385,22 +1232,20 @@ def create_user_in_db(first_name: str, username: str, email: str, password_hash:
     
     try:
         # First, check if user exists in PostgreSQL
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE username = %s OR email = %s", (username, email))
-        if cursor.fetchone():
-            cursor.close()
-            conn.close()
-            return False  # User already exists
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM users WHERE username = %s OR email = %s", (username, email))
+            if cursor.fetchone():
+                cursor.close()
+                return False  # User already exists
         
-        # Create user in PostgreSQL
-        cursor.execute(
-            "INSERT INTO users (id, first_name, username, email, password_hash) VALUES (%s, %s, %s, %s, %s)",
-            (user_id, first_name, username, email, password_hash)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+            # Create user in PostgreSQL
+            cursor.execute(
+                "INSERT INTO users (id, first_name, username, email, password_hash) VALUES (%s, %s, %s, %s, %s)",
+                (user_id, first_name, username, email, password_hash)
+            )
+            conn.commit()
+            cursor.close()
         
         # Neo4j user creation removed - handled by intelligent_memory when needed
         
@@ -1413,60 +1258,59 @@ def create_user_in_db(first_name: str, username: str, email: str, password_hash:
 def verify_user_login(username: str, password: str) -> Optional[str]:
     """Verify user login with BCrypt and migrate from SHA256 if needed"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, password_hash FROM users WHERE username = %s",
-            (username,)
-        )
-        result = cursor.fetchone()
-        if not result:
-            cursor.close()
-            conn.close()
-            return None
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, password_hash FROM users WHERE username = %s",
+                (username,)
+            )
+            result = cursor.fetchone()
+            if not result:
+                cursor.close()
+                return None
         
-        user_id, stored_hash = result
+            user_id, stored_hash = result
         
-        # Check if this is a BCrypt hash (starts with $2b$)
-        if stored_hash.startswith('$2b$'):
-            # Use BCrypt verification
-            if pwd_context.verify(password, stored_hash):
-                cursor.close()
-                conn.close()
-                return user_id
-        else:
-            # Legacy SHA256 hash - verify and migrate if successful
-            legacy_hash = hashlib.sha256(password.encode()).hexdigest()
-            if legacy_hash == stored_hash:
-                # Password is correct, migrate to BCrypt
-                new_hash = pwd_context.hash(password)
-                cursor.execute(
-                    "UPDATE users SET password_hash = %s WHERE id = %s",
-                    (new_hash, user_id)
-                )
-                conn.commit()
-                cursor.close()
-                conn.close()
-                print(f"Migrated user {username} to BCrypt")
-                return user_id
+            # Check if this is a BCrypt hash (starts with $2b$)
+            if stored_hash.startswith('$2b$'):
+                # Use BCrypt verification
+                if pwd_context.verify(password, stored_hash):
+                    cursor.close()
+                    return user_id
+            else:
+                # Legacy SHA256 hash - verify and migrate if successful
+                legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+                if legacy_hash == stored_hash:
+                    # Password is correct, migrate to BCrypt
+                    new_hash = pwd_context.hash(password)
+                    cursor.execute(
+                        "UPDATE users SET password_hash = %s WHERE id = %s",
+                        (new_hash, user_id)
+                    )
+                    conn.commit()
+                    cursor.close()
+                    print(f"Migrated user {username} to BCrypt")
+                    return user_id
         
-        cursor.close()
-        conn.close()
+            cursor.close()
         return None
     except Exception as e:
         print(f"Error verifying login: {e}")
         return None
 
-def get_user_first_name(user_id: str) -> Optional[str]:
-    """Get user's first name by user ID"""
-    try:
-        conn = get_db_connection()
+def fetch_user_first_name(user_id: str) -> Optional[str]:
+    """Get user's first name by user ID; raises on database errors"""
+    with get_db_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT first_name FROM users WHERE id = %s", (user_id,))
         result = cursor.fetchone()
         cursor.close()
-        conn.close()
-        return result[0] if result else None
+    return result[0] if result else None
+
+def get_user_first_name(user_id: str) -> Optional[str]:
+    """Get user's first name by user ID, or None on database errors"""
+    try:
+        return fetch_user_first_name(user_id)
     except Exception as e:
         print(f"Error getting user first name: {e}")
         return None
@@ -1634,8 +1478,8 @@ async def register_user(
         """)
     
     # Hash password and create user
-    password_hash = hash_password(password)
-    success = create_user_in_db(first_name, username, email, password_hash)
+    password_hash = await run_db(hash_password, password)
+    success = await run_db(create_user_in_db, first_name, username, email, password_hash)
     
     if not success:
         return HTMLResponse("""
@@ -1769,7 +1613,7 @@ async def login_user(
     password: str = Form(...)
 ):
     """Handle user login"""
-    user_id = verify_user_login(username, password)
+    user_id = await run_db(verify_user_login, username, password)
     
     if not user_id:
         return HTMLResponse("""
@@ -1779,8 +1623,8 @@ async def login_user(
         </script>
         """)
     
-    # Create session in database
-    session_id = create_session(user_id, username)
+    # Create session (database row or signed token, depending on the backend)
+    session_id = await session_backend.create(user_id, username)
     
     if not session_id:
         return HTMLResponse("""
@@ -1790,23 +1634,28 @@ async def login_user(
         </script>
         """)
     
-    # Also store in memory for backward compatibility during transition
-    user_sessions[session_id] = {
-        'user_id': user_id,
-        'username': username
-    }
-    
     # Redirect to chat with session
     response = RedirectResponse(url="/", status_code=302)
     response.set_cookie(key="session_id", value=session_id, httponly=True)
     return response
 
+@app.post("/logout")
+async def logout_user(request: Request):
+    """End the current session and return to the login page"""
+    session_id = request.cookies.get("session_id")
+    if session_id:
+        await session_backend.revoke(session_id)
+    
+    response = RedirectResponse(url="/login", status_code=302)
+    response.delete_cookie(key="session_id")
+    return response
+
 # Serve the chat interface as the main page
 @app.get("/")
 async def serve_chat(request: Request):
     """Serve the chat interface"""
     # Check if user is logged in
-    user_data = get_authenticated_user(request)
+    user_data = await get_authenticated_user(request)
     if not user_data:
         return RedirectResponse(url="/login")
     
@@ -1816,7 +1665,7 @@ async def serve_chat(request: Request):
 async def serve_mobile(request: Request):
     """Serve the mobile PWA interface"""
     # Check if user is logged in
-    user_data = get_authenticated_user(request)
+    user_data = await get_authenticated_user(request)
     if not user_data:
         return RedirectResponse(url="/login")
     
@@ -1865,128 +1714,100 @@ class MessageListResponse(BaseModel):
     has_more: bool
     oldest_id: Optional[str]
 
-# Chat endpoint
-@app.post("/api/chat", response_model=ChatResponse)
-async def chat_with_memory(chat_request: ChatMessage, request: Request):
-    """
-    Chat with LLM using memory system for context
+@dataclass
+class ChatContext:
+    """Everything assembled before the LLM call for one chat turn"""
+    conversation_id: Optional[str]
+    messages: List[Dict]
+    context: str = ""
+    query_embedding: Optional[List[float]] = None
+    topic: Optional[str] = None
+    sub_topic: Optional[str] = None
+    first_name: Optional[str] = None
+
+# Chat endpoint helpers shared by the regular and streaming chat endpoints
+async def start_chat_turn(chat_request: ChatMessage, user_id: str) -> Tuple[Optional[ChatResponse], Optional[str], str]:
+    """Handle slash commands and extract the message content for a chat turn.
+
+    Returns (immediate_response, conversation_id, message_content); when immediate_response
+    is set the turn is complete and no LLM call is needed. Otherwise conversation_id is the
+    requested conversation, or None when assemble_chat_context should create one.
     """
-    try:
-        # Extract user_id from session
-        user_data = get_authenticated_user(request)
-        if not user_data:
-            raise HTTPException(status_code=401, detail="Not authenticated")
-        user_id = user_data['user_id']
-        
-        # Check for slash commands
-        if chat_request.message.startswith('/'):
-            conversation_id = chat_request.conversation_id or create_conversation(user_id)
-            if conversation_id:
-                return await handle_slash_command(chat_request.message, user_id, conversation_id)
-            else:
-                return ChatResponse(
-                    response="Error creating conversation for command processing.",
-                    memory_stored=False,
-                    context_used=0,
-                    conversation_id=""
-                )
-        
-        # Check for /link command within message and extract it
-        link_topic = None
-        message_content = chat_request.message
-        if message_content.startswith('/link '):
-            parts = message_content.split(' ', 2)
-            if len(parts) >= 3:
-                link_topic = parts[1].lower()
-                message_content = parts[2]  # Extract actual message content after /link [topic]
-            elif len(parts) == 2:
-                # Just /link [topic] without message content
-                fallback_conversation_id = chat_request.conversation_id or create_conversation(user_id)
-                return ChatResponse(
-                    response=f"Please include your message after `/link {parts[1]}`. Example: `/link cooking I love pasta recipes`",
-                    memory_stored=False,
-                    context_used=0,
-                    conversation_id=fallback_conversation_id or ""
-                )
-        
-        # Handle conversation management first to ensure we have topic context
-        conversation_id = chat_request.conversation_id
-        if not conversation_id:
-            # Create new conversation if none specified
-            conversation_id = create_conversation(user_id)
-        
-        # Get current conversation topic context
-        current_topic = None
-        current_subtopic = None
-        search_scope = "conversation"  # Default for new conversations
-        
+    # Check for slash commands
+    if chat_request.message.startswith('/'):
+        conversation_id = chat_request.conversation_id or await run_db(create_conversation, user_id)
         if conversation_id:
-            # Get conversation details to extract topic context
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT topic, sub_topic FROM conversations WHERE id = %s', (conversation_id,))
-                result = cursor.fetchone()
-                cursor.close()
-                conn.close()
-                
-                if result:
-                    current_topic = result[0]
-                    current_subtopic = result[1]
-                    search_scope = "topic" if current_topic else "conversation"
-            except Exception as e:
-                print(f"Error getting conversation topic: {e}")
-        
+            return await handle_slash_command(chat_request.message, user_id, conversation_id), conversation_id, chat_request.message
+        return ChatResponse(
+            response="Error creating conversation for command processing.",
+            memory_stored=False,
+            context_used=0,
+            conversation_id=""
+        ), None, chat_request.message
+    
+    # Check for /link command within message and extract it
+    message_content = chat_request.message
+    if message_content.startswith('/link '):
+        parts = message_content.split(' ', 2)
+        if len(parts) >= 3:
+            message_content = parts[2]  # Extract actual message content after /link [topic]
+        elif len(parts) == 2:
+            # Just /link [topic] without message content
+            fallback_conversation_id = chat_request.conversation_id or await run_db(create_conversation, user_id)
+            return ChatResponse(
+                response=f"Please include your message after `/link {parts[1]}`. Example: `/link cooking I love pasta recipes`",
+                memory_stored=False,
+                context_used=0,
+                conversation_id=fallback_conversation_id or ""
+            ), fallback_conversation_id, message_content
+    
+    return None, chat_request.conversation_id, message_content
+
+async def assemble_chat_context(chat_request: ChatMessage, user_id: str, conversation_id: Optional[str]) -> ChatContext:
+    """Assemble memory, file and user context into the LLM message list.
+
+    The PostgreSQL lookups (conversation, topic, files, first name) are one query, and it runs
+    concurrently with memory retrieval, so pre-LLM latency is the slower of the two.
+    """
+    # Check if user is asking about files and add file content to context
+    file_query_keywords = ["file", "main.py", "analyze", "code", "script", "upload"]
+    is_file_query = any(keyword in chat_request.message.lower() for keyword in file_query_keywords)
+    
+    async def retrieve_memories():
         # Use intelligent memory system for fast, smart retrieval
-        context = ""
-        if intelligent_memory_system:
-            try:
-                context = await intelligent_memory_system.retrieve_memory(
-                    query=chat_request.message,
-                    user_id=user_id,
-                    conversation_id=conversation_id
-                )
-                print(f"DEBUG: Intelligent memory retrieved: {len(context)} chars")
-                if context:
-                    print(f"DEBUG: Memory context preview: {context[:200]}...")
-            except Exception as e:
-                print(f"Intelligent memory error (continuing without memory): {e}")
-                context = ""
-        
-        # Check if user is asking about files and add file content to context
-        file_query_keywords = ["file", "main.py", "analyze", "code", "script", "upload"]
-        is_file_query = any(keyword in chat_request.message.lower() for keyword in file_query_keywords)
-        
-        if is_file_query:
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "SELECT filename, content FROM user_files WHERE user_id = %s ORDER BY uploaded_at DESC LIMIT 5",
-                    (user_id,)
-                )
-                user_files = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                
-                if user_files:
-                    context += "\n\nAvailable files:\n"
-                    for filename, content in user_files:
-                        context += f"\n--- {filename} ---\n{content}\n"
-            except Exception as e:
-                print(f"Error fetching user files: {e}")
-        
-        # Get user's first name for personalized responses
-        user_first_name = get_user_first_name(user_id)
-        
-        # User message will be stored in memory after PostgreSQL save to get proper message_id
-        
-        # Generate response using LLM with memory context
-        from model_service import ModelService
-        model_service = ModelService()
-        
-        # Create system message with user context and memories
-        system_content = f"""You are a helpful AI assistant with access to conversation history with {user_first_name or "the user"}.
+        if not intelligent_memory_system:
+            return None
+        try:
+            return await intelligent_memory_system.retrieve_memory(
+                query=chat_request.message,
+                user_id=user_id,
+                conversation_id=conversation_id
+            )
+        except Exception as e:
+            print(f"Intelligent memory error (continuing without memory): {e}")
+            return None
+    
+    turn, retrieval = await asyncio.gather(
+        run_db(load_chat_turn_context, user_id, conversation_id, 5 if is_file_query else 0),
+        retrieve_memories()
+    )
+    if turn is None:
+        turn = {'first_name': None, 'conversation_id': conversation_id, 'topic': None, 'sub_topic': None, 'files': []}
+    
+    context = retrieval.context if retrieval else ""
+    print(f"DEBUG: Intelligent memory retrieved: {len(context)} chars")
+    if context:
+        print(f"DEBUG: Memory context preview: {context[:200]}...")
+    
+    if turn['files']:
+        context += "\n\nAvailable files:\n"
+        for filename, content in turn['files']:
+            context += f"\n--- {filename} ---\n{content}\n"
+    
+    user_first_name = turn['first_name']
+    
+    # Create system message with user context and memories
+    system_content = f"""You are a helpful AI assistant with access to conversation history with {user_first_name or "the user"}.
 
 IMPORTANT: The following are actual previous conversations and messages from your chat history with this user. These are REAL memories, not hypothetical:
 
@@ -1999,14 +1820,102 @@ Instructions:
 - If the user asks about previous conversations, refer to the actual content above
 - Do not contradict information from your previous responses shown above"""
 
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": chat_request.message}
-        ]
+    messages = [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": chat_request.message}
+    ]
+    
+    return ChatContext(
+        conversation_id=turn['conversation_id'],
+        messages=messages,
+        context=context,
+        query_embedding=retrieval.query_embedding if retrieval else None,
+        topic=turn['topic'],
+        sub_topic=turn['sub_topic'],
+        first_name=user_first_name
+    )
+
+async def persist_chat_turn(user_id: str, conversation_id: str, user_message: str, memory_content: str, response_text: str,
+                            user_embedding: Optional[List[float]] = None):
+    """Save both sides of a chat turn to PostgreSQL, then queue them as memories keyed by message ID.
+
+    user_embedding is the retrieval query embedding of user_message; it is reused for the stored
+    memory when the memory content is the same text.
+    """
+    try:
+        # Save both messages to the conversation in one statement and get their PostgreSQL message IDs
+        user_message_id, assistant_message_id = await run_db(save_conversation_turn, conversation_id, user_message, response_text)
+        
+        # Queue messages for the intelligent memory system with PostgreSQL message IDs;
+        # embedding and Neo4j storage happen in the write-behind worker
+        if memory_ingest_queue:
+            try:
+                memories = []
+                if user_message_id:
+                    memories.append({
+                        'content': memory_content,
+                        'user_id': user_id,
+                        'conversation_id': conversation_id,
+                        'message_type': "user",
+                        'message_id': user_message_id,
+                        'embedding': user_embedding if memory_content == user_message else None
+                    })
+                if assistant_message_id:
+                    memories.append({
+                        'content': response_text,
+                        'user_id': user_id,
+                        'conversation_id': conversation_id,
+                        'message_type': "assistant",
+                        'message_id': assistant_message_id
+                    })
+                await memory_ingest_queue.enqueue(memories)
+                print(f"DEBUG: Queued {len(memories)} messages for memory storage")
+                        
+            except Exception as e:
+                print(f"Error queueing messages for intelligent memory: {e}")
+                
+    except Exception as e:
+        print(f"Error saving conversation messages: {e}")
+
+# Persistence tasks outlive the streaming response, so keep references until they finish
+background_tasks = set()
+
+def schedule_chat_persistence(user_id: str, conversation_id: str, user_message: str, memory_content: str, response_text: str,
+                              user_embedding: Optional[List[float]] = None) -> asyncio.Task:
+    """Persist a chat turn in a task that survives client disconnects"""
+    task = asyncio.create_task(persist_chat_turn(user_id, conversation_id, user_message, memory_content, response_text, user_embedding))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Chat endpoint
+@app.post("/api/chat", response_model=ChatResponse)
+async def chat_with_memory(chat_request: ChatMessage, request: Request):
+    """
+    Chat with LLM using memory system for context
+    """
+    try:
+        # Extract user_id from session
+        user_data = await get_authenticated_user(request)
+        if not user_data:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        user_id = user_data['user_id']
+        
+        immediate_response, conversation_id, message_content = await start_chat_turn(chat_request, user_id)
+        if immediate_response:
+            return immediate_response
+        
+        chat_context = await assemble_chat_context(chat_request, user_id, conversation_id)
+        conversation_id = chat_context.conversation_id
         
+        # Generate response using LLM with memory context
         try:
             response_text = await model_service.chat_completion(
-                messages=messages,
+                messages=chat_context.messages,
                 model=chat_request.model or "openai/gpt-4o-mini",
                 web_search=chat_request.web_search or False
             )
@@ -2015,82 +1924,120 @@ Instructions:
             print(f"LLM error: {e}")
             response_text = "I apologize, but I'm experiencing technical difficulties processing your request right now."
         
-        # Assistant response will be stored in memory after PostgreSQL save to get proper message_id
-        
         # Ensure conversation_id is not None before saving messages
-        user_message_id = None
-        assistant_message_id = None
         if conversation_id:
-            try:
-                # Save user message to conversation and get PostgreSQL message ID
-                user_message_id = save_conversation_message(conversation_id, 'user', chat_request.message)
-                
-                # Save assistant response to conversation and get PostgreSQL message ID
-                assistant_message_id = save_conversation_message(conversation_id, 'assistant', response_text)
-                
-                # Now store messages in intelligent memory system with PostgreSQL message IDs
-                if intelligent_memory_system:
-                    try:
-                        # Store user message with PostgreSQL message ID
-                        if user_message_id:
-                            user_memory_id = await intelligent_memory_system.store_memory(
-                                content=message_content,
-                                user_id=user_id,
-                                conversation_id=conversation_id,
-                                message_type="user",
-                                message_id=user_message_id
-                            )
-                            if user_memory_id:
-                                print(f"DEBUG: Stored user message with PostgreSQL ID {user_message_id}")
-                        
-                        # Store assistant response with PostgreSQL message ID
-                        if assistant_message_id:
-                            assistant_memory_id = await intelligent_memory_system.store_memory(
-                                content=response_text,
-                                user_id=user_id,
-                                conversation_id=conversation_id,
-                                message_type="assistant",
-                                message_id=assistant_message_id
-                            )
-                            if assistant_memory_id:
-                                print(f"DEBUG: Stored assistant response with PostgreSQL ID {assistant_message_id}")
-                                print(f"DEBUG: Memory {assistant_memory_id} queued for background R(t) evaluation")
-                                
-                    except Exception as e:
-                        print(f"Error storing messages in intelligent memory: {e}")
-                        
-            except Exception as e:
-                print(f"Error saving conversation messages: {e}")
+            await persist_chat_turn(user_id, conversation_id, chat_request.message, message_content, response_text, chat_context.query_embedding)
         else:
             print("Warning: Could not create conversation, messages not saved")
         
         return ChatResponse(
             response=response_text,
             memory_stored=True,
-            context_used=1 if context else 0,
+            context_used=1 if chat_context.context else 0,
             conversation_id=conversation_id or ""
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def chat_with_memory_stream(chat_request: ChatMessage, request: Request):
+    """
+    Chat with LLM using memory system for context, streaming tokens as server-sent events.
+
+    Emits a `start` event with the conversation ID, one `token` event per content delta and a
+    final `done` event carrying the ChatResponse fields. The turn is persisted after the stream
+    ends. Slash commands are answered with a single `done` event.
+    """
+    user_data = await get_authenticated_user(request)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id = user_data['user_id']
+    
+    try:
+        immediate_response, conversation_id, message_content = await start_chat_turn(chat_request, user_id)
+        if not immediate_response:
+            chat_context = await assemble_chat_context(chat_request, user_id, conversation_id)
+            conversation_id = chat_context.conversation_id
+            messages, context, query_embedding = chat_context.messages, chat_context.context, chat_context.query_embedding
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
+    
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    
+    if immediate_response:
+        async def command_stream():
+            yield sse_event("done", immediate_response.model_dump())
+        return StreamingResponse(command_stream(), media_type="text/event-stream", headers=headers)
+    
+    async def event_stream():
+        chunks = []
+        persistence = None
+        try:
+            yield sse_event("start", {"conversation_id": conversation_id or ""})
+            
+            try:
+                async with aclosing(model_service.stream_chat_completion(
+                    messages=messages,
+                    model=chat_request.model or "openai/gpt-4o-mini",
+                    web_search=chat_request.web_search or False
+                )) as tokens:
+                    async for token in tokens:
+                        chunks.append(token)
+                        yield sse_event("token", {"content": token})
+            except Exception as e:
+                print(f"LLM streaming error: {e}")
+                if not chunks:
+                    fallback_text = "I apologize, but I'm experiencing technical difficulties processing your request right now."
+                    chunks.append(fallback_text)
+                    yield sse_event("token", {"content": fallback_text})
+            
+            response_text = "".join(chunks)
+            print(f"DEBUG: Streamed response: {response_text[:100]}...")
+            
+            # Ensure conversation_id is not None before saving messages
+            if conversation_id:
+                persistence = schedule_chat_persistence(user_id, conversation_id, chat_request.message, message_content, response_text, query_embedding)
+                # Wait so the client sees the saved conversation when it refreshes on `done`
+                await asyncio.shield(persistence)
+            else:
+                print("Warning: Could not create conversation, messages not saved")
+            
+            yield sse_event("done", ChatResponse(
+                response=response_text,
+                memory_stored=True,
+                context_used=1 if context else 0,
+                conversation_id=conversation_id or ""
+            ).model_dump())
+        finally:
+            # Client disconnected mid-stream: keep whatever part of the reply was generated
+            if persistence is None and chunks and conversation_id:
+                schedule_chat_persistence(user_id, conversation_id, chat_request.message, message_content, "".join(chunks), query_embedding)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 # Conversation management endpoints
 class ConversationListResponse(BaseModel):
     conversations: List[ConversationResponse]
-    total_count: int
+    total_count: Optional[int] = None
     has_more: bool
-    next_offset: Optional[int]
+    next_cursor: Optional[str] = None
+    next_offset: Optional[int] = None
 
 @app.get("/api/conversations", response_model=ConversationListResponse)
-async def get_conversations(request: Request, limit: int = 20, offset: int = 0, topic: Optional[str] = None, sub_topic: Optional[str] = None):
+async def get_conversations(request: Request, limit: int = 20, offset: int = 0, topic: Optional[str] = None, sub_topic: Optional[str] = None,
+                            cursor: Optional[str] = None, include_total: bool = False):
     """Get paginated conversations for the current user, optionally filtered by topic/subtopic"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        result = get_user_conversations(user_id, limit, offset, topic, sub_topic)
+        try:
+            result = await run_db(fetch_user_conversations, user_id, limit, offset, topic, sub_topic, cursor, include_total)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         return result
     except HTTPException:
         raise
@@ -2104,24 +2051,23 @@ async def get_conversations(request: Request, limit: int = 20, offset: int = 0,
 async def create_new_conversation(request: Request, conversation_data: ConversationCreate):
     """Create a new conversation"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
         # Validate sub-topic limit if provided
         if conversation_data.topic and conversation_data.sub_topic:
-            sub_topic_count = get_sub_topic_count(user_id, conversation_data.topic)
+            sub_topic_count = await run_db(get_sub_topic_count, user_id, conversation_data.topic)
             if sub_topic_count >= 5:
                 raise HTTPException(status_code=400, detail=f"Maximum 5 sub-topics allowed per topic. Topic '{conversation_data.topic}' already has {sub_topic_count} sub-topics.")
         
-        conversation_id = create_conversation(user_id, conversation_data.title, conversation_data.topic, conversation_data.sub_topic)
+        conversation_id = await run_db(create_conversation, user_id, conversation_data.title, conversation_data.topic, conversation_data.sub_topic)
         if not conversation_id:
             raise HTTPException(status_code=500, detail="Failed to create conversation")
         
         # Get the created conversation details
-        conversations_data = get_user_conversations(user_id, limit=20, offset=0, topic=None, sub_topic=None)
-        new_conversation = next((c for c in conversations_data['conversations'] if c['id'] == conversation_id), None)
+        new_conversation = await run_db(get_user_conversation, user_id, conversation_id)
         
         if not new_conversation:
             raise HTTPException(status_code=500, detail="Created conversation not found")
@@ -2134,12 +2080,17 @@ async def create_new_conversation(request: Request, conversation_data: Conversat
 async def get_conversation_messages_endpoint(conversation_id: str, request: Request, limit: int = 30, before_id: Optional[str] = None):
     """Get paginated messages for a specific conversation"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         
-        result = get_conversation_messages(conversation_id, limit, before_id)
+        try:
+            result = await run_db(fetch_conversation_messages, conversation_id, limit, before_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid before_id")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting conversation messages: {str(e)}")
 
@@ -2147,12 +2098,14 @@ async def get_conversation_messages_endpoint(conversation_id: str, request: Requ
 async def get_conversation_messages_all_endpoint(conversation_id: str, request: Request):
     """Get all messages for a specific conversation (legacy endpoint)"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         
-        messages = get_conversation_messages_all(conversation_id)
+        messages = await run_db(fetch_conversation_messages_all, conversation_id)
         return messages
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting conversation messages: {str(e)}")
 
@@ -2160,13 +2113,15 @@ async def get_conversation_messages_all_endpoint(conversation_id: str, request:
 async def get_topics_endpoint(request: Request):
     """Get all topics and sub-topics for the current user"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        topics = get_all_topics(user_id)
+        topics = await run_db(fetch_all_topics, user_id)
         return topics
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting topics: {str(e)}")
 
@@ -2174,12 +2129,12 @@ async def get_topics_endpoint(request: Request):
 async def get_user_name_endpoint(request: Request):
     """Get the current user's first name"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        first_name = get_user_first_name(user_id)
+        first_name = await run_db(fetch_user_first_name, user_id)
         return {"first_name": first_name}
     except HTTPException:
         raise
@@ -2196,7 +2151,7 @@ class SubtopicCreate(BaseModel):
 async def create_topic_endpoint(request: Request, topic_data: TopicCreate):
     """Create a new topic"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2204,7 +2159,7 @@ async def create_topic_endpoint(request: Request, topic_data: TopicCreate):
         if not topic_data.name or not topic_data.name.strip():
             raise HTTPException(status_code=400, detail="Topic name cannot be empty")
         
-        success = create_topic_entry(user_id, topic_data.name)
+        success = await run_db(create_topic_entry, user_id, topic_data.name)
         if success:
             return {"success": True, "topic": topic_data.name.lower().strip()}
         else:
@@ -2218,7 +2173,7 @@ async def create_topic_endpoint(request: Request, topic_data: TopicCreate):
 async def create_subtopic_endpoint(request: Request, topic: str, subtopic_data: SubtopicCreate):
     """Create a new sub-topic under an existing topic"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2227,15 +2182,15 @@ async def create_subtopic_endpoint(request: Request, topic: str, subtopic_data:
             raise HTTPException(status_code=400, detail="Sub-topic name cannot be empty")
         
         # Check if topic exists
-        topics = get_all_topics(user_id)
+        topics = await run_db(get_all_topics, user_id)
         if topic.lower() not in topics:
             raise HTTPException(status_code=404, detail="Topic not found")
         
         # Check sub-topic limit
-        if get_sub_topic_count(user_id, topic) >= 5:
+        if await run_db(get_sub_topic_count, user_id, topic) >= 5:
             raise HTTPException(status_code=400, detail="Maximum 5 sub-topics allowed per topic")
         
-        success = create_subtopic_entry(user_id, topic, subtopic_data.name)
+        success = await run_db(create_subtopic_entry, user_id, topic, subtopic_data.name)
         if success:
             return {"success": True, "topic": topic.lower(), "sub_topic": subtopic_data.name.lower().strip()}
         else:
@@ -2253,20 +2208,17 @@ class ConversationTopicUpdate(BaseModel):
 async def update_conversation_topic_endpoint(conversation_id: str, request: Request, topic_data: ConversationTopicUpdate):
     """Update the topic and sub-topic of an existing conversation"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
         # Verify the conversation belongs to the user
-        conversations = get_user_conversations(user_id, limit=1000, offset=0, topic=None, sub_topic=None)  # Get all conversations to check ownership
-        conversation_exists = any(conv['id'] == conversation_id for conv in conversations['conversations'])
-        
-        if not conversation_exists:
+        if not await run_db(user_owns_conversation, user_id, conversation_id):
             raise HTTPException(status_code=404, detail="Conversation not found")
         
         # Update the conversation topic
-        success = update_conversation_topic(conversation_id, topic_data.topic, topic_data.sub_topic)
+        success = await run_db(update_conversation_topic, conversation_id, topic_data.topic, topic_data.sub_topic)
         
         if success:
             return {"success": True, "conversation_id": conversation_id, "topic": topic_data.topic, "sub_topic": topic_data.sub_topic}
@@ -2281,53 +2233,21 @@ async def update_conversation_topic_endpoint(conversation_id: str, request: Requ
 async def delete_conversation(conversation_id: str, request: Request):
     """Delete a conversation and all its memories"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
         # Verify the conversation belongs to the user
-        conversations = get_user_conversations(user_id, limit=1000, offset=0, topic=None, sub_topic=None)
-        conversation_exists = any(conv['id'] == conversation_id for conv in conversations['conversations'])
-        
-        if not conversation_exists:
+        if not await run_db(user_owns_conversation, user_id, conversation_id):
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        # Delete from Neo4j intelligent memory system
-        try:
-            if intelligent_memory_system:
-                with intelligent_memory_system.driver.session() as session:
-                    result = session.run("""
-                        MATCH (m:IntelligentMemory)
-                        WHERE m.conversation_id = $conversation_id AND m.user_id = $user_id
-                        DELETE m
-                        RETURN count(*) as deleted_count
-                    """, {
-                        'conversation_id': conversation_id,
-                        'user_id': user_id
-                    })
-                    memory_result = result.single()
-                    deleted_memories = memory_result['deleted_count'] if memory_result else 0
-                    print(f"Deleted {deleted_memories} memories from Neo4j")
-        except Exception as e:
-            print(f"Error deleting memories from Neo4j: {e}")
-            # Continue with PostgreSQL deletion even if Neo4j fails
-        
-        # Delete from PostgreSQL
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Delete conversation messages first (foreign key constraint)
-        cursor.execute("DELETE FROM conversation_messages WHERE conversation_id = %s", (conversation_id,))
-        
-        # Delete the conversation
-        cursor.execute("DELETE FROM conversations WHERE id = %s AND user_id = %s", (conversation_id, user_id))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Memories and rows are removed by the deletion worker; the client polls the job
+        job = await deletion_jobs.submit(user_id, 'conversation', conversation_id=conversation_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Conversation not found")
         
-        return {"success": True, "message": "Conversation and memories deleted successfully"}
+        return JSONResponse(status_code=202, content={"success": True, "message": "Conversation deletion started", "job": job})
         
     except HTTPException:
         raise
@@ -2341,9 +2261,8 @@ async def clear_memory_database():
     """Clear all data from Neo4j database"""
     try:
         from intelligent_memory import intelligent_memory
-        with intelligent_memory.driver.session() as session:
-            # Delete all nodes and relationships
-            session.run("MATCH (n) DETACH DELETE n")
+        # Delete all nodes and relationships
+        await intelligent_memory.clear_all()
             
         return {"status": "success", "message": "All memory data cleared from database"}
     except Exception as e:
@@ -2355,7 +2274,7 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
     """Upload and store file content in PostgreSQL"""
     try:
         # Get user from session
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2365,15 +2284,8 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
         file_content = content.decode('utf-8')
         
         # Store in database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO user_files (user_id, filename, content, file_type) VALUES (%s, %s, %s, %s)",
-            (user_id, file.filename, file_content, file.content_type)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        if not await run_db(store_user_file, user_id, file.filename, file_content, file.content_type):
+            raise HTTPException(status_code=500, detail=f"Failed to store file {file.filename}")
         
         return {"message": f"File {file.filename} uploaded successfully"}
     except Exception as e:
@@ -2384,25 +2296,17 @@ async def upload_file(request: Request, file: UploadFile = File(...)):
 async def download_file(filename: str, request: Request):
     """Download a file for the current user"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT content, file_type FROM user_files WHERE user_id = %s AND filename = %s",
-            (user_id, filename)
-        )
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        result = await run_db(get_user_file, user_id, filename)
         
         if not result:
             raise HTTPException(status_code=404, detail="File not found")
         
-        content, file_type = result
+        content, file_type = result['content'], result['file_type']
         
         # Set appropriate headers for file download
         headers = {
@@ -2421,94 +2325,73 @@ async def download_file(filename: str, request: Request):
 async def get_user_files(request: Request, search: Optional[str] = None):
     """Get all files for the current user with optional search"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        if search is not None:
-            cursor.execute("""
-                SELECT id, filename, file_type, uploaded_at, 
-                       LEFT(content, 100) as content_preview
-                FROM user_files 
-                WHERE user_id = %s AND filename ILIKE %s
-                ORDER BY uploaded_at DESC
-            """, (user_id, f"%{search}%"))
-        else:
-            cursor.execute("""
-                SELECT id, filename, file_type, uploaded_at,
-                       LEFT(content, 100) as content_preview
-                FROM user_files 
-                WHERE user_id = %s
-                ORDER BY uploaded_at DESC
-            """, (user_id,))
-        
-        files = []
-        for row in cursor.fetchall():
-            files.append({
-                'id': row[0],
-                'filename': row[1],
-                'file_type': row[2],
-                'uploaded_at': row[3].isoformat(),
-                'content_preview': row[4] + "..." if len(row[4]) == 100 else row[4]
-            })
-        
-        cursor.close()
-        conn.close()
+        files = await run_db(fetch_user_files, user_id, search)
         return files
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting files: {str(e)}")
 
 # Get all available models from OpenRouter
 @app.get("/api/models")
-async def get_available_models():
-    """Get all available models from OpenRouter"""
-    try:
-        from model_service import ModelService
-        model_service = ModelService()
-        models = model_service.get_models()
-        # Sort alphabetically by name
-        models.sort(key=lambda x: x.get('name', '').lower())
-        return models
-    except Exception as e:
-        # Return basic models if OpenRouter is unavailable
-        default_models = [
-            {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini", "description": "Fast and efficient model for general chat"},
-            {"id": "google/gemini-2.0-flash-001", "name": "Gemini 2.0 Flash", "description": "Google's latest fast model"}
-        ]
-        return default_models
+async def get_available_models(request: Request):
+    """Get all available models from OpenRouter, served from the in-memory catalog"""
+    body, etag = await model_service.get_catalog()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MODEL_CATALOG_MAX_AGE}, stale-while-revalidate={int(model_service.catalog_ttl)}"
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.delete("/api/topics/{topic_name}")
 async def delete_topic_endpoint(topic_name: str, request: Request):
     """Delete a topic and all its data"""
-    user_id = request.session.get('user_id')
-    if not user_id:
+    user_data = await get_authenticated_user(request)
+    if not user_data:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id = user_data['user_id']
     
-    success = delete_topic_and_data(user_id, topic_name.lower())
+    job = await deletion_jobs.submit(user_id, 'topic', topic=topic_name.lower().strip())
     
-    if success:
-        return {"success": True, "message": f"Topic '{topic_name}' has been permanently deleted."}
+    if job:
+        return JSONResponse(status_code=202, content={"success": True, "message": f"Deleting topic '{topic_name}'.", "job": job})
     else:
         raise HTTPException(status_code=400, detail=f"Error deleting topic '{topic_name}'. The topic may not exist or there was a system error.")
 
 @app.delete("/api/topics/{topic_name}/subtopics/{subtopic_name}")
 async def delete_subtopic_endpoint(topic_name: str, subtopic_name: str, request: Request):
     """Delete a subtopic and all its data"""
-    user_id = request.session.get('user_id')
-    if not user_id:
+    user_data = await get_authenticated_user(request)
+    if not user_data:
         raise HTTPException(status_code=401, detail="Not authenticated")
+    user_id = user_data['user_id']
     
-    success = delete_subtopic_and_data(user_id, topic_name.lower(), subtopic_name.lower())
+    job = await deletion_jobs.submit(user_id, 'subtopic', topic=topic_name.lower().strip(), sub_topic=subtopic_name.lower().strip())
     
-    if success:
-        return {"success": True, "message": f"Subtopic '{subtopic_name}' has been permanently deleted from topic '{topic_name}'."}
+    if job:
+        return JSONResponse(status_code=202, content={"success": True, "message": f"Deleting subtopic '{subtopic_name}' from topic '{topic_name}'.", "job": job})
     else:
         raise HTTPException(status_code=400, detail=f"Error deleting subtopic '{subtopic_name}' from topic '{topic_name}'. It may not exist or there was a system error.")
 
+@app.get("/api/deletion-jobs/{job_id}")
+async def get_deletion_job_endpoint(job_id: str, request: Request):
+    """Status and progress of a conversation, sub-topic or topic deletion"""
+    user_data = await get_authenticated_user(request)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    job = await deletion_jobs.get(job_id, user_data['user_id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
+
 # Daily summary endpoint removed - functionality replaced by RIAI quality-boosted retrieval
 
 # RIAI test endpoint
@@ -2516,7 +2399,7 @@ async def delete_subtopic_endpoint(topic_name: str, subtopic_name: str, request:
 async def test_riai_scoring(request: Request):
     """Test RIAI background scoring system"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2544,7 +2427,7 @@ class FeedbackRequest(BaseModel):
 async def submit_feedback(feedback_request: FeedbackRequest, request: Request):
     """Submit human feedback for RIAI H(t) function"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2598,7 +2481,7 @@ class ImplicitFeedbackRequest(BaseModel):
 async def submit_implicit_feedback(feedback_request: ImplicitFeedbackRequest, request: Request):
     """Submit implicit behavioral feedback for RIAI H(t) function"""
     try:
-        user_data = get_authenticated_user(request)
+        user_data = await get_authenticated_user(request)
         if not user_data:
             raise HTTPException(status_code=401, detail="Not authenticated")
         user_id = user_data['user_id']
@@ -2655,7 +2538,18 @@ async def submit_implicit_feedback(feedback_request: ImplicitFeedbackRequest, re
 @app.get("/health")
 async def health_check():
     """System health check"""
-    return {"status": "healthy", "service": "NeuroLM Memory System"}
+    return {
+        "status": "healthy",
+        "service": "NeuroLM Memory System",
+        "database_pool": db_pool.metrics(),
+        "memory_queue": memory_ingest_queue.metrics() if memory_ingest_queue else None,
+        "deletion_jobs": deletion_jobs.metrics(),
+        "http_cache": http_cache.metrics(),
+        "result_cache": result_cache.metrics(),
+        "embeddings": intelligent_memory_system.embedding_service.metrics() if intelligent_memory_system else None,
+        "memory_index": intelligent_memory_system.memory_index.metrics() if intelligent_memory_system else None,
+        "sessions": session_backend.metrics()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,282 @@
+"""
+Memory Vector Index
+In-process mirror of IntelligentMemory embeddings, sharded per user, so semantic recall
+runs as a NumPy matrix product instead of a Neo4j round trip. Neo4j remains the source of truth:
+shards are hydrated from it on demand and callers fall back to it while a shard is cold.
+Shards expire after MEMORY_INDEX_MAX_AGE seconds, so writes and deletes handled by another
+process show up here within that bound.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Same cut-off as the Neo4j search; scores use Neo4j's [0, 1] cosine scale
+MIN_SIMILARITY = 0.3
+
+
+class MemoryShard:
+    """One user's memories as a matrix of unit-length float32 rows plus parallel metadata"""
+
+    def __init__(self):
+        # Rows live at the front of a buffer that doubles when full, so appends don't copy the matrix
+        self._buffer = None
+        self.ids: List[str] = []
+        self.contents: List[str] = []
+        self.conversation_ids: List[str] = []
+        self.quality: List[float] = []
+        self.positions: Dict[str, int] = {}
+        self.ready = False
+        # The shard reflects Neo4j as of when its load started
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def matrix(self):
+        """The filled rows of the buffer (a view, not a copy), or None when empty"""
+        return self._buffer[:len(self.ids)] if self._buffer is not None and self.ids else None
+
+    def add(self, records: Iterable[Dict]) -> int:
+        """Append memories not already in the shard; returns how many were added"""
+        rows = []
+        for record in records:
+            memory_id = record['id']
+            embedding = record.get('embedding')
+            if memory_id in self.positions or not embedding:
+                continue
+            vector = np.asarray(embedding, dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            if norm == 0.0:
+                continue
+            self.positions[memory_id] = len(self.ids)
+            self.ids.append(memory_id)
+            self.contents.append(record.get('content') or "")
+            self.conversation_ids.append(record.get('conversation_id') or "")
+            quality = record.get('final_quality_score')
+            self.quality.append(math.nan if quality is None else float(quality))
+            rows.append(vector / norm)
+
+        if rows:
+            end = len(self.ids)
+            start = end - len(rows)
+            capacity = 0 if self._buffer is None else self._buffer.shape[0]
+            if end > capacity:
+                grown = np.empty((max(end, capacity * 2, 16), len(rows[0])), dtype=np.float32)
+                if start:
+                    grown[:start] = self._buffer[:start]
+                self._buffer = grown
+            self._buffer[start:end] = rows
+        return len(rows)
+
+    def remove_conversations(self, conversation_ids: Iterable[str]) -> int:
+        """Drop every memory belonging to the given conversations; returns how many were removed"""
+        targets = set(conversation_ids)
+        keep = [index for index, conversation_id in enumerate(self.conversation_ids) if conversation_id not in targets]
+        removed = len(self.ids) - len(keep)
+        if removed:
+            self._buffer = self._buffer[keep] if keep else None
+            self.ids = [self.ids[index] for index in keep]
+            self.contents = [self.contents[index] for index in keep]
+            self.conversation_ids = [self.conversation_ids[index] for index in keep]
+            self.quality = [self.quality[index] for index in keep]
+            self.positions = {memory_id: index for index, memory_id in enumerate(self.ids)}
+        return removed
+
+    def set_quality(self, memory_id: str, score: float) -> bool:
+        index = self.positions.get(memory_id)
+        if index is None:
+            return False
+        self.quality[index] = float(score)
+        return True
+
+    def search(self, query, limit: int) -> List[Dict]:
+        """Top matches by similarity, re-ordered by quality-boosted score like the Neo4j query"""
+        if self.matrix is None or limit <= 0:
+            return []
+
+        # Rows and query are unit length, so the dot product is the cosine; map it onto [0, 1] like Neo4j
+        scores = (self.matrix @ query + 1.0) / 2.0
+        candidates = np.flatnonzero(scores > MIN_SIMILARITY)
+        if candidates.size > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+
+        results = []
+        for index in candidates:
+            score = float(scores[index])
+            quality = self.quality[index]
+            has_quality = not math.isnan(quality)
+            results.append({
+                'id': self.ids[index],
+                'content': self.contents[index],
+                'score': score,
+                'type': 'memory',
+                'final_quality_score': quality if has_quality else None,
+                'boosted_score': quality * 0.2 + score * 0.8 if has_quality else score
+            })
+        results.sort(key=lambda result: result['boosted_score'], reverse=True)
+        return results
+
+
+class MemoryIndex:
+    """Per-user shards of memory embeddings, hydrated lazily and evicted least recently used first"""
+
+    def __init__(self, loader: Callable[[str], Awaitable[List[Dict]]], enabled: Optional[bool] = None,
+                 max_vectors: Optional[int] = None, max_age: Optional[float] = None):
+        # loader(user_id) returns that user's memories (id, content, conversation_id, embedding, final_quality_score)
+        self.loader = loader
+        requested = enabled if enabled is not None else os.getenv("MEMORY_INDEX_ENABLED", "true").lower() == "true"
+        self.enabled = requested and np is not None
+        if requested and np is None:
+            print("⚠️ NumPy not installed; in-process memory index disabled, searching Neo4j directly")
+        # Upper bound on mirrored vectors across all shards (1536-dim float32 is ~6 KB each)
+        self.max_vectors = max_vectors or int(os.getenv("MEMORY_INDEX_MAX_VECTORS", "100000"))
+        # Writes from other processes only reach Neo4j, so a shard is reloaded once it is this old
+        self.max_age = max_age if max_age is not None else float(os.getenv("MEMORY_INDEX_MAX_AGE", "300"))
+
+        self._shards: "OrderedDict[str, MemoryShard]" = OrderedDict()
+        self._hydrations: Dict[str, asyncio.Task] = {}
+        self._vector_count = 0
+        self._metrics = {
+            'hits': 0,
+            'cold_misses': 0,
+            'hydrations': 0,
+            'hydration_errors': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def search(self, user_id: str, query_embedding: List[float], limit: int) -> Optional[List[Dict]]:
+        """Search a user's shard; returns None when the shard is cold so the caller can use Neo4j"""
+        if not self.enabled:
+            return None
+
+        shard = self._shards.get(user_id)
+        if shard is not None and shard.ready and time.monotonic() - shard.loaded_at >= self.max_age:
+            self._drop(user_id)
+            self._metrics['expirations'] += 1
+            shard = None
+        if shard is None or not shard.ready:
+            self._metrics['cold_misses'] += 1
+            self.hydrate_in_background(user_id)
+            return None
+
+        self._shards.move_to_end(user_id)
+        self._metrics['hits'] += 1
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        return shard.search(query / norm, limit)
+
+    def hydrate_in_background(self, user_id: str) -> Optional[asyncio.Task]:
+        """Start loading a user's shard from Neo4j unless it is already loaded or loading"""
+        if not self.enabled:
+            return None
+        if user_id in self._hydrations:
+            return self._hydrations[user_id]
+        shard = self._shards.get(user_id)
+        if shard is not None and shard.ready:
+            return None
+
+        # Writes arriving while the load is in flight land in this shard and are kept
+        self._shards[user_id] = MemoryShard()
+        task = asyncio.get_running_loop().create_task(self._hydrate(user_id))
+        self._hydrations[user_id] = task
+        task.add_done_callback(lambda _: self._hydrations.pop(user_id, None))
+        return task
+
+    async def _hydrate(self, user_id: str):
+        try:
+            records = await self.loader(user_id)
+        except Exception as e:
+            self._metrics['hydration_errors'] += 1
+            print(f"Memory index hydration failed for user {user_id}: {e}")
+            self._drop(user_id)
+            return
+
+        shard = self._shards.get(user_id)
+        if shard is None:
+            # Invalidated (delete or eviction) while loading; the next search starts over
+            return
+        self._vector_count += shard.add(records)
+        shard.ready = True
+        self._metrics['hydrations'] += 1
+        self._shards.move_to_end(user_id)
+        self._evict()
+
+    async def warm(self, user_ids: Iterable[str]):
+        """Hydrate several users' shards, e.g. the most active users at startup"""
+        tasks = [task for task in (self.hydrate_in_background(user_id) for user_id in user_ids) if task]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def add(self, memories: Iterable[Dict]):
+        """Mirror newly stored memories into shards that are loaded or loading"""
+        if not self.enabled:
+            return
+        for memory in memories:
+            shard = self._shards.get(memory['user_id'])
+            # Cold users pick the memory up from Neo4j when their shard is hydrated
+            if shard is not None:
+                self._vector_count += shard.add([memory])
+        self._evict()
+
+    def remove_conversations(self, user_id: str, conversation_ids: List[str]):
+        """Mirror a conversation delete"""
+        shard = self._shards.get(user_id)
+        if shard is None:
+            return
+        if not shard.ready:
+            # An in-flight load may already hold the deleted rows, so discard it
+            self._drop(user_id)
+            return
+        self._vector_count -= shard.remove_conversations(conversation_ids)
+
+    def set_quality(self, user_id: str, memory_id: str, score: float):
+        """Mirror an updated final quality score"""
+        shard = self._shards.get(user_id)
+        if shard is not None:
+            shard.set_quality(memory_id, score)
+
+    def clear(self):
+        """Drop every shard"""
+        for task in list(self._hydrations.values()):
+            task.cancel()
+        self._shards.clear()
+        self._vector_count = 0
+
+    def _drop(self, user_id: str):
+        shard = self._shards.pop(user_id, None)
+        if shard is not None:
+            self._vector_count -= len(shard)
+
+    def _evict(self):
+        """Drop least recently used ready shards until under the vector budget"""
+        for user_id in list(self._shards):
+            if self._vector_count <= self.max_vectors:
+                break
+            if self._shards[user_id].ready and len(self._shards) > 1:
+                self._drop(user_id)
+                self._metrics['evictions'] += 1
+
+    def metrics(self) -> Dict:
+        """Shard sizes and hit counters since startup"""
+        snapshot = dict(self._metrics)
+        lookups = snapshot['hits'] + snapshot['cold_misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        snapshot['enabled'] = self.enabled
+        snapshot['shards'] = len(self._shards)
+        snapshot['vectors'] = self._vector_count
+        snapshot['max_vectors'] = self.max_vectors
+        snapshot['max_age'] = self.max_age
+        return snapshot
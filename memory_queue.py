@@ -0,0 +1,287 @@
+"""
+Memory Ingestion Queue
+Write-behind queue that embeds and stores chat memories after the response has been sent,
+backed by a PostgreSQL spill table so queued memories survive restarts
+"""
+
+import asyncio
+import os
+import uuid
+from array import array
+from typing import Dict, List, Optional
+
+import openai
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from database import db_pool, run_db
+
+# Failures that say nothing about the rows themselves; splitting the batch would only repeat them
+OUTAGE_ERRORS = (
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    ServiceUnavailable,
+    SessionExpired,
+    TransientError
+)
+
+
+class MemoryIngestionQueue:
+    """Durable write-behind queue feeding IntelligentMemorySystem.store_memories in batches"""
+
+    def __init__(self, memory_system, batch_size: Optional[int] = None, poll_interval: Optional[float] = None,
+                 max_attempts: Optional[int] = None, lease_seconds: Optional[float] = None):
+        self.memory_system = memory_system
+        self.batch_size = batch_size or int(os.getenv("MEMORY_QUEUE_BATCH_SIZE", "32"))
+        # Idle workers re-check the table this often, picking up rows left by restarts or other processes
+        self.poll_interval = poll_interval or float(os.getenv("MEMORY_QUEUE_POLL_INTERVAL", "5"))
+        self.max_attempts = max_attempts or int(os.getenv("MEMORY_QUEUE_MAX_ATTEMPTS", "5"))
+        # Claimed rows become visible again after this long if the worker dies mid-batch
+        self.lease_seconds = lease_seconds or float(os.getenv("MEMORY_QUEUE_LEASE_SECONDS", "120"))
+
+        self._worker: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._metrics = {
+            'enqueued': 0,
+            'stored': 0,
+            'skipped': 0,
+            'batches': 0,
+            'failed_batches': 0,
+            'splits': 0,
+            'orphaned': 0
+        }
+
+    def _insert(self, memories: List[Dict]) -> int:
+        """Append memories to the spill table"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            for memory in memories:
+                embedding = memory.get('embedding')
+                cursor.execute('''
+                    INSERT INTO memory_ingest_queue (memory_id, content, user_id, conversation_id, message_type, message_id, embedding)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ''', (str(uuid.uuid4()), memory['content'], memory['user_id'], memory.get('conversation_id'),
+                      memory.get('message_type', 'user'), memory.get('message_id'),
+                      array('f', embedding).tobytes() if embedding else None))
+            conn.commit()
+            cursor.close()
+        return len(memories)
+
+    def _claim(self) -> List[Dict]:
+        """Lease the next batch of pending memories"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            # Rows whose conversation was deleted after they were queued are dropped, not stored
+            cursor.execute('''
+                WITH candidates AS (
+                    SELECT id FROM memory_ingest_queue
+                    WHERE available_at <= CURRENT_TIMESTAMP AND attempts < %s
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ),
+                orphaned AS (
+                    DELETE FROM memory_ingest_queue q
+                    USING candidates
+                    WHERE q.id = candidates.id AND q.conversation_id IS NOT NULL
+                      AND NOT EXISTS (SELECT 1 FROM conversations c WHERE c.id = q.conversation_id)
+                    RETURNING q.id
+                )
+                UPDATE memory_ingest_queue
+                SET attempts = attempts + 1,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+                WHERE id IN (SELECT id FROM candidates) AND id NOT IN (SELECT id FROM orphaned)
+                RETURNING id, memory_id, content, user_id, conversation_id, message_type, message_id, embedding
+            ''', (self.max_attempts, self.batch_size, self.lease_seconds))
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+
+        batch = []
+        for row in sorted(rows, key=lambda row: row[0]):
+            embedding = None
+            if row[7]:
+                vector = array('f')
+                vector.frombytes(bytes(row[7]))
+                embedding = vector.tolist()
+            batch.append({
+                'queue_id': row[0],
+                'id': row[1],
+                'content': row[2],
+                'user_id': row[3],
+                'conversation_id': row[4],
+                'message_type': row[5],
+                'message_id': row[6],
+                'embedding': embedding
+            })
+        return batch
+
+    def _complete(self, queue_ids: List[int]):
+        """Remove stored memories from the spill table"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM memory_ingest_queue WHERE id = ANY(%s)', (queue_ids,))
+            conn.commit()
+            cursor.close()
+
+    def _missing_conversations(self, conversation_ids: List[str]) -> List[str]:
+        """The given conversations that no longer exist"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM conversations WHERE id = ANY(%s)', (conversation_ids,))
+            existing = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+        return [conversation_id for conversation_id in conversation_ids if conversation_id not in existing]
+
+    def _retry_later(self, queue_ids: List[int], error: str):
+        """Release a failed batch with exponential backoff; rows past max_attempts stay as dead letters"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE memory_ingest_queue
+                SET last_error = %s,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => LEAST(POWER(2, attempts), 300))
+                WHERE id = ANY(%s)
+            ''', (error[:1000], queue_ids))
+            conn.commit()
+            cursor.close()
+
+    async def enqueue(self, memories: List[Dict]):
+        """Durably queue memories (content, user_id, conversation_id, message_type, message_id and an
+        optional precomputed embedding) for storage"""
+        if not memories:
+            return
+        await run_db(self._insert, memories)
+        self._metrics['enqueued'] += len(memories)
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def _try_store(self, batch: List[Dict]):
+        """Store a batch; returns (memory_ids, None) or (None, error)"""
+        try:
+            return await self.memory_system.store_memories(batch), None
+        except Exception as e:
+            return None, e
+
+    async def _store_isolating(self, batch: List[Dict], error: Exception):
+        """Bisect a failed batch so rows that store are not held back by one that cannot
+        (e.g. a reply over the embedding token limit). Outages fail every row without splitting.
+        Returns ([(memory, memory_id)], [(memory, error)]).
+        """
+        if len(batch) == 1 or isinstance(error, OUTAGE_ERRORS):
+            return [], [(memory, error) for memory in batch]
+        middle = len(batch) // 2
+
+        stored, failed = [], []
+        for half in (batch[:middle], batch[middle:]):
+            memory_ids, e = await self._try_store(half)
+            if e is None:
+                stored.extend(zip(half, memory_ids))
+            else:
+                self._metrics['splits'] += 1
+                half_stored, half_failed = await self._store_isolating(half, e)
+                stored.extend(half_stored)
+                failed.extend(half_failed)
+        return stored, failed
+
+    async def _remove_orphans(self, stored: List) -> int:
+        """Delete memories just stored for conversations deleted while the batch was in flight.
+
+        _claim drops rows whose conversation is already gone, but a deletion job can run its
+        Neo4j delete while this worker is embedding and storing; the job sweeps Neo4j again after
+        deleting the conversation, and this check covers stores that land after that sweep.
+        """
+        by_user: Dict[str, set] = {}
+        for memory, memory_id in stored:
+            if memory_id and memory['conversation_id']:
+                by_user.setdefault(memory['user_id'], set()).add(memory['conversation_id'])
+        removed = 0
+        for user_id, conversation_ids in by_user.items():
+            missing = await run_db(self._missing_conversations, list(conversation_ids))
+            if missing:
+                await self.memory_system.delete_conversation_memories(user_id, missing)
+                removed += sum(1 for memory, memory_id in stored
+                               if memory_id and memory['user_id'] == user_id and memory['conversation_id'] in missing)
+        self._metrics['orphaned'] += removed
+        return removed
+
+    async def process_batch(self) -> int:
+        """Embed and store one batch of queued memories; returns the number of rows claimed"""
+        batch = await run_db(self._claim)
+        if not batch:
+            return 0
+
+        self._metrics['batches'] += 1
+        memory_ids, error = await self._try_store(batch)
+        if error is None:
+            stored, failed = list(zip(batch, memory_ids)), []
+        else:
+            self._metrics['splits'] += 1
+            stored, failed = await self._store_isolating(batch, error)
+
+        if failed:
+            self._metrics['failed_batches'] += 1
+            print(f"Error storing {len(failed)} of {len(batch)} queued memories (will retry): {failed[0][1]}")
+            # Rows are released one error at a time so each keeps the message that explains it
+            errors: Dict[str, List[int]] = {}
+            for memory, e in failed:
+                errors.setdefault(str(e), []).append(memory['queue_id'])
+            for message, queue_ids in errors.items():
+                await run_db(self._retry_later, queue_ids, message)
+        if stored:
+            await run_db(self._complete, [memory['queue_id'] for memory, _ in stored])
+
+        stored_count = sum(1 for _, memory_id in stored if memory_id)
+        if stored_count:
+            try:
+                stored_count -= await self._remove_orphans(stored)
+            except Exception as e:
+                print(f"Error removing memories of deleted conversations: {e}")
+        self._metrics['stored'] += stored_count
+        self._metrics['skipped'] += len(stored) - stored_count
+        print(f"DEBUG: Memory queue stored {stored_count} of {len(batch)} queued messages")
+        return len(batch)
+
+    async def _run(self):
+        """Worker loop: drain the table, then sleep until woken or the poll interval passes"""
+        while not self._stopping:
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                print(f"Memory queue worker error: {e}")
+                claimed = 0
+
+            if claimed < self.batch_size and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def start(self):
+        """Start the background worker; the spill table comes from migrations.py"""
+        if self._worker:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+        print("✅ Memory ingestion queue started")
+
+    async def stop(self, timeout: float = 10.0):
+        """Let the worker finish its current batch; anything still queued is picked up on next start"""
+        if not self._worker:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._worker, timeout=timeout)
+        except asyncio.TimeoutError:
+            print("Memory queue worker did not stop in time; pending rows will be retried after their lease")
+        self._worker = None
+
+    def metrics(self) -> Dict:
+        """Counters for queue throughput since startup"""
+        snapshot = dict(self._metrics)
+        snapshot['running'] = self._worker is not None
+        return snapshot
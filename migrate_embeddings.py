@@ -0,0 +1,99 @@
+"""
+Migrate IntelligentMemory embeddings to compact storage
+Adds the int8 copy and truncated search vector used when MEMORY_EMBEDDING_STORAGE=compact,
+and optionally drops the full float list once every node has been converted.
+Safe to re-run: only nodes without an int8 copy are touched.
+"""
+
+import argparse
+import os
+
+from neo4j import GraphDatabase
+
+from embedding_codec import quantize_int8, truncate
+
+
+def migrate_embeddings(dimensions: int, batch_size: int, drop_full: bool):
+    """Convert every memory node that still lacks compact embeddings"""
+    neo4j_uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    neo4j_user = os.getenv("NEO4J_USERNAME", "neo4j")
+    neo4j_password = os.getenv("NEO4J_PASSWORD", "password")
+
+    driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
+    migrated = 0
+
+    try:
+        with driver.session() as session:
+            session.run(f"""
+                CREATE VECTOR INDEX memory_search_index IF NOT EXISTS
+                FOR (m:IntelligentMemory) ON (m.embedding_search)
+                OPTIONS {{indexConfig: {{
+                    `vector.dimensions`: {dimensions},
+                    `vector.similarity_function`: 'cosine'
+                }}}}
+            """).consume()
+
+            while True:
+                result = session.run("""
+                    MATCH (m:IntelligentMemory)
+                    WHERE m.embedding IS NOT NULL AND m.embedding_q8 IS NULL
+                    RETURN m.id AS id, m.embedding AS embedding
+                    LIMIT $batch_size
+                """, batch_size=batch_size)
+                rows = []
+                for record in result:
+                    embedding_q8, embedding_scale = quantize_int8(record['embedding'])
+                    rows.append({
+                        'id': record['id'],
+                        'embedding_q8': embedding_q8,
+                        'embedding_scale': embedding_scale,
+                        'embedding_search': truncate(record['embedding'], dimensions)
+                    })
+                if not rows:
+                    break
+
+                session.run("""
+                    UNWIND $rows AS row
+                    MATCH (m:IntelligentMemory {id: row.id})
+                    SET m.embedding_q8 = row.embedding_q8,
+                        m.embedding_scale = row.embedding_scale
+                    WITH m, row
+                    CALL db.create.setNodeVectorProperty(m, 'embedding_search', row.embedding_search)
+                """, rows=rows).consume()
+                migrated += len(rows)
+                print(f"Migrated {migrated} memories")
+
+            if drop_full:
+                remaining = session.run("""
+                    MATCH (m:IntelligentMemory)
+                    WHERE m.embedding IS NOT NULL AND m.embedding_q8 IS NULL
+                    RETURN count(m) AS remaining
+                """).single()['remaining']
+                if remaining:
+                    print(f"❌ {remaining} memories still lack compact embeddings; full vectors kept")
+                else:
+                    session.run("""
+                        MATCH (m:IntelligentMemory)
+                        WHERE m.embedding IS NOT NULL
+                        CALL {
+                            WITH m
+                            REMOVE m.embedding
+                        } IN TRANSACTIONS OF 1000 ROWS
+                    """).consume()
+                    session.run("DROP INDEX memory_embedding_index IF EXISTS").consume()
+                    print("✅ Full-precision embeddings removed")
+
+        print(f"✅ Migration complete: {migrated} memories converted")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert memory embeddings to compact storage")
+    parser.add_argument("--dimensions", type=int, default=int(os.getenv("MEMORY_SEARCH_DIMENSIONS", "256")),
+                        help="Length of the truncated search vector")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--drop-full", action="store_true",
+                        help="Remove the full float embeddings after conversion")
+    args = parser.parse_args()
+    migrate_embeddings(args.dimensions, args.batch_size, args.drop_full)
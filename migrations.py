@@ -0,0 +1,401 @@
+"""
+Database Migrations
+Versioned schema changes for the application's PostgreSQL tables, applied in order at startup
+and recorded in schema_migrations so each runs exactly once
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from database import DatabasePool, db_pool
+
+# Arbitrary key for the advisory lock that serializes migration runs across processes
+MIGRATION_LOCK_KEY = 727274
+
+
+@dataclass
+class Migration:
+    """One schema change; concurrent migrations run outside a transaction so indexes build without blocking writes"""
+    version: int
+    name: str
+    statements: List[str] = field(default_factory=list)
+    concurrent: bool = False
+
+
+MIGRATIONS = [
+    Migration(1, "initial schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id VARCHAR(255) PRIMARY KEY,
+            first_name VARCHAR(255) NOT NULL,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id VARCHAR(255) PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            title VARCHAR(255) NOT NULL,
+            topic VARCHAR(255),
+            sub_topic VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            message_count INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS conversation_messages (
+            id SERIAL PRIMARY KEY,
+            conversation_id VARCHAR(255) NOT NULL,
+            message_type VARCHAR(50) NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_files (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            file_type VARCHAR(50),
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS memory_links (
+            id SERIAL PRIMARY KEY,
+            source_memory_id VARCHAR(255) NOT NULL,
+            linked_topic VARCHAR(255) NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id VARCHAR(255) PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            username VARCHAR(255) NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS user_tools (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            tool_name VARCHAR(255) NOT NULL,
+            function_code TEXT NOT NULL,
+            schema_json TEXT NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT TRUE,
+            usage_count INTEGER DEFAULT 0,
+            success_count INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            UNIQUE(user_id, tool_name)
+        )
+        '''
+    ]),
+    Migration(2, "indexes for hot queries", [
+        # Conversation list, newest first
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_updated ON conversations (user_id, updated_at DESC)',
+        # Topic and sub-topic filters, placeholder cleanup, topic deletion
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_topic ON conversations (user_id, topic, sub_topic)',
+        # Keyset message paging
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversation_messages_conversation_id ON conversation_messages (conversation_id, id)',
+        # Full conversation history and previews in created_at order
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversation_messages_conversation_created ON conversation_messages (conversation_id, created_at)',
+        # File lookups by name
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_files_user_filename ON user_files (user_id, filename)',
+        # Recent files for chat context
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_files_user_uploaded ON user_files (user_id, uploaded_at DESC)',
+        # Expired session sweep
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)',
+        # Memory links per user, newest first
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memory_links_user_created ON memory_links (user_id, created_at)'
+    ], concurrent=True),
+    Migration(3, "conversation last message preview", [
+        'ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message TEXT',
+        'ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_type VARCHAR(50)',
+        # Must match CONVERSATION_PREVIEW_LENGTH in main.py
+        '''
+        UPDATE conversations c
+        SET last_message = LEFT(m.content, 200), last_message_type = m.message_type
+        FROM (
+            SELECT DISTINCT ON (conversation_id) conversation_id, content, message_type
+            FROM conversation_messages
+            ORDER BY conversation_id, id DESC
+        ) m
+        WHERE m.conversation_id = c.id
+        '''
+    ]),
+    Migration(4, "conversation list keyset index", [
+        # Conversation list keyset on (updated_at, id), replacing the updated_at-only index
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_updated_id ON conversations (user_id, updated_at DESC, id DESC)',
+        'DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_user_updated'
+    ], concurrent=True),
+    Migration(5, "deletion jobs", [
+        '''
+        CREATE TABLE IF NOT EXISTS deletion_jobs (
+            id VARCHAR(255) PRIMARY KEY,
+            user_id VARCHAR(255) NOT NULL,
+            kind VARCHAR(20) NOT NULL,
+            topic VARCHAR(255),
+            sub_topic VARCHAR(255),
+            conversation_id VARCHAR(255),
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            total_conversations INTEGER NOT NULL DEFAULT 0,
+            deleted_conversations INTEGER NOT NULL DEFAULT 0,
+            deleted_memories INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        # Workers only ever look for unfinished jobs
+        '''
+        CREATE INDEX IF NOT EXISTS idx_deletion_jobs_active ON deletion_jobs (available_at)
+        WHERE status IN ('pending', 'running')
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_deletion_jobs_user ON deletion_jobs (user_id, created_at)'
+    ]),
+    Migration(6, "topics and subtopics tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS topics (
+            user_id VARCHAR(255) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            conversation_count INTEGER NOT NULL DEFAULT 0,
+            subtopic_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, name),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS subtopics (
+            user_id VARCHAR(255) NOT NULL,
+            topic VARCHAR(255) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            conversation_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, topic, name),
+            FOREIGN KEY (user_id, topic) REFERENCES topics(user_id, name) ON DELETE CASCADE
+        )
+        ''',
+        # Existing topics, counting only real conversations; placeholder-only topics are kept with a count of zero
+        '''
+        WITH classified AS (
+            SELECT user_id, topic, sub_topic,
+                   message_count = 0 AND title IN ('[Topic: ' || topic || ']',
+                                                   '[Sub-topic: ' || topic || ' → ' || COALESCE(sub_topic, '') || ']') AS placeholder
+            FROM conversations
+            WHERE topic IS NOT NULL
+        )
+        INSERT INTO topics (user_id, name, conversation_count)
+        SELECT user_id, topic, COUNT(*) FILTER (WHERE NOT placeholder) FROM classified
+        GROUP BY user_id, topic
+        ON CONFLICT DO NOTHING
+        ''',
+        '''
+        WITH classified AS (
+            SELECT user_id, topic, sub_topic,
+                   message_count = 0 AND title = '[Sub-topic: ' || topic || ' → ' || sub_topic || ']' AS placeholder
+            FROM conversations
+            WHERE topic IS NOT NULL AND sub_topic IS NOT NULL
+        )
+        INSERT INTO subtopics (user_id, topic, name, conversation_count)
+        SELECT user_id, topic, sub_topic, COUNT(*) FILTER (WHERE NOT placeholder) FROM classified
+        GROUP BY user_id, topic, sub_topic
+        ON CONFLICT DO NOTHING
+        ''',
+        '''
+        UPDATE topics t SET subtopic_count = s.count
+        FROM (SELECT user_id, topic, COUNT(*) AS count FROM subtopics GROUP BY user_id, topic) s
+        WHERE s.user_id = t.user_id AND s.topic = t.name
+        ''',
+        # Placeholder conversations only existed to make empty topics visible
+        '''
+        DELETE FROM conversations
+        WHERE message_count = 0 AND topic IS NOT NULL
+          AND title IN ('[Topic: ' || topic || ']', '[Sub-topic: ' || topic || ' → ' || COALESCE(sub_topic, '') || ']')
+        ''',
+        # Counts follow every write to conversations, whichever code path makes it
+        '''
+        CREATE OR REPLACE FUNCTION conversations_topic_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.topic IS NOT NULL THEN
+                UPDATE topics SET conversation_count = conversation_count - 1
+                WHERE user_id = OLD.user_id AND name = OLD.topic;
+                IF OLD.sub_topic IS NOT NULL THEN
+                    UPDATE subtopics SET conversation_count = conversation_count - 1
+                    WHERE user_id = OLD.user_id AND topic = OLD.topic AND name = OLD.sub_topic;
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.topic IS NOT NULL THEN
+                INSERT INTO topics (user_id, name, conversation_count) VALUES (NEW.user_id, NEW.topic, 1)
+                ON CONFLICT (user_id, name) DO UPDATE SET conversation_count = topics.conversation_count + 1;
+                IF NEW.sub_topic IS NOT NULL THEN
+                    INSERT INTO subtopics (user_id, topic, name, conversation_count)
+                    VALUES (NEW.user_id, NEW.topic, NEW.sub_topic, 1)
+                    ON CONFLICT (user_id, topic, name) DO UPDATE SET conversation_count = subtopics.conversation_count + 1;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        '''
+        CREATE OR REPLACE FUNCTION subtopics_topic_count() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE topics SET subtopic_count = subtopic_count + 1 WHERE user_id = NEW.user_id AND name = NEW.topic;
+            ELSE
+                UPDATE topics SET subtopic_count = subtopic_count - 1 WHERE user_id = OLD.user_id AND name = OLD.topic;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        ''',
+        'DROP TRIGGER IF EXISTS conversations_topic_counts_write ON conversations',
+        '''
+        CREATE TRIGGER conversations_topic_counts_write
+        AFTER INSERT OR DELETE ON conversations
+        FOR EACH ROW EXECUTE FUNCTION conversations_topic_counts()
+        ''',
+        'DROP TRIGGER IF EXISTS conversations_topic_counts_move ON conversations',
+        '''
+        CREATE TRIGGER conversations_topic_counts_move
+        AFTER UPDATE OF user_id, topic, sub_topic ON conversations
+        FOR EACH ROW
+        WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id OR OLD.topic IS DISTINCT FROM NEW.topic
+              OR OLD.sub_topic IS DISTINCT FROM NEW.sub_topic)
+        EXECUTE FUNCTION conversations_topic_counts()
+        ''',
+        'DROP TRIGGER IF EXISTS subtopics_topic_count ON subtopics',
+        '''
+        CREATE TRIGGER subtopics_topic_count
+        AFTER INSERT OR DELETE ON subtopics
+        FOR EACH ROW EXECUTE FUNCTION subtopics_topic_count()
+        '''
+    ]),
+    Migration(7, "memory ingest queue, embedding cache and revoked sessions", [
+        '''
+        CREATE TABLE IF NOT EXISTS memory_ingest_queue (
+            id BIGSERIAL PRIMARY KEY,
+            memory_id VARCHAR(255) NOT NULL,
+            content TEXT NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            conversation_id VARCHAR(255),
+            message_type VARCHAR(50) NOT NULL,
+            message_id INTEGER,
+            attempts INTEGER DEFAULT 0,
+            last_error TEXT,
+            available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        # Precomputed embeddings (float32 bytes) let the worker skip the API call
+        'ALTER TABLE memory_ingest_queue ADD COLUMN IF NOT EXISTS embedding BYTEA',
+        'CREATE INDEX IF NOT EXISTS idx_memory_ingest_queue_available ON memory_ingest_queue (available_at, id)',
+        '''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            cache_key VARCHAR(255) PRIMARY KEY,
+            embedding BYTEA NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            token_id VARCHAR(64) PRIMARY KEY,
+            expires_at TIMESTAMP NOT NULL,
+            revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        '''
+    ])
+]
+
+_INDEX_NAME = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.IGNORECASE)
+
+
+def _drop_invalid_index(cursor, statement: str):
+    """An interrupted concurrent build leaves an invalid index that IF NOT EXISTS would skip; drop it first"""
+    match = _INDEX_NAME.search(statement)
+    if not match:
+        return
+    cursor.execute('''
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    ''', (match.group(1),))
+    if cursor.fetchone():
+        print(f"DEBUG: Dropping invalid index {match.group(1)} left by an interrupted migration")
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}')
+
+
+def run_migrations(connection_pool: Optional[DatabasePool] = None, migrations: Optional[List[Migration]] = None) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    connection_pool = connection_pool or db_pool
+    migrations = sorted(migrations or MIGRATIONS, key=lambda migration: migration.version)
+    applied = []
+
+    with connection_pool.connection() as conn:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        # Only one process migrates at a time; the others wait and then find nothing pending
+        cursor.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_KEY,))
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('SELECT version FROM schema_migrations')
+            done = {row[0] for row in cursor.fetchall()}
+
+            for migration in migrations:
+                if migration.version in done:
+                    continue
+
+                if migration.concurrent:
+                    # CREATE INDEX CONCURRENTLY cannot run in a transaction; each statement is idempotent instead
+                    for statement in migration.statements:
+                        _drop_invalid_index(cursor, statement)
+                        cursor.execute(statement)
+                    cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                                   (migration.version, migration.name))
+                else:
+                    conn.autocommit = False
+                    try:
+                        for statement in migration.statements:
+                            cursor.execute(statement)
+                        cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                                       (migration.version, migration.name))
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
+                    finally:
+                        conn.autocommit = True
+
+                applied.append(migration.version)
+                print(f"✓ Applied migration {migration.version}: {migration.name}")
+        finally:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_KEY,))
+            cursor.close()
+
+    return applied
@@ -1,10 +1,13 @@
 """
 Model Service for OpenRouter integration
 """
-import requests
 import os
-from typing import List, Dict, Optional
+import json
+import time
+import hashlib
+from typing import List, Dict, Optional, AsyncIterator, Tuple
 import asyncio
+import importlib.util
 import httpx
 
 class ModelService:
@@ -13,28 +16,80 @@ class ModelService:
     def __init__(self):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1"
-        self._models_cache = None
+        
+        # One pooled client per process so LLM calls reuse warm TLS connections
+        self.timeout = float(os.getenv("MODEL_HTTP_TIMEOUT", "30"))
+        # Generous read timeout between streamed chunks; reasoning models can pause before the first token
+        self.stream_read_timeout = float(os.getenv("MODEL_HTTP_STREAM_READ_TIMEOUT", "60"))
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("MODEL_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("MODEL_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("MODEL_HTTP_KEEPALIVE_EXPIRY", "30"))
+        )
+        # HTTP/2 multiplexes concurrent requests over one connection; h2 is installed via httpx[http2]
+        self.http2 = os.getenv("MODEL_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+        self._client: Optional[httpx.AsyncClient] = None
         self.default_models = [
             {"id": "openai/gpt-4o-mini", "name": "GPT-4o Mini", "description": "Fast and efficient model for general chat"},
             {"id": "google/gemini-2.0-flash-001", "name": "Gemini 2.0 Flash", "description": "Google's latest fast model"},
             {"id": "google/gemini-2.5-flash-lite-preview-06-17", "name": "Gemini 2.5 Flash Lite", "description": "1M+ context window"}
         ]
+        
+        # Model catalog: served from memory, refreshed in the background once older than the TTL
+        self.catalog_ttl = float(os.getenv("MODEL_CATALOG_TTL", "3600"))
+        # Failed fetches are retried sooner, while the last good (or default) list keeps being served
+        self.catalog_retry = float(os.getenv("MODEL_CATALOG_RETRY", "60"))
+        self._catalog: List[Dict] = []
+        self._catalog_index: Dict[str, Dict] = {}
+        self._catalog_search: List[Tuple[str, Dict]] = []
+        self._catalog_body = b""
+        self._catalog_etag = ""
+        self._catalog_expires_at: Optional[float] = None
+        self._catalog_refresh: Optional[asyncio.Task] = None
+        self._set_catalog(self.default_models)
     
-    def get_models(self) -> List[Dict]:
-        """Get available models from OpenRouter"""
-        if self._models_cache:
-            return self._models_cache
+    def _get_client(self) -> httpx.AsyncClient:
+        """Create the shared HTTP client on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+        return self._client
+    
+    async def close(self):
+        """Close the shared HTTP client and its pooled connections"""
+        if self._catalog_refresh is not None:
+            self._catalog_refresh.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _set_catalog(self, models: List[Dict]):
+        """Install a model list: sorted by name, indexed by id, with its JSON body and ETag precomputed"""
+        self._catalog = sorted(models, key=lambda model: model.get('name', '').lower())
+        self._catalog_index = {model["id"]: model for model in self._catalog}
+        self._catalog_search = [
+            (f"{model.get('name', '')}\n{model.get('description', '')}".lower(), model)
+            for model in self._catalog
+        ]
+        self._catalog_body = json.dumps(self._catalog).encode("utf-8")
+        self._catalog_etag = '"' + hashlib.sha256(self._catalog_body).hexdigest()[:32] + '"'
+    
+    async def _fetch_models(self) -> Optional[List[Dict]]:
+        """Download the model list from OpenRouter; returns None on failure"""
+        if not self.api_key:
+            return None
         
         try:
-            if not self.api_key:
-                return self.default_models
-            
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             }
             
-            response = requests.get(f"{self.base_url}/models", headers=headers, timeout=10)
+            response = await self._get_client().get("/models", headers=headers, timeout=10.0)
             
             if response.status_code == 200:
                 models_data = response.json()
@@ -47,18 +102,48 @@ class ModelService:
                         "description": model.get("description", "")
                     })
                 
-                self._models_cache = models
-                return models
+                return models or None
             else:
-                return self.default_models
+                print(f"Error fetching models: {response.status_code}")
+                return None
                 
         except Exception as e:
             print(f"Error fetching models: {e}")
-            return self.default_models
+            return None
     
-    async def chat_completion(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False) -> str:
-        """Generate chat completion using OpenRouter API"""
-        
+    async def refresh_catalog(self):
+        """Fetch the model list now, keeping the current catalog if the fetch fails"""
+        models = await self._fetch_models()
+        if models:
+            self._set_catalog(models)
+            self._catalog_expires_at = time.monotonic() + self.catalog_ttl
+        else:
+            self._catalog_expires_at = time.monotonic() + self.catalog_retry
+    
+    def refresh_catalog_in_background(self) -> asyncio.Task:
+        """Start a catalog refresh unless one is already running"""
+        if self._catalog_refresh is None or self._catalog_refresh.done():
+            self._catalog_refresh = asyncio.get_running_loop().create_task(self.refresh_catalog())
+        return self._catalog_refresh
+    
+    async def get_catalog(self) -> Tuple[bytes, str]:
+        """Return the sorted catalog as JSON bytes plus its ETag.
+
+        The first call waits for OpenRouter; after that, stale entries are served immediately
+        while a background refresh runs (stale-while-revalidate).
+        """
+        if self._catalog_expires_at is None and self.api_key:
+            await asyncio.shield(self.refresh_catalog_in_background())
+        elif self._catalog_expires_at is not None and time.monotonic() > self._catalog_expires_at:
+            self.refresh_catalog_in_background()
+        return self._catalog_body, self._catalog_etag
+    
+    def get_models(self) -> List[Dict]:
+        """Get available models from the in-memory catalog, sorted by name"""
+        return self._catalog
+    
+    def _build_chat_request(self, messages: List[Dict], model: str, web_search: bool, stream: bool = False):
+        """Build headers and payload for an OpenRouter chat completion request"""
         if not self.api_key:
             raise Exception("OpenRouter API key is required for chat completions")
         
@@ -81,41 +166,74 @@ class ModelService:
             if not payload["model"].endswith(":online"):
                 payload["model"] = f"{model}:online"
         
+        if stream:
+            payload["stream"] = True
+        
+        return headers, payload
+    
+    async def chat_completion(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False) -> str:
+        """Generate chat completion using OpenRouter API"""
+        headers, payload = self._build_chat_request(messages, model, web_search)
+        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    raise Exception(f"API error: {response.status_code} - {response.text}")
+            response = await self._get_client().post("/chat/completions", headers=headers, json=payload)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return data["choices"][0]["message"]["content"]
+            else:
+                raise Exception(f"API error: {response.status_code} - {response.text}")
                     
         except Exception as e:
             raise Exception(f"Chat completion failed: {str(e)}")
     
+    async def stream_chat_completion(self, messages: List[Dict], model: str = "openai/gpt-4o-mini", web_search: bool = False) -> AsyncIterator[str]:
+        """Stream chat completion content deltas from OpenRouter as they arrive"""
+        headers, payload = self._build_chat_request(messages, model, web_search, stream=True)
+        
+        timeout = httpx.Timeout(self.timeout, read=self.stream_read_timeout)
+        
+        async with self._get_client().stream("POST", "/chat/completions", headers=headers, json=payload, timeout=timeout) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise Exception(f"API error: {response.status_code} - {body.decode(errors='replace')}")
+            
+            async for line in response.aiter_lines():
+                # Skip blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+                if not line.startswith("data:"):
+                    continue
+                
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise Exception(f"API error: {chunk['error'].get('message', chunk['error'])}")
+                
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    
     def search_models(self, query: str) -> List[Dict]:
         """Search models by name or description"""
-        models = self.get_models()
         query_lower = query.lower()
         
-        filtered = []
-        for model in models:
-            if (query_lower in model.get("name", "").lower() or 
-                query_lower in model.get("description", "").lower()):
+        # Exact id matches come straight from the index; other matches use pre-lowered search text
+        exact = self._catalog_index.get(query)
+        filtered = [exact] if exact else []
+        for search_text, model in self._catalog_search:
+            if query_lower in search_text and model is not exact:
                 filtered.append(model)
         
         return filtered
     
     def get_model_by_id(self, model_id: str) -> Optional[Dict]:
         """Get model details by ID"""
-        models = self.get_models()
-        for model in models:
-            if model.get("id") == model_id:
-                return model
-        return None
\ No newline at end of file
+        return self._catalog_index.get(model_id)
+
+# Global instance
+model_service = ModelService()
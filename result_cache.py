@@ -0,0 +1,134 @@
+"""
+Result Cache
+Server-side cache for per-user query results such as the topic tree, conversation pages and
+file listings. Keys include the user's data version for the scopes a query reads, so a write
+that bumps the version makes every older entry unreachable; stale entries simply age out.
+
+Results are kept in an in-process LRU by default, or in Redis with CACHE_BACKEND=redis so all
+workers share them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from data_versions import data_versions, shared_store
+
+
+class MemoryResultStore:
+    """Bounded LRU of serialized results with a per-entry deadline"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("RESULT_CACHE_SIZE", "5000"))
+        # key -> (JSON text, monotonic deadline)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, deadline = entry
+            if time.monotonic() >= deadline:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name, 'size': len(self._entries), 'max_entries': self.max_entries,
+                'evictions': self.evictions}
+
+
+class RedisResultStore:
+    """Serialized results in Redis, expiring on their own TTL"""
+
+    name = "redis"
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(f"result_cache:{key}")
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: float):
+        self.client.set(f"result_cache:{key}", value, ex=max(1, int(ttl)))
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name}
+
+
+class ResultCache:
+    """Versioned read-through cache for JSON-serializable query results"""
+
+    def __init__(self, store, versions=None, ttl: Optional[float] = None):
+        self.store = store
+        self.versions = versions or data_versions
+        # Upper bound on staleness should a write ever skip its version bump
+        self.ttl = ttl if ttl is not None else float(os.getenv("RESULT_CACHE_TTL", "300"))
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'errors': 0
+        }
+
+    def _key(self, user_id: str, query: str, params: Tuple, version: str) -> str:
+        digest = hashlib.sha256(json.dumps(params, default=str).encode('utf-8')).hexdigest()[:32]
+        return f"{user_id}:{query}:{version}:{digest}"
+
+    def get_or_compute(self, user_id: str, query: str, params: Tuple, scopes: Iterable[str],
+                       compute: Callable[..., Any], *args) -> Any:
+        """Return the cached result of query(params) for the user, or run compute(*args) and cache it.
+
+        compute should raise on failure rather than return a fallback, so errors are never cached.
+        Hits are returned as fresh copies, so callers may modify them.
+        """
+        # Read before computing: a write racing the query leaves the entry under an already-old version
+        key = self._key(user_id, query, params, self.versions.get(user_id, scopes))
+        try:
+            cached = self.store.get(key)
+        except Exception as e:
+            self._metrics['errors'] += 1
+            print(f"Error reading result cache: {e}")
+            cached = None
+        if cached is not None:
+            self._metrics['hits'] += 1
+            return json.loads(cached)
+
+        self._metrics['misses'] += 1
+        result = compute(*args)
+        try:
+            self.store.set(key, json.dumps(result), self.ttl)
+        except Exception as e:
+            self._metrics['errors'] += 1
+            print(f"Error writing result cache: {e}")
+        return result
+
+    def metrics(self) -> Dict:
+        snapshot = dict(self._metrics)
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = snapshot['hits'] / lookups if lookups else 0.0
+        snapshot['ttl'] = self.ttl
+        snapshot['store'] = self.store.metrics()
+        return snapshot
+
+
+# Global instance
+result_cache = ResultCache(RedisResultStore(shared_store) if shared_store is not None else MemoryResultStore())
@@ -0,0 +1,266 @@
+"""
+Session Backends
+Pluggable storage for login sessions. The session_id cookie holds either a database session ID
+or a signed, expiring token that carries the user itself; SESSION_BACKEND selects which.
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from database import db_pool, run_db
+from session_cache import SessionCache, session_cache
+
+SESSION_LIFETIME = timedelta(hours=24)
+
+
+# Database session management functions
+def create_session(user_id: str, username: str) -> Optional[str]:
+    """Create a new session in the database and return session_id"""
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+
+            session_id = str(uuid.uuid4())
+            expires_at = datetime.now() + SESSION_LIFETIME
+
+            cursor.execute('''
+                INSERT INTO sessions (session_id, user_id, username, expires_at)
+                VALUES (%s, %s, %s, %s)
+            ''', (session_id, user_id, username, expires_at))
+
+            conn.commit()
+            cursor.close()
+
+        return session_id
+    except Exception as e:
+        print(f"Error creating session: {e}")
+        return None
+
+def fetch_session(session_id: str) -> Optional[Tuple[Dict, datetime]]:
+    """Read a valid, unexpired session and its expiry; raises on database errors"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT user_id, username, expires_at FROM sessions
+            WHERE session_id = %s AND expires_at > NOW()
+        ''', (session_id,))
+
+        result = cursor.fetchone()
+        cursor.close()
+
+    if result:
+        return {
+            'user_id': result[0],
+            'username': result[1]
+        }, result[2]
+    return None
+
+def get_session(session_id: str) -> Optional[Dict]:
+    """Get session data from database if valid and not expired"""
+    try:
+        result = fetch_session(session_id)
+        return result[0] if result else None
+    except Exception as e:
+        print(f"Error getting session: {e}")
+        return None
+
+def delete_session(session_id: str) -> bool:
+    """Delete a session from the database"""
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('DELETE FROM sessions WHERE session_id = %s', (session_id,))
+
+            conn.commit()
+            cursor.close()
+
+        session_cache.invalidate(session_id)
+        return True
+    except Exception as e:
+        print(f"Error deleting session: {e}")
+        return False
+
+EXPIRED_SESSIONS_SQL = 'DELETE FROM sessions WHERE expires_at <= NOW()'
+
+def cleanup_expired_sessions():
+    """Remove expired sessions from database"""
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(EXPIRED_SESSIONS_SQL)
+
+            conn.commit()
+            cursor.close()
+
+        return True
+    except Exception as e:
+        print(f"Error cleaning up sessions: {e}")
+        return False
+
+
+class DatabaseSessionBackend:
+    """Random session IDs stored in the sessions table, read through the in-memory session cache"""
+
+    name = "database"
+
+    def __init__(self, cache: Optional[SessionCache] = None):
+        self.cache = cache or session_cache
+        self.sweep_interval = float(os.getenv("SESSION_SWEEP_INTERVAL", "3600"))
+
+    async def create(self, user_id: str, username: str) -> Optional[str]:
+        return await run_db(create_session, user_id, username)
+
+    async def authenticate(self, session_id: str) -> Optional[Dict]:
+        found, session = self.cache.get(session_id)
+        if found:
+            return session
+
+        try:
+            result = await run_db(fetch_session, session_id)
+        except Exception as e:
+            # Not cached, so a database hiccup doesn't lock the user out for the negative TTL
+            print(f"Error getting session: {e}")
+            return None
+
+        if result:
+            session, expires_at = result
+            self.cache.put(session_id, session, expires_at)
+            return session
+        self.cache.put(session_id, None)
+        return None
+
+    async def revoke(self, session_id: str):
+        self.cache.invalidate(session_id)
+        await run_db(delete_session, session_id)
+
+    async def sweep(self):
+        """Purge expired sessions from the database and the cache"""
+        await run_db(cleanup_expired_sessions)
+        pruned = self.cache.prune()
+        print(f"DEBUG: Session sweep pruned {pruned} cached sessions")
+
+    def metrics(self) -> Dict:
+        return {'backend': self.name, 'cache': self.cache.metrics()}
+
+
+class SignedTokenSessionBackend:
+    """Stateless sessions: the cookie is a signed, expiring token carrying the user ID and username.
+
+    Tokens are signed with the newest key and accepted under any listed key, so keys can be rotated
+    by appending a new one and dropping the oldest after a token lifetime. Logout records the token's
+    ID in a revocation list kept in memory and mirrored to PostgreSQL for other processes.
+    """
+
+    name = "signed"
+
+    def __init__(self, secret_keys: List[str], max_age: Optional[float] = None):
+        if not secret_keys:
+            raise ValueError("Signed sessions need at least one secret key")
+        self.max_age = max_age or SESSION_LIFETIME.total_seconds()
+        self.serializer = URLSafeTimedSerializer(secret_keys, salt="neurolm-session")
+        # Revocations made by other processes are picked up this often
+        self.sweep_interval = float(os.getenv("SESSION_REVOCATION_SYNC_INTERVAL", "30"))
+
+        # token ID -> wall-clock time after which the token would have expired anyway
+        self._revoked: Dict[str, float] = {}
+        self._metrics = {
+            'issued': 0,
+            'verified': 0,
+            'rejected': 0,
+            'revoked_hits': 0
+        }
+
+    def _decode(self, token: str) -> Optional[Tuple[Dict, float]]:
+        """Verify a token's signature and age; returns its payload and issue time"""
+        try:
+            payload, issued_at = self.serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except BadSignature:
+            return None
+        if not isinstance(payload, dict) or not {'uid', 'un', 'jti'} <= payload.keys():
+            return None
+        return payload, issued_at.timestamp()
+
+    async def create(self, user_id: str, username: str) -> Optional[str]:
+        self._metrics['issued'] += 1
+        return self.serializer.dumps({'uid': user_id, 'un': username, 'jti': uuid.uuid4().hex})
+
+    async def authenticate(self, token: str) -> Optional[Dict]:
+        decoded = self._decode(token)
+        if decoded is None:
+            self._metrics['rejected'] += 1
+            return None
+        payload, _ = decoded
+        if payload['jti'] in self._revoked:
+            self._metrics['revoked_hits'] += 1
+            return None
+        self._metrics['verified'] += 1
+        return {'user_id': payload['uid'], 'username': payload['un']}
+
+    def _store_revocation(self, token_id: str, expires_at: datetime):
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO revoked_sessions (token_id, expires_at) VALUES (%s, %s)
+                ON CONFLICT (token_id) DO NOTHING
+            ''', (token_id, expires_at))
+            conn.commit()
+            cursor.close()
+
+    def _sync_revocations(self) -> List[Tuple[str, datetime]]:
+        """Delete lapsed revocations and return the live ones"""
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM revoked_sessions WHERE expires_at <= NOW()')
+            cursor.execute('SELECT token_id, expires_at FROM revoked_sessions')
+            rows = cursor.fetchall()
+            conn.commit()
+            cursor.close()
+        return rows
+
+    async def revoke(self, token: str):
+        decoded = self._decode(token)
+        if decoded is None:
+            return
+        payload, issued_at = decoded
+        expires_at = issued_at + self.max_age
+        self._revoked[payload['jti']] = expires_at
+        try:
+            await run_db(self._store_revocation, payload['jti'], datetime.fromtimestamp(expires_at))
+        except Exception as e:
+            print(f"Error storing session revocation: {e}")
+
+    async def sweep(self):
+        """Reload the shared revocation list, dropping entries whose tokens have expired"""
+        rows = await run_db(self._sync_revocations)
+        now = time.time()
+        revoked = {token_id: expires_at for token_id, expires_at in self._revoked.items() if expires_at > now}
+        for token_id, expires_at in rows:
+            revoked[token_id] = expires_at.timestamp()
+        self._revoked = revoked
+
+    def metrics(self) -> Dict:
+        snapshot = dict(self._metrics)
+        snapshot['backend'] = self.name
+        snapshot['revoked'] = len(self._revoked)
+        return snapshot
+
+
+def create_session_backend():
+    """Build the backend selected by SESSION_BACKEND ("database" or "signed")"""
+    if os.getenv("SESSION_BACKEND", "database").lower() == "signed":
+        # Comma-separated, oldest first; the last key signs new tokens
+        keys = [key.strip() for key in os.getenv("SESSION_SECRET_KEYS", "").split(",") if key.strip()]
+        return SignedTokenSessionBackend(keys or [os.getenv("SECRET_KEY", "default-secret")])
+    return DatabaseSessionBackend()
+
+
+# Global instance
+session_backend = create_session_backend()
@@ -0,0 +1,95 @@
+"""
+Session Cache
+Bounded in-memory cache in front of the sessions table so authenticated requests
+usually skip the database lookup
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+
+class SessionCache:
+    """LRU cache of session lookups, including negative results for unknown session IDs"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 negative_ttl: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+        # Cached sessions are re-read after this long even if they expire later, so revocations elsewhere show up
+        self.ttl = ttl if ttl is not None else float(os.getenv("SESSION_CACHE_TTL", "300"))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv("SESSION_CACHE_NEGATIVE_TTL", "30"))
+
+        # session_id -> (session data or None, monotonic deadline)
+        self._entries: "OrderedDict[str, Tuple[Optional[Dict], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0
+        }
+
+    def get(self, session_id: str) -> Tuple[bool, Optional[Dict]]:
+        """Return (found, session); session is None for a cached unknown or expired ID"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                session, deadline = entry
+                if time.monotonic() < deadline:
+                    self._entries.move_to_end(session_id)
+                    self._metrics['hits' if session else 'negative_hits'] += 1
+                    return True, session
+                del self._entries[session_id]
+            self._metrics['misses'] += 1
+            return False, None
+
+    def put(self, session_id: str, session: Optional[Dict], expires_at: Optional[datetime] = None):
+        """Cache a lookup result; positive entries never outlive the session's own expiry"""
+        if session:
+            lifetime = self.ttl
+            if expires_at is not None:
+                lifetime = min(lifetime, (expires_at - datetime.now()).total_seconds())
+            if lifetime <= 0:
+                return
+        else:
+            lifetime = self.negative_ttl
+
+        with self._lock:
+            self._entries[session_id] = (session, time.monotonic() + lifetime)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics['evictions'] += 1
+
+    def invalidate(self, session_id: str):
+        """Forget a session, e.g. on logout"""
+        with self._lock:
+            if self._entries.pop(session_id, None) is not None:
+                self._metrics['invalidations'] += 1
+
+    def prune(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [session_id for session_id, (_, deadline) in self._entries.items() if deadline <= now]
+            for session_id in expired:
+                del self._entries[session_id]
+        return len(expired)
+
+    def metrics(self) -> Dict:
+        """Hit/miss counters since startup"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['size'] = len(self._entries)
+        lookups = snapshot['hits'] + snapshot['negative_hits'] + snapshot['misses']
+        snapshot['hit_rate'] = (snapshot['hits'] + snapshot['negative_hits']) / lookups if lookups else 0.0
+        snapshot['max_entries'] = self.max_entries
+        return snapshot
+
+
+# Global instance
+session_cache = SessionCache()
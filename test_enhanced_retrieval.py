@@ -24,12 +24,13 @@ async def test_enhanced_retrieval():
     for query in test_queries:
         print(f"\nQuery: '{query}'")
         try:
-            context = await memory_system.retrieve_memory(
+            retrieval = await memory_system.retrieve_memory(
                 query=query,
                 user_id=user_id,
                 conversation_id=None,
                 limit=5
             )
+            context = retrieval.context
             
             if context:
                 print(f"Retrieved context ({len(context)} chars):")
@@ -48,7 +49,7 @@ async def test_enhanced_retrieval():
             print(f"Error: {e}")
     
     # Clean up
-    memory_system.close()
+    await memory_system.close()
     
     print("\nEnhanced retrieval test completed")
 
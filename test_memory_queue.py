@@ -0,0 +1,169 @@
+"""
+Memory queue isolation test
+Queues good and oversized memories through the real store_memories path, with the OpenAI client and
+Neo4j driver replaced by fakes, and checks that only the oversized rows are held back while an
+outage holds back everything. Needs DATABASE_URL and an empty memory_ingest_queue.
+"""
+
+import asyncio
+import sys
+
+import httpx
+import openai
+
+from database import db_pool, run_db
+from embedding_service import EmbeddingService
+from intelligent_memory import IntelligentMemorySystem
+from memory_queue import MemoryIngestionQueue
+from migrations import run_migrations
+
+USER_ID = "queue-test-user"
+# Inputs longer than this are rejected like texts over the embedding token limit
+MAX_INPUT_LENGTH = 200
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+        if self.down:
+            raise openai.APIConnectionError(request=request)
+        if any(len(text) > MAX_INPUT_LENGTH for text in input):
+            raise openai.BadRequestError("maximum context length exceeded",
+                                         response=httpx.Response(400, request=request), body=None)
+        data = [type("Item", (), {'index': index, 'embedding': [1.0, float(index)]}) for index in range(len(input))]
+        return type("Response", (), {'data': data})
+
+
+class FakeResult:
+    async def consume(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, stored):
+        self.stored = stored
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, params=None):
+        self.stored.extend(row['content'] for row in (params or {}).get('memories', []))
+        return FakeResult()
+
+
+class FakeDriver:
+    def __init__(self):
+        self.stored = []
+
+    def session(self):
+        return FakeSession(self.stored)
+
+
+def queued_rows():
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT content, attempts FROM memory_ingest_queue WHERE user_id = %s ORDER BY id', (USER_ID,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+
+def pending_count() -> int:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM memory_ingest_queue')
+        count = cursor.fetchone()[0]
+        cursor.close()
+    return count
+
+
+def clear_rows():
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM memory_ingest_queue WHERE user_id = %s', (USER_ID,))
+        conn.commit()
+        cursor.close()
+
+
+def make_memory_system():
+    embeddings = FakeEmbeddings()
+    service = EmbeddingService(batch_window=0)
+    service._client = type("Client", (), {'embeddings': embeddings})()
+    memory_system = IntelligentMemorySystem()
+    memory_system.embedding_service = service
+    memory_system.driver = FakeDriver()
+    memory_system._vector_index_ready = True
+    return memory_system, embeddings
+
+
+def memories(count: int, oversized: set):
+    batch = []
+    for index in range(count):
+        content = f"I love hiking trail {index}"
+        if index in oversized:
+            content += " and more" * 100
+        batch.append({'content': content, 'user_id': USER_ID, 'conversation_id': None,
+                      'message_type': 'user', 'message_id': index})
+    return batch
+
+
+async def test_oversized_rows_in_both_halves() -> bool:
+    """Bad rows in each half of the batch must not hold back the good ones"""
+    memory_system, _ = make_memory_system()
+    queue = MemoryIngestionQueue(memory_system, batch_size=8)
+    await queue.enqueue(memories(8, {1, 6}))
+    await queue.process_batch()
+
+    left = await run_db(queued_rows)
+    stored = sorted(memory_system.driver.stored)
+    expected = sorted(f"I love hiking trail {index}" for index in (0, 2, 3, 4, 5, 7))
+    await run_db(clear_rows)
+    if stored == expected and len(left) == 2 and all(content.startswith("I love hiking trail 1 ") or
+                                                     content.startswith("I love hiking trail 6 ") for content, _ in left):
+        print(f"✅ Oversized rows isolated: {len(stored)} stored, {len(left)} left to retry")
+        return True
+    print(f"❌ Oversized rows not isolated: stored {stored}, left {[content[:24] for content, _ in left]}")
+    return False
+
+
+async def test_outage_holds_whole_batch() -> bool:
+    """A connection failure is not the rows' fault: every row is retried, without splitting"""
+    memory_system, embeddings = make_memory_system()
+    embeddings.down = True
+    queue = MemoryIngestionQueue(memory_system, batch_size=8)
+    await queue.enqueue(memories(8, set()))
+    await queue.process_batch()
+
+    left = await run_db(queued_rows)
+    await run_db(clear_rows)
+    if len(left) == 8 and not memory_system.driver.stored and embeddings.calls == 1:
+        print("✅ Outage retried all 8 rows after a single call")
+        return True
+    print(f"❌ Outage handling: {len(left)} rows left, {embeddings.calls} calls")
+    return False
+
+
+async def run_tests() -> bool:
+    await run_db(run_migrations)
+    if await run_db(pending_count):
+        print("❌ memory_ingest_queue is not empty; run this against a scratch database")
+        return False
+    results = [
+        await test_oversized_rows_in_both_halves(),
+        await test_outage_holds_whole_batch()
+    ]
+    return all(results)
+
+
+if __name__ == "__main__":
+    if not asyncio.run(run_tests()):
+        sys.exit(1)
+    print("\n✅ Memory queue isolates bad rows")
@@ -0,0 +1,133 @@
+"""
+Query plan regression test
+Runs EXPLAIN on the hot PostgreSQL queries, imported from the modules that execute them,
+and checks each one is served by the index created for it in migrations.py. Needs DATABASE_URL. Representative rows are seeded and
+analyzed inside a transaction that is rolled back, so existing data is left untouched.
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from database import db_pool
+from migrations import run_migrations
+from main import (
+    CHAT_TURN_CONTEXT_SQL, CONVERSATION_COUNT_SQL, CONVERSATION_KEYSET_CONDITION, CONVERSATION_PAGE_SQL,
+    LINKED_MEMORIES_SQL, MESSAGE_HISTORY_SQL, MESSAGE_PAGE_SQL, SUB_TOPIC_COUNT_SQL, SUBTOPIC_DELETION_INFO_SQL,
+    TOPIC_DELETION_INFO_SQL, TOPIC_TREE_SQL, USER_FILE_SQL, USER_FILES_SQL, conversation_filters
+)
+from session_backend import EXPIRED_SESSIONS_SQL
+
+USER_ID = "plan-user-1"
+CONVERSATION_ID = "plan-conv-1-1"
+
+
+def conversation_page(topic=None, sub_topic=None, after=None, limit=20):
+    """The conversation list query and params exactly as query_user_conversations builds them"""
+    where_conditions, params = conversation_filters(USER_ID, topic, sub_topic)
+    if after:
+        where_conditions.append(CONVERSATION_KEYSET_CONDITION)
+        params.extend(after)
+    return CONVERSATION_PAGE_SQL.format(where=' AND '.join(where_conditions)), tuple(params + [limit + 1, 0])
+
+
+def conversation_count(topic=None, sub_topic=None):
+    where_conditions, params = conversation_filters(USER_ID, topic, sub_topic)
+    return CONVERSATION_COUNT_SQL.format(where=' AND '.join(where_conditions)), tuple(params)
+
+
+# (description, expected index, query, params); the SQL is imported from the code that runs it
+HOT_QUERIES = [
+    ("Conversation list first page", "idx_conversations_user_updated_id", *conversation_page()),
+    ("Conversation list by keyset", "idx_conversations_user_updated_id",
+     *conversation_page(after=(datetime.now() - timedelta(hours=1), CONVERSATION_ID))),
+    ("Conversation count by topic and sub-topic", "idx_conversations_user_topic",
+     *conversation_count("topic-1", "sub-1")),
+    ("Topic deletion preview", "idx_conversations_user_topic", TOPIC_DELETION_INFO_SQL, (USER_ID, "topic-1")),
+    ("Sub-topic deletion preview", "idx_conversations_user_topic", SUBTOPIC_DELETION_INFO_SQL,
+     (USER_ID, "topic-1", "sub-1")),
+    ("Topic tree for /topics", "topics_pkey", TOPIC_TREE_SQL, (USER_ID,)),
+    ("Sub-topic count for the limit check", "topics_pkey", SUB_TOPIC_COUNT_SQL, (USER_ID, "topic-1")),
+    ("Newest message page", "idx_conversation_messages_conversation_id", MESSAGE_PAGE_SQL,
+     (None, None, 51, CONVERSATION_ID)),
+    ("Message page by keyset", "idx_conversation_messages_conversation_id", MESSAGE_PAGE_SQL,
+     (2147483647, 2147483647, 51, CONVERSATION_ID)),
+    ("Full history in created_at order", "idx_conversation_messages_conversation_created", MESSAGE_HISTORY_SQL,
+     (CONVERSATION_ID,)),
+    ("File lookup by name", "idx_user_files_user_filename", USER_FILE_SQL, (USER_ID, "file-1.txt")),
+    ("File listing", "idx_user_files_user_uploaded", USER_FILES_SQL, (USER_ID,)),
+    ("Recent files for chat context", "idx_user_files_user_uploaded", CHAT_TURN_CONTEXT_SQL,
+     {'new_id': None, 'user_id': USER_ID, 'now': datetime.now(), 'conversation_id': CONVERSATION_ID, 'file_limit': 3}),
+    ("Expired session sweep", "idx_sessions_expires_at", EXPIRED_SESSIONS_SQL, ()),
+    ("Recent memory links", "idx_memory_links_user_created", LINKED_MEMORIES_SQL, (USER_ID, 10)),
+]
+
+def seed_tables(cursor, users: int = 50, per_user: int = 500):
+    """Spread rows across several users so per-user predicates are selective"""
+    cursor.execute('''
+        INSERT INTO users (id, first_name, username, email, password_hash)
+        SELECT 'plan-user-' || u, 'Plan', 'plan-user-' || u, 'plan-user-' || u || '@example.com', 'x'
+        FROM generate_series(1, %s) u
+    ''', (users,))
+    cursor.execute('''
+        INSERT INTO conversations (id, user_id, title, topic, sub_topic, updated_at)
+        SELECT 'plan-conv-' || u || '-' || c, 'plan-user-' || u, 'Conversation', 'topic-' || (c %% 10),
+               'sub-' || (c %% 5), NOW() - c * INTERVAL '1 minute'
+        FROM generate_series(1, %s) u, generate_series(1, %s) c
+    ''', (users, per_user))
+    cursor.execute('''
+        INSERT INTO conversation_messages (conversation_id, message_type, content)
+        SELECT c.id, 'user', 'message ' || m FROM conversations c, generate_series(1, 4) m
+        WHERE c.id LIKE 'plan-conv-%%'
+    ''')
+    cursor.execute('''
+        INSERT INTO user_files (user_id, filename, content, file_type)
+        SELECT 'plan-user-' || u, 'file-' || f || '.txt', 'content', 'txt'
+        FROM generate_series(1, %s) u, generate_series(1, %s) f
+    ''', (users, per_user))
+    cursor.execute('''
+        INSERT INTO sessions (session_id, user_id, username, expires_at)
+        SELECT 'plan-session-' || u || '-' || s, 'plan-user-' || u, 'plan-user-' || u,
+               NOW() + (s - 5) * INTERVAL '1 hour'
+        FROM generate_series(1, %s) u, generate_series(1, %s) s
+    ''', (users, per_user))
+    cursor.execute('''
+        INSERT INTO memory_links (source_memory_id, linked_topic, user_id)
+        SELECT 'memory-' || l, 'topic-' || (l %% 10), 'plan-user-' || u
+        FROM generate_series(1, %s) u, generate_series(1, %s) l
+    ''', (users, per_user))
+    for table in ('users', 'conversations', 'topics', 'subtopics', 'conversation_messages', 'user_files',
+                  'sessions', 'memory_links'):
+        cursor.execute(f'ANALYZE {table}')
+
+
+def explain(cursor, query: str, params) -> str:
+    cursor.execute('EXPLAIN ' + query, params)
+    return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def test_query_plans() -> bool:
+    """Check every hot query's plan names its index"""
+    run_migrations()
+    passed = True
+
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        seed_tables(cursor)
+        for description, index_name, query, params in HOT_QUERIES:
+            plan = explain(cursor, query, params)
+            if index_name in plan:
+                print(f"✅ {description}: {index_name}")
+            else:
+                passed = False
+                print(f"❌ {description}: expected {index_name}, got plan:\n{plan}")
+        # Discards the seeded rows and their statistics
+        conn.rollback()
+        cursor.close()
+
+    return passed
+
+
+if __name__ == "__main__":
+    if not test_query_plans():
+        sys.exit(1)
+    print("\n✅ All hot queries use their indexes")